@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import time
+import argparse
+import tracemalloc
+from gatenlp import Document
+from gatenlp.utils import init_logger, run_start, run_stop
+
+# Measure how much memory annotations take when added to a document, once for annotations
+# without any features (like most Token, SpaceToken or Split annotations) and once for annotations
+# which have a few features. For both, also measure the memory used by a frozen copy of the set.
+
+
+def process_args(args=None):
+    parser = argparse.ArgumentParser(
+        description = """
+        Benchmark the memory used per annotation.
+        """
+    )
+    parser.add_argument("--n", type=int, default=100000,
+                        help="Number of annotations (default: 100000)")
+    args = parser.parse_args(args)
+    return args
+
+
+def measure(n, features):
+    doc = Document("x" * (n + 10))
+    annset = doc.annset()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.time()
+    for i in range(n):
+        annset.add(i, i + 1, "Token", features)
+    elapsed = time.time() - start
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / n, elapsed
+
+
+def measure_frozen(n, features):
+    doc = Document("x" * (n + 10))
+    annset = doc.annset()
+    for i in range(n):
+        annset.add(i, i + 1, "Token", features)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.time()
+    frozen = annset.freeze()
+    elapsed = time.time() - start
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / n, elapsed, frozen
+
+
+if __name__ == "__main__":
+
+    args = process_args()
+    logger = init_logger("annmemory")
+    run_start(logger, "annmemory")
+
+    for name, features in [("no features", None), ("2 features", {"kind": "word", "len": 1})]:
+        perann, elapsed = measure(args.n, features)
+        logger.info(f"{name}: {perann:.1f} bytes per annotation, adding took {elapsed:.3f}s")
+        perann, elapsed, _ = measure_frozen(args.n, features)
+        logger.info(f"{name}, frozen: {perann:.1f} bytes per annotation, freezing took {elapsed:.3f}s")
+
+    run_stop(logger, "annmemory")
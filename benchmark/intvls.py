@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+import time
+import random
+import argparse
+from gatenlp.impl import SortedIntvls, ArrayIntvls, TreeIntvls
+from gatenlp.utils import init_logger, run_start, run_stop
+
+# Compare the interval index implementations on a synthetic document with many short
+# "Token" intervals and some long "Sentence" intervals, similar to what we get from a tokenizer
+# and sentence splitter.
+
+IMPLEMENTATIONS = {
+    "SortedIntvls": SortedIntvls,
+    "ArrayIntvls": ArrayIntvls,
+    "TreeIntvls": TreeIntvls,
+}
+
+
+def process_args(args=None):
+    parser = argparse.ArgumentParser(
+        description = """
+        Benchmark the performance of the interval index implementations.
+        """
+    )
+    parser.add_argument("--n", type=int, default=100000,
+                        help="Number of token intervals (default: 100000)")
+    parser.add_argument("--nqueries", type=int, default=5000,
+                        help="Number of covering/overlapping queries (default: 5000)")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Random seed (default: 1)")
+    parser.add_argument("--impls", nargs="*", default=list(IMPLEMENTATIONS.keys()),
+                        help="Implementations to run")
+    args = parser.parse_args(args)
+    return args
+
+
+def make_intervals(n, seed):
+    rnd = random.Random(seed)
+    intvls = []
+    offset = 0
+    sentstart = 0
+    annid = 0
+    for i in range(n):
+        length = rnd.randint(1, 12)
+        intvls.append((offset, offset + length, annid))
+        annid += 1
+        offset += length + 1
+        if rnd.random() < 0.05:
+            intvls.append((sentstart, offset - 1, annid))
+            annid += 1
+            sentstart = offset
+    rnd.shuffle(intvls)
+    return intvls
+
+
+if __name__ == "__main__":
+
+    args = process_args()
+    logger = init_logger("intvls")
+    run_start(logger, "intvls")
+
+    intvls = make_intervals(args.n, args.seed)
+    rnd = random.Random(args.seed)
+    tokens = [intvl for intvl in intvls if intvl[1] - intvl[0] <= 12]
+    queries = [rnd.choice(tokens) for _ in range(args.nqueries)]
+    logger.info(f"Number of intervals: {len(intvls)}, number of queries: {len(queries)}")
+
+    for name in args.impls:
+        clazz = IMPLEMENTATIONS[name]
+        start = time.time()
+        idx = clazz()
+        for intvl in intvls:
+            idx.add(*intvl)
+        time_add = time.time() - start
+
+        start = time.time()
+        idx = clazz()
+        idx.update(intvls)
+        time_update = time.time() - start
+
+        start = time.time()
+        nfound = 0
+        for qstart, qend, _ in queries:
+            nfound += sum(1 for _ in idx.covering(qstart, qend))
+        time_covering = time.time() - start
+
+        start = time.time()
+        for qstart, qend, _ in queries:
+            nfound += sum(1 for _ in idx.overlapping(qstart, qend))
+        time_overlapping = time.time() - start
+
+        logger.info(f"{name}: add one by one:    {time_add:.3f}s")
+        logger.info(f"{name}: bulk update:       {time_update:.3f}s")
+        logger.info(f"{name}: covering queries:  {time_covering:.3f}s")
+        logger.info(f"{name}: overlapping queries: {time_overlapping:.3f}s (found {nfound})")
+
+    run_stop(logger, "intvls")
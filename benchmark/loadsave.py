@@ -8,6 +8,8 @@ import datetime
 import os.path
 from pathlib import Path
 from gatenlp.utils import init_logger, run_start, run_stop
+from gatenlp.gatenlpconfig import gatenlpconfig
+from gatenlp.serialization.jsonbackend import get_json_backend, JSON_BACKENDS
 
 # NOTE: maybe analyse with python profiling
 
@@ -25,6 +27,9 @@ def process_args(args=None):
                         help="Format / extension of initial files")
     parser.add_argument("--fmt", type=str, default="bdocjs",
                         help="Format / extension of benchmark files")
+    parser.add_argument("--json_backends", nargs="*", default=["json"] + [b for b in JSON_BACKENDS if b != "json"],
+                        help="JSON backends to compare for the JSON formats, the first is the baseline "
+                             "(default: all known backends, json is used instead of those not installed)")
     args = parser.parse_args(args)
     return args
 
@@ -40,35 +45,56 @@ if __name__ == "__main__":
     if not os.path.exists(args.outdir):
         raise Exception("Does not exist: {}".format(args.outdir))
 
-    gen = Path(args.indir).rglob("*.bdocjs")
+    infiles = list(Path(args.indir).rglob("*.bdocjs"))
 
-    total_readorig = 0
-    total_save = 0
-    total_read = 0
-    newfiles = []
-    for f in gen:
-        relpath = str(f)
-        start = time.time()
-        doc = Document.load(relpath, fmt=args.infmt)
-        total_readorig += time.time() - start
-        relpath = relpath.replace(os.path.sep, "_")
-        relpath = relpath.replace(".bdocjs", args.fmt)
-        newfile = os.path.join(args.outdir, relpath)
-        newfiles.append(newfile)
-        start = time.time()
-        doc.save(newfile, fmt=args.fmt)
-        total_save += time.time() - start
+    # the JSON backends only matter for the JSON formats, for other formats just run once
+    if "json" in args.fmt or "bdocjs" in args.fmt:
+        backends = args.json_backends
+    else:
+        backends = [None]
+    avg_times = {}
+    for backend in backends:
+        if backend is not None:
+            gatenlpconfig.json_backend = backend
+            logger.info(f"Using JSON backend {get_json_backend().name} for {backend}")
+        total_readorig = 0
+        total_save = 0
+        total_read = 0
+        newfiles = []
+        for f in infiles:
+            relpath = str(f)
+            start = time.time()
+            doc = Document.load(relpath, fmt=args.infmt)
+            total_readorig += time.time() - start
+            relpath = relpath.replace(os.path.sep, "_")
+            relpath = relpath.replace(".bdocjs", args.fmt)
+            newfile = os.path.join(args.outdir, relpath)
+            newfiles.append(newfile)
+            start = time.time()
+            doc.save(newfile, fmt=args.fmt)
+            total_save += time.time() - start
 
-    for f in newfiles:
-        start = time.time()
-        doc = Document.load(f, fmt=args.fmt)
-        total_read += time.time() - start
+        for f in newfiles:
+            start = time.time()
+            doc = Document.load(f, fmt=args.fmt)
+            total_read += time.time() - start
 
-    n = len(newfiles)
-    avg_readorig = total_readorig / n
-    avg_read = total_read / n
-    avg_save = total_save / n
-    logger.info(f"Number of files processed: {len(newfiles)}")
-    logger.info(f"Average time (secs) reading origs: {avg_readorig}")
-    logger.info(f"Average time (secs) reading fmt:   {avg_read}")
-    logger.info(f"Average time (secs) writing fmt:   {avg_save}")
+        n = len(newfiles)
+        avg_readorig = total_readorig / n
+        avg_read = total_read / n
+        avg_save = total_save / n
+        avg_times[backend] = (avg_read, avg_save)
+        logger.info(f"Number of files processed: {len(newfiles)}")
+        logger.info(f"Average time (secs) reading origs: {avg_readorig}")
+        logger.info(f"Average time (secs) reading fmt:   {avg_read}")
+        logger.info(f"Average time (secs) writing fmt:   {avg_save}")
+
+    if len(backends) > 1:
+        base_read, base_save = avg_times[backends[0]]
+        for backend in backends[1:]:
+            avg_read, avg_save = avg_times[backend]
+            logger.info(f"Speedup of {backend} over {backends[0]}: "
+                        f"reading {base_read / avg_read:.2f}x, writing {base_save / avg_save:.2f}x")
+    gatenlpconfig.json_backend = None
+
+    run_stop(logger, "loadsave")
@@ -3,7 +3,7 @@ Module for Annotation class which represents information about a span of text in
 """
 import copy as lib_copy
 from functools import total_ordering
-from gatenlp.features import Features
+from gatenlp.features import Features, EMPTY_FEATURES
 from gatenlp.offsetmapper import OFFSET_TYPE_JAVA, OFFSET_TYPE_PYTHON
 from gatenlp.utils import support_annotation_or_set, allowspan
 from gatenlp.span import Span
@@ -20,8 +20,13 @@ class Annotation:
 
     All fields except the features are immutable, once the annotation has been created
     only the features can be changed.
+
+    Annotations without features all share the immutable `EMPTY_FEATURES` instance until the
+    features get accessed through the `features` property for the first time.
     """
 
+    __slots__ = ("_owner_set", "_features", "_type", "_start", "_end", "_id")
+
     @allowspan
     def __init__(
         self, start: int, end: int, anntype: str, features=None, annid: int = 0
@@ -56,7 +61,10 @@ class Annotation:
                 "id={annid}, features={features}: features must not be an int, mixed up with annid?"
             )
         self._owner_set = None
-        self._features = Features(features, logger=self._log_feature_change)
+        if features:
+            self._features = Features(features, logger=self._log_feature_change)
+        else:
+            self._features = EMPTY_FEATURES
         self._type = anntype
         self._start = start
         self._end = end
@@ -88,6 +96,8 @@ class Annotation:
         """
         Returns the features for the annotation.
         """
+        if self._features is EMPTY_FEATURES:
+            self._features = Features(logger=self._log_feature_change)
         return self._features
 
     @property
@@ -480,13 +490,14 @@ class Annotation:
         }
 
     @staticmethod
-    def from_dict(dictrepr, owner_set=None, **kwargs):
+    def from_dict(dictrepr, owner_set=None, features=True, **kwargs):
         """
         Construct an annotation object from the dictionary representation.
 
         Args:
           dictrepr: dictionary representation
           owner_set: the owning set the annotation should have (Default value = None)
+          features: if False, the features in the dictionary representation are ignored (Default value = True)
           kwargs: ignored
         """
         ann = Annotation(
@@ -494,7 +505,7 @@ class Annotation:
             dictrepr.get("end"),
             dictrepr.get("type"),
             annid=dictrepr.get("id"),
-            features=dictrepr.get("features"),
+            features=dictrepr.get("features") if features else None,
         )
         ann._owner_set = owner_set
         return ann
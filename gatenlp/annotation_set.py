@@ -8,9 +8,14 @@ from typing import Any, List, Union, Dict, Set, KeysView, Iterator, Generator
 from collections.abc import Iterable
 from collections import defaultdict
 import copy
+import heapq
+import weakref
+from contextlib import contextmanager
 from gatenlp.span import Span
 from gatenlp.annotation import Annotation
+from gatenlp.features import Features, EMPTY_FEATURES
 from gatenlp.impl import SortedIntvls
+from gatenlp.offsetmapper import OFFSET_TYPE_JAVA
 from gatenlp.utils import support_annotation_or_set, allowspan
 
 __pdoc__ = {
@@ -27,8 +32,24 @@ class InvalidOffsetError(KeyError):
     pass
 
 
+class _LazyAnnotations:
+    """
+    The serialized annotations of a lazily loaded annotation set: the annotations only get created, by
+    calling loader(annset, data), when the set gets used for the first time.
+    """
+
+    __slots__ = ("fmt", "data", "size", "offset_type", "loader")
+
+    def __init__(self, fmt, data, size, offset_type, loader):
+        self.fmt = fmt
+        self.data = data
+        self.size = size
+        self.offset_type = offset_type
+        self.loader = loader
+
+
 class AnnotationSet:
-    def __init__(self, name: str = "", owner_doc=None):
+    def __init__(self, name: str = "", owner_doc=None, index_class=None):
         """
         Creates an annotation set. This should not be used directly by the user, instead the
         method `Document.annset(name)` should be used to access the annotation set with a given
@@ -43,13 +64,36 @@ class AnnotationSet:
           owner_doc: if this is set, the set and all sets created from it can be queried for the
               owning document and offsets get checked against the text of the owning document, if it has
               text. Also, the changelog is only updated if an annotation set has an owning document.
+          index_class: the class to use for the offset indices, if None, uses SortedIntvls. This can be
+              any class which implements the same methods as `gatenlp.impl.SortedIntvls`, e.g.
+              `gatenlp.impl.ArrayIntvls`.
         """
         # print("CREATING annotation set {} with changelog {} ".format(name, changelog), file=sys.stderr)
         self._name = name
         self._owner_doc = owner_doc
+        if index_class is None:
+            index_class = SortedIntvls
+        self._index_class = index_class
         self._index_by_offset = None
         self._index_by_ol = None
         self._index_by_type = None
+        # map from annotation type to an offset index for just the annotations of that type, the index
+        # for a type gets created when it is needed first, if per-type offset indices are enabled
+        self._index_by_type_offset = None
+        self._type_offset_index = False
+        # if the offset indices are deferred, intervals of added annotations are collected here and
+        # merged into the offset indices before they get used next time
+        self._index_deferred = False
+        self._index_pending = []
+        # incremented whenever annotations get added or removed, so that views created from this set
+        # can tell if they can still use the indices of this set
+        self._version = 0
+        # views which have not yet fetched their annotations from this set, they do so before the set changes
+        self._views = None
+        # the annotations as lists in insertion order and in document order, for positional access,
+        # created when needed and discarded whenever annotations get added or removed
+        self._seq = None
+        self._seq_ordered = None
         # internally we represent the annotations as a map from annotation id (int) to Annotation
         self._annotations = {}
         self._is_immutable = False
@@ -88,6 +132,184 @@ class AnnotationSet:
         else:
             super().__setattr__(key, value)
 
+    def _init_detached(self, name: str, index_class, **fields) -> None:
+        """
+        Initializes the fields of an immutable detached set and sets the additional fields given, for
+        subclasses which do not store the annotations in the _annotations dict. This sets all the fields
+        at once, instead of going through __setattr__ for every field, because sets like this get created
+        for every query. This must initialize the same fields as __init__, except _annotations.
+        """
+        self.__dict__.update(
+            _name=name,
+            _owner_doc=None,
+            _index_class=index_class,
+            _index_by_offset=None,
+            _index_by_ol=None,
+            _index_by_type=None,
+            _index_by_type_offset=None,
+            _type_offset_index=False,
+            _index_deferred=False,
+            _index_pending=[],
+            _version=0,
+            _views=None,
+            _seq=None,
+            _seq_ordered=None,
+            _is_immutable=True,
+            _next_annid=0,
+        )
+        self.__dict__.update(fields)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the views of this set are not part of its state, the offset indices get re-created when needed
+        # and cannot always be pickled
+        state["_views"] = None
+        state["_index_by_offset"] = None
+        state["_index_by_ol"] = None
+        state["_index_by_type_offset"] = None
+        state["_index_pending"] = []
+        return state
+
+    def __getattr__(self, key):
+        # this only gets called for missing attributes: a lazily loaded set has no annotations dict
+        # until it gets used for the first time
+        if key == "_annotations" and "_lazy" in self.__dict__:
+            self._hydrate()
+            return self.__dict__["_annotations"]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{key}'")
+
+    @staticmethod
+    def _from_lazy(name, owner_doc, next_annid, size, fmt, data, loader, offset_type):
+        """
+        Creates a set which keeps the serialized annotations in data, in the serialization format fmt
+        and with offsets of offset_type, until the set gets used for the first time. Then the annotations get
+        created with loader(annset, data) and, if necessary, converted to the offset type of the owning document.
+        The number of annotations and the serialized data are available without creating the annotations.
+
+        Args:
+            name: the name of the set
+            owner_doc: the owning document
+            next_annid: the next annotation id of the set
+            size: the number of annotations
+            fmt: a name for the serialization format, so that serializers can tell if they can use the data
+            data: the serialized annotations
+            loader: the function which adds the annotations from the data to the set
+            offset_type: the offset type of the serialized annotations
+
+        Returns:
+            the annotation set
+        """
+        annset = AnnotationSet(name, owner_doc=owner_doc)
+        annset._next_annid = next_annid
+        del annset.__dict__["_annotations"]
+        annset.__dict__["_lazy"] = _LazyAnnotations(fmt, data, size, offset_type, loader)
+        return annset
+
+    def _is_lazy(self) -> bool:
+        """
+        Returns True if the annotations of this lazily loaded set have not been created yet.
+        """
+        return "_lazy" in self.__dict__
+
+    def _lazy_data(self, fmt, offset_type):
+        """
+        Returns the serialized annotations of a lazily loaded set which has not been used yet, if they are
+        in the format fmt and have offsets of offset_type, otherwise None.
+        """
+        lazy = self.__dict__.get("_lazy")
+        if lazy is not None and lazy.fmt == fmt and lazy.offset_type == offset_type:
+            return lazy.data
+        return None
+
+    def _hydrate(self) -> None:
+        """
+        Creates the annotations of a lazily loaded set from the serialized data.
+        """
+        lazy = self.__dict__.pop("_lazy")
+        self.__dict__["_annotations"] = {}
+        lazy.loader(self, lazy.data)
+        doc = self._owner_doc
+        if doc is not None and doc._text is not None and doc.offset_type != lazy.offset_type:
+            om = doc.offset_mapper
+            convert = om.convert_to_java if doc.offset_type == OFFSET_TYPE_JAVA else om.convert_to_python
+            anns = list(self._annotations.values())
+            offsets = convert([off for ann in anns for off in (ann._start, ann._end)])
+            for i, ann in enumerate(anns):
+                ann._start = offsets[2 * i]
+                ann._end = offsets[2 * i + 1]
+
+    @property
+    def index_class(self):
+        """
+        Get or set the class used for the offset indices of this set. Setting a different class
+        discards any offset index that has already been created, it gets re-created using the new
+        class when it is needed next time.
+        """
+        return self._index_class
+
+    @index_class.setter
+    def index_class(self, val) -> None:
+        if val is None:
+            val = SortedIntvls
+        if val is not self._index_class:
+            self._index_class = val
+            self._index_by_offset = None
+            self._index_by_ol = None
+            self._index_by_type_offset = None
+            self._index_pending = []
+
+    @property
+    def type_offset_index(self) -> bool:
+        """
+        Get or set if an additional offset index is kept for each annotation type which gets queried.
+        If this is True, queries for some types, e.g. `set.with_type("Token").within(sent)` or
+        `set.iter(start_ge=..., with_type="Token")`, only look at the annotations of these types, which is
+        much faster if the set contains many annotations of other types, but the index for a type needs as
+        much memory as the offset index for its annotations. If False (the default), these queries use
+        the offset index of the whole set and filter by type.
+
+        Setting this to False discards the per-type offset indices.
+        """
+        return self._type_offset_index
+
+    @type_offset_index.setter
+    def type_offset_index(self, val: bool) -> None:
+        self._type_offset_index = val
+        if not val:
+            self._index_by_type_offset = None
+
+    @property
+    def deferred_index(self) -> bool:
+        """
+        Get or set if updating the offset indices is deferred. If this is True, annotations which get added
+        to the set are not inserted into existing offset indices one by one but collected and merged into
+        the indices in bulk as soon as the indices are needed for the next query. This is much faster
+        when many annotations get added between queries, e.g. while the output of an annotator gets added.
+
+        Setting this back to False merges any collected annotations into the indices.
+        """
+        return self._index_deferred
+
+    @deferred_index.setter
+    def deferred_index(self, val: bool) -> None:
+        self._index_deferred = val
+        if not val:
+            self._merge_index_pending()
+
+    @contextmanager
+    def deferred_indexing(self):
+        """
+        Returns a context manager which defers updating the offset indices (see `deferred_index`) while
+        the block runs and restores the previous setting afterwards, also if an exception is raised, e.g.
+        `with annset.deferred_indexing(): ...` around adding many annotations.
+        """
+        deferred = self.deferred_index
+        self.deferred_index = True
+        try:
+            yield self
+        finally:
+            self.deferred_index = deferred
+
     def detach(self, restrict_to=None):
         """
         Creates an immutable and detached copy of this set, optionally restricted to the given annotation ids.
@@ -102,7 +324,7 @@ class AnnotationSet:
         Returns:
           an immutable annotation set
         """
-        annset = AnnotationSet(name="detached-from:" + self.name)
+        annset = AnnotationSet(name="detached-from:" + self.name, index_class=self._index_class)
         annset._is_immutable = True
         if restrict_to is None:
             annset._annotations = {
@@ -115,6 +337,19 @@ class AnnotationSet:
         annset._next_annid = self._next_annid
         return annset
 
+    def freeze(self):
+        """
+        Creates an immutable, detached and frozen copy of this set which stores the annotations in
+        columns (arrays of offsets, ids and types) instead of annotation objects. This needs much less memory
+        and if numpy is installed, the query methods of the frozen set are vectorized, which makes them faster
+        for sets which get queried a lot, e.g. all the annotations of a processed document.
+
+        Returns:
+          a `gatenlp.frozen_annotation_set.FrozenAnnotationSet`
+        """
+        from gatenlp.frozen_annotation_set import FrozenAnnotationSet
+        return FrozenAnnotationSet.from_annset(self)
+
     def detach_from(self, anns: Iterable):
         """
         Creates an immutable detached annotation set from the annotations in anns which could by
@@ -129,7 +364,7 @@ class AnnotationSet:
         Returns:
           an immutable detached annotation set
         """
-        annset = AnnotationSet(name="detached-from:" + self.name)
+        annset = AnnotationSet(name="detached-from:" + self.name, index_class=self._index_class)
         annset._is_immutable = True
         annset._annotations = {}
         nextid = -1
@@ -165,24 +400,49 @@ class AnnotationSet:
         """
         return self._owner_doc is None
 
+    def _merge_index_pending(self) -> None:
+        """
+        Merges the intervals collected while the index was deferred into the existing offset indices.
+        """
+        if not self._index_pending:
+            return
+        if self._index_by_offset is not None:
+            self._index_by_offset.update(self._index_pending)
+        if self._index_by_ol is not None:
+            self._index_by_ol.update(self._index_pending)
+        if self._index_by_type_offset:
+            bytype = defaultdict(list)
+            for intvl in self._index_pending:
+                bytype[self._annotations[intvl[2]].type].append(intvl)
+            for anntype, intvls in bytype.items():
+                index = self._index_by_type_offset.get(anntype)
+                if index is not None:
+                    index.update(intvls)
+        self._index_pending = []
+
     def _create_index_by_offset(self) -> None:
         """
         Generates the offset index, if it does not already exist.
         The offset index is an interval tree that stores the annotation ids for the offset interval of the annotation.
+        The index is created from all annotations at once.
         """
+        self._merge_index_pending()
         if self._index_by_offset is None:
-            self._index_by_offset = SortedIntvls()
-            for ann in self._annotations.values():
-                self._index_by_offset.add(ann.start, ann.end, ann.id)
+            self._index_by_offset = self._index_class()
+            self._index_by_offset.update(
+                [(ann.start, ann.end, ann.id) for ann in self._annotations.values()]
+            )
 
     def _create_index_by_ol(self) -> None:
         """
         Generates an index by start offset, end offset and annotation id
         """
+        self._merge_index_pending()
         if self._index_by_ol is None:
-            self._index_by_ol = SortedIntvls(by_ol=True)
-            for ann in self._annotations.values():
-                self._index_by_ol.add(ann.start, ann.end, ann.id)
+            self._index_by_ol = self._index_class(by_ol=True)
+            self._index_by_ol.update(
+                [(ann.start, ann.end, ann.id) for ann in self._annotations.values()]
+            )
 
     def _create_index_by_type(self) -> None:
         """Generates the type index, if it does not already exist. The type index is a map from
@@ -193,6 +453,87 @@ class AnnotationSet:
             for ann in self._annotations.values():
                 self._index_by_type[ann.type].add(ann.id)
 
+    def _create_index_by_type_offset(self, anntype: str):
+        """
+        Generates the offset index for the annotations of the given type, if it does not already exist,
+        and returns it. The index is an interval index just like the offset index, but only contains
+        the annotations of that type and is kept up to date when annotations get added or removed.
+
+        Args:
+          anntype: the annotation type
+
+        Returns:
+          the offset index for the type
+        """
+        self._merge_index_pending()
+        if self._index_by_type_offset is None:
+            self._index_by_type_offset = {}
+        index = self._index_by_type_offset.get(anntype)
+        if index is None:
+            self._create_index_by_type()
+            annotations = self._annotations
+            index = self._index_class()
+            index.update(
+                [
+                    (annotations[annid].start, annotations[annid].end, annid)
+                    for annid in self._index_by_type.get(anntype, ())
+                ]
+            )
+            self._index_by_type_offset[anntype] = index
+        return index
+
+    def _typed_query(self, anntypes, query: str, *args, ignore=None):
+        """
+        Runs the given query method on the offset indices for the given annotation types, or on the
+        offset index of the set if there are no per-type offset indices, and returns a view with the
+        matching annotations of these types in document order.
+
+        Args:
+          anntypes: an iterable of annotation types
+          query: the name of the interval index method, e.g. "within"
+          *args: the arguments to pass on to the index method
+          ignore: an optional annotation id that should not get included in the result
+
+        Returns:
+          an AnnotationSetView
+        """
+        if not self._type_offset_index:
+            self._create_index_by_offset()
+            return self._restrict_intvs(
+                self._filter_types(getattr(self._index_by_offset, query)(*args), anntypes),
+                ignore=ignore, ordered=True,
+            )
+        results = [
+            getattr(self._create_index_by_type_offset(anntype), query)(*args)
+            for anntype in anntypes
+        ]
+        if len(results) == 1:
+            intvs = results[0]
+        else:
+            intvs = heapq.merge(*results, key=lambda intvl: (intvl[0], intvl[2]))
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
+
+    def _filter_types(self, intvs, anntypes):
+        """
+        Yields the intervals of annotations with one of the given types.
+        """
+        annotations = self._annotations
+        for intvl in intvs:
+            if annotations[intvl[2]].type in anntypes:
+                yield intvl
+
+    def _modified(self) -> None:
+        """
+        Must get called before annotations get added to or removed from the set.
+        """
+        self._version += 1
+        self._seq = None
+        self._seq_ordered = None
+        if self._views:
+            for view in list(self._views):
+                view._fetch_anns()
+            self._views = None
+
     def _add_to_indices(self, annotation: Annotation) -> None:
         """
         If we have created the indices, add the annotation to them.
@@ -203,8 +544,19 @@ class AnnotationSet:
         """
         if self._index_by_type is not None:
             self._index_by_type[annotation.type].add(annotation.id)
+        if self._index_by_offset is None and self._index_by_ol is None and not self._index_by_type_offset:
+            return
+        if self._index_deferred:
+            self._index_pending.append((annotation.start, annotation.end, annotation.id))
+            return
         if self._index_by_offset is not None:
             self._index_by_offset.add(annotation.start, annotation.end, annotation.id)
+        if self._index_by_ol is not None:
+            self._index_by_ol.add(annotation.start, annotation.end, annotation.id)
+        if self._index_by_type_offset:
+            index = self._index_by_type_offset.get(annotation.type)
+            if index is not None:
+                index.add(annotation.start, annotation.end, annotation.id)
 
     def _remove_from_indices(self, annotation: Annotation) -> None:
         """Remove an annotation from the indices.
@@ -213,10 +565,17 @@ class AnnotationSet:
           annotation: the annotation to remove.
           annotation: Annotation:
         """
+        self._merge_index_pending()
         if self._index_by_offset is not None:
             self._index_by_offset.remove(
                 annotation.start, annotation.end, annotation.id
             )
+        if self._index_by_ol is not None:
+            self._index_by_ol.remove(annotation.start, annotation.end, annotation.id)
+        if self._index_by_type_offset:
+            index = self._index_by_type_offset.get(annotation.type)
+            if index is not None:
+                index.remove(annotation.start, annotation.end, annotation.id)
         if self._index_by_type is not None:
             self._index_by_type[annotation.type].remove(annotation.id)
 
@@ -257,19 +616,24 @@ class AnnotationSet:
                 ret.add(i[2])
         return ret
 
-    def _restrict_intvs(self, intvs, ignore=None):
+    def _restrict_intvs(self, intvs, ignore=None, ordered=False):
         """
+        Create a view of this set for the annotations of the intervals.
 
         Args:
-          intvs:
-          ignore:  (Default value = None)
+          intvs: iterable of interval tuples
+          ignore: an optional annotation id that should not get included in the result (Default value = None)
+          ordered: True if the intervals are in document order, i.e. ordered by start offset and annotation id
 
         Returns:
-
+          an AnnotationSetView
         """
-        return self.detach(
-            restrict_to=AnnotationSet._intvs2idlist(intvs, ignore=ignore)
-        )
+        annotations = self._annotations
+        if ignore is not None:
+            anns = [annotations[i[2]] for i in intvs if i[2] != ignore]
+        else:
+            anns = [annotations[i[2]] for i in intvs]
+        return AnnotationSetView(self, anns, ordered=ordered)
 
     def __len__(self) -> int:
         """
@@ -277,6 +641,9 @@ class AnnotationSet:
 
         :return: number of annotations
         """
+        lazy = self.__dict__.get("_lazy")
+        if lazy is not None:
+            return lazy.size
         return len(self._annotations)
 
     @property
@@ -284,7 +651,7 @@ class AnnotationSet:
         """
         Returns the number of annotations in the annotation set.
         """
-        return len(self._annotations)
+        return len(self)
 
     @property
     def document(self):
@@ -406,9 +773,13 @@ class AnnotationSet:
             raise Exception(
                 "Cannot add annotation with id {}, already in set".format(annid)
             )
+        self._modified()
         if annid is None:
             annid = self._next_annid
             self._next_annid = self._next_annid + 1
+        elif annid >= self._next_annid:
+            # make sure that ids which get assigned automatically later do not clash with this one
+            self._next_annid = annid + 1
         ann = Annotation(start, end, anntype, features=features, annid=annid)
         ann._owner_set = self
         if not self._annotations:
@@ -428,6 +799,45 @@ class AnnotationSet:
             self.changelog.append(entry)
         return ann
 
+    def _load_columns(self, starts, ends, anntypes, annids, features=None) -> None:
+        """
+        Creates annotations from the columns of start offsets, end offsets, types, ids and
+        feature dictionaries (None for no features) and adds them to this set. This is meant for
+        deserializers which create the set from trusted data: the annotations get created in bulk without
+        any checks, the feature dictionaries are used as they are and nothing gets logged in the changelog.
+
+        Args:
+            starts: iterable of start offsets
+            ends: iterable of end offsets
+            anntypes: iterable of annotation types
+            annids: iterable of annotation ids
+            features: iterable of feature dictionaries or None, if None, all annotations have no features
+        """
+        self._modified()
+        annotations = self._annotations
+        new = Annotation.__new__
+        if features is None:
+            features = [None] * len(annids)
+        for start, end, anntype, annid, feats in zip(starts, ends, anntypes, annids, features):
+            ann = new(Annotation)
+            ann._owner_set = self
+            ann._type = anntype
+            ann._start = start
+            ann._end = end
+            ann._id = annid
+            if feats:
+                ann._features = Features(logger=ann._log_feature_change)
+                ann._features.data = feats
+            else:
+                ann._features = EMPTY_FEATURES
+            annotations[annid] = ann
+        # the indices get re-created from all annotations in bulk when they are needed next
+        self._index_by_offset = None
+        self._index_by_ol = None
+        self._index_by_type = None
+        self._index_by_type_offset = None
+        self._index_pending = []
+
     def add_ann(self, ann, annid: int = None):
         """
         Adds a shallow copy of the given ann to the annotation set, either with a new annotation id or
@@ -488,6 +898,7 @@ class AnnotationSet:
         # NOTE: once the annotation has been removed from the set, it could still be referenced
         # somewhere else and its features could get modified. In order to prevent logging of such changes,
         # the owning set gets cleared for the annotation
+        self._modified()
         annoriter._owner_set = None
         del self._annotations[annid]
         if self.changelog is not None:
@@ -500,9 +911,13 @@ class AnnotationSet:
         """
         Removes all annotations from the set.
         """
+        self._modified()
         self._annotations.clear()
         self._index_by_offset = None
+        self._index_by_ol = None
         self._index_by_type = None
+        self._index_by_type_offset = None
+        self._index_pending = []
         if self.changelog is not None:
             self.changelog.append({"command": "annotations:clear", "set": self.name})
 
@@ -516,6 +931,7 @@ class AnnotationSet:
         Args:
           memo: for internal use by our __deepcopy__ implementation.
         """
+        self._modified()
         tmpdict = {}
         for annid, ann in self._annotations.items():
             newann = copy.deepcopy(ann, memo=memo)
@@ -585,10 +1001,12 @@ class AnnotationSet:
         Yields annotations ordered by starting annotation and annotation id, otionally limited
         by the other parameters.
 
+        If with_type is specified, this uses the offset indices for just the annotations of those types.
+
         Args:
           start_ge: the offset from where to start including annotations
-          start_lt: the last offset to use as the starting offset of an annotation
-          with_type: only annotations of this type
+          start_lt: the offset before which annotations must start
+          with_type: only annotations of this type or of any of the types in this iterable
           reverse: process in reverse document order
 
         Yields:
@@ -598,7 +1016,7 @@ class AnnotationSet:
 
         if with_type is not None:
             allowedtypes = set()
-            if isinstance(type, str):
+            if isinstance(with_type, str):
                 allowedtypes.add(with_type)
             else:
                 for atype in with_type:
@@ -607,25 +1025,40 @@ class AnnotationSet:
             allowedtypes = None
         if not self._annotations:
             return
-        maxoff = None
         if start_ge is not None:
             assert start_ge >= 0
         if start_lt is not None:
             assert start_lt >= 1
-            maxoff = start_lt + 1
         if start_lt is not None and start_ge is not None:
             assert start_lt > start_ge
-        self._create_index_by_offset()
-        for _start, _end, annid in self._index_by_offset.irange(
-            minoff=start_ge, maxoff=maxoff, reverse=reverse
-        ):
-            if (
-                allowedtypes is not None
-                and self._annotations[annid].type not in allowedtypes
-            ):
-                continue
+        intvs = self._irange(
+            minoff=start_ge, maxoff=start_lt, reverse=reverse, inclusive=(True, False), anntypes=allowedtypes
+        )
+        for _start, _end, annid in intvs:
             yield self._annotations[annid]
 
+    def _irange(self, minoff=None, maxoff=None, reverse=False, inclusive=(True, True), anntypes=None):
+        """
+        Yields the intervals with a start offset between minoff and maxoff in document order, from the
+        offset index or, if anntypes is not None, only those of annotations with these types, from the
+        offset indices for those types if they are enabled.
+        """
+        if anntypes is None or not self._type_offset_index:
+            self._create_index_by_offset()
+            intvs = self._index_by_offset.irange(
+                minoff=minoff, maxoff=maxoff, reverse=reverse, inclusive=inclusive
+            )
+            return intvs if anntypes is None else self._filter_types(intvs, anntypes)
+        results = [
+            self._create_index_by_type_offset(atype).irange(
+                minoff=minoff, maxoff=maxoff, reverse=reverse, inclusive=inclusive
+            )
+            for atype in anntypes
+        ]
+        if len(results) == 1:
+            return results[0]
+        return heapq.merge(*results, key=lambda intvl: (intvl[0], intvl[2]), reverse=reverse)
+
     def iter_ol(
         self,
         start_ge: Union[int, None] = None,
@@ -640,8 +1073,8 @@ class AnnotationSet:
 
         Args:
           start_ge: the offset from where to start including annotations
-          start_lt: the last offset to use as the starting offset of an annotation
-          with_type: only annotations of this type
+          start_lt: the offset before which annotations must start
+          with_type: only annotations of this type or of any of the types in this iterable
           reverse: process in reverse document order
 
         Yields:
@@ -651,7 +1084,7 @@ class AnnotationSet:
 
         if with_type is not None:
             allowedtypes = set()
-            if isinstance(type, str):
+            if isinstance(with_type, str):
                 allowedtypes.add(with_type)
             else:
                 for atype in with_type:
@@ -660,17 +1093,15 @@ class AnnotationSet:
             allowedtypes = None
         if not self._annotations:
             return
-        maxoff = None
         if start_ge is not None:
             assert start_ge >= 0
         if start_lt is not None:
             assert start_lt >= 1
-            maxoff = start_lt + 1
         if start_lt is not None and start_ge is not None:
             assert start_lt > start_ge
         self._create_index_by_ol()
         for _start, _end, annid in self._index_by_ol.irange(
-            minoff=start_ge, maxoff=maxoff, reverse=reverse
+            minoff=start_ge, maxoff=start_lt, reverse=reverse, inclusive=(True, False)
         ):
             if (
                 allowedtypes is not None
@@ -723,6 +1154,23 @@ class AnnotationSet:
             annid = annid.id
         return self._annotations.get(annid, default)
 
+    def _sequence(self, ordered: bool = False) -> List[Annotation]:
+        """
+        Returns the list of all annotations in insertion order or, if ordered is True, in document order.
+        The list gets created once and is kept until annotations get added to or removed from the set,
+        so positional access is O(1). The list must not get modified.
+        """
+        if ordered:
+            if self._seq_ordered is None:
+                if self._index_by_offset is not None and not self._index_pending:
+                    self._seq_ordered = list(self.iter())
+                else:
+                    self._seq_ordered = sorted(self._annotations.values(), key=lambda ann: (ann.start, ann.id))
+            return self._seq_ordered
+        if self._seq is None:
+            self._seq = list(self._annotations.values())
+        return self._seq
+
     def first(self):
         """
         Return the first (or only) annotation in the set by offset.
@@ -736,6 +1184,8 @@ class AnnotationSet:
             raise Exception("Empty set, there is no first annotation")
         elif sz == 1:
             return next(iter(self._annotations.values()))
+        if self._seq_ordered is not None:
+            return self._seq_ordered[0]
         self._create_index_by_offset()
         _, _, annid = next(self._index_by_offset.irange(reverse=False))
         return self._annotations[annid]
@@ -753,27 +1203,38 @@ class AnnotationSet:
             raise Exception("Empty set, there is no last annotation")
         elif sz == 1:
             return next(iter(self._annotations.values()))
+        if self._seq_ordered is not None:
+            return self._seq_ordered[-1]
         self._create_index_by_offset()
         _, _, annid = next(self._index_by_offset.irange(reverse=True))
         return self._annotations[annid]
 
-    def for_idx(self, idx, default=None):
+    def for_idx(self, idx, default=None, ordered=False):
         """
         Return the annotation corresponding to the index idx in the set. This returns the
         annotation stored at the index, as added to the set. The order usually depends on the insertion time.
         If no annotation with the given index is specified, the value specified for `default` is returned.
 
+        The list of annotations to index into is kept until the set gets changed, so calling this for all
+        the indices of a set is linear in the number of annotations.
+
+        Views (the sets returned by queries) and frozen sets always index into their annotations in document
+        order, independent of `ordered`.
+
         Args:
-            idx:  index of the annotation in the set
+            idx:  index of the annotation in the set or a slice, in which case the list of annotations
+                for the slice is returned
             default: default value to return if now annotation with the given index exists
+            ordered: if True, index into the annotations in document order instead of insertion order
 
         Returns:
             the annotation with the given index or the default value
         """
-        # TODO: we could make this more memory efficient (but slower) by iterating over values until getting idxth
-        tmplist = list(self._annotations.values())
-        if idx < len(tmplist):
-            return tmplist[idx]
+        seq = self._sequence(ordered=ordered)
+        if isinstance(idx, slice):
+            return seq[idx]
+        if -len(seq) <= idx < len(seq):
+            return seq[idx]
         else:
             return default
 
@@ -814,69 +1275,69 @@ class AnnotationSet:
                 for t in atype:
                     atypes.append(t)
         if not atypes:
-            return self.detach()
+            return AnnotationSetView(self, list(self._annotations.values()))
         self._create_index_by_type()
+        if not non_overlapping:
+            return AnnotationSetView(self, None, anntypes=list(dict.fromkeys(atypes)))
         annids = set()
         for t in atypes:
             idxs = self._index_by_type.get(t)
             if idxs:
                 annids.update(idxs)
-        if non_overlapping:
-            # need to get annotations grouped by start offset and sorted according to
-            # what the Annotation class defines
-            allanns = sorted(annids, key=lambda x: self._annotations[x])
-            allanns = [self._annotations[x] for x in allanns]
-            allannsgrouped = []
-            curstart = None
-            curset = None
-            for ann in allanns:
-                if curstart is None:
-                    curset = [ann]
-                    curstart = ann.start
-                elif curstart == ann.start:
-                    curset.append(ann)
-                else:
-                    allannsgrouped.append(curset)
-                    curset = [ann]
-                    curstart = ann.start
-            if curset:
+        # need to get annotations grouped by start offset and sorted according to
+        # what the Annotation class defines
+        allanns = sorted(annids, key=lambda x: self._annotations[x])
+        allanns = [self._annotations[x] for x in allanns]
+        allannsgrouped = []
+        curstart = None
+        curset = None
+        for ann in allanns:
+            if curstart is None:
+                curset = [ann]
+                curstart = ann.start
+            elif curstart == ann.start:
+                curset.append(ann)
+            else:
                 allannsgrouped.append(curset)
-            retanns = []
-            # now go through all the grouped annoations and select the top priority one
-            # then skip to the next group that does not overlap with the one we just selected
-            typepriority = dict()
-            for i, atype in enumerate(atypes):
-                typepriority[atype] = len(atypes) - i
-            curminoffset = 0
-            for group in allannsgrouped:
-                # instead of sorting, go through the group and find the top priority one
-                topann = None
-                if len(group) == 1:
-                    if group[0].start >= curminoffset:
-                        topann = group[0]
-                elif len(group) == 0:
-                    raise Exception("We should never get a 0 size group here!")
-                else:
-                    for i, ann in enumerate(group):
-                        if ann.start >= curminoffset:
-                            topann = ann
-                            break
-                    for ann in group[i + 1:]:
-                        if ann.start < curminoffset:
-                            continue
-                        if typepriority[ann.type] > typepriority[topann.type]:
+                curset = [ann]
+                curstart = ann.start
+        if curset:
+            allannsgrouped.append(curset)
+        retanns = []
+        # now go through all the grouped annoations and select the top priority one
+        # then skip to the next group that does not overlap with the one we just selected
+        typepriority = dict()
+        for i, atype in enumerate(atypes):
+            typepriority[atype] = len(atypes) - i
+        curminoffset = 0
+        for group in allannsgrouped:
+            # instead of sorting, go through the group and find the top priority one
+            topann = None
+            if len(group) == 1:
+                if group[0].start >= curminoffset:
+                    topann = group[0]
+            elif len(group) == 0:
+                raise Exception("We should never get a 0 size group here!")
+            else:
+                for i, ann in enumerate(group):
+                    if ann.start >= curminoffset:
+                        topann = ann
+                        break
+                for ann in group[i + 1:]:
+                    if ann.start < curminoffset:
+                        continue
+                    if typepriority[ann.type] > typepriority[topann.type]:
+                        topann = ann
+                    elif typepriority[ann.type] == typepriority[topann.type]:
+                        if ann.end > topann.end:
                             topann = ann
-                        elif typepriority[ann.type] == typepriority[topann.type]:
-                            if ann.end > topann.end:
+                        elif ann.end == topann.end:
+                            if ann.id > topann.id:
                                 topann = ann
-                            elif ann.end == topann.end:
-                                if ann.id > topann.id:
-                                    topann = ann
-                if topann is not None:
-                    retanns.append(topann)
-                    curminoffset = topann.end
-            annids = [ann.id for ann in retanns]
-        return self.detach(restrict_to=annids)
+            if topann is not None:
+                retanns.append(topann)
+                curminoffset = topann.end
+        return AnnotationSetView(self, retanns)
 
     def by_offset(self):
         """
@@ -950,7 +1411,7 @@ class AnnotationSet:
             ignore = annid
         else:
             ignore = None
-        return self._restrict_intvs(intvs, ignore=ignore)
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
 
     @support_annotation_or_set
     def start_min_ge(
@@ -1017,7 +1478,7 @@ class AnnotationSet:
             ignore = annid
         else:
             ignore = None
-        return self._restrict_intvs(intvs, ignore=ignore)
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
 
     @support_annotation_or_set
     def start_lt(self, offset: int, ignored: Any = None, annid=None):
@@ -1036,7 +1497,7 @@ class AnnotationSet:
         """
         self._create_index_by_offset()
         intvs = self._index_by_offset.starting_before(offset)
-        return self._restrict_intvs(intvs)
+        return self._restrict_intvs(intvs, ordered=True)
 
     @support_annotation_or_set
     def overlapping(self, start: int, end: int, annid=None, include_self=False):
@@ -1063,7 +1524,7 @@ class AnnotationSet:
             ignore = annid
         else:
             ignore = None
-        return self._restrict_intvs(intvs, ignore=ignore)
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
 
     @support_annotation_or_set
     def covering(self, start: int, end: int, annid=None, include_self=False):
@@ -1090,7 +1551,7 @@ class AnnotationSet:
             ignore = annid
         else:
             ignore = None
-        return self._restrict_intvs(intvs, ignore=ignore)
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
 
     @support_annotation_or_set
     def within(self, start: int, end: int, annid=None, include_self=False):
@@ -1120,7 +1581,7 @@ class AnnotationSet:
             ignore = annid
         else:
             ignore = None
-        return self._restrict_intvs(intvs, ignore=ignore)
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
 
     @support_annotation_or_set
     def coextensive(self, start: int, end: int, annid=None, include_self=False):
@@ -1145,7 +1606,130 @@ class AnnotationSet:
             ignore = annid
         else:
             ignore = None
-        return self._restrict_intvs(intvs, ignore=ignore)
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
+
+    @staticmethod
+    def _sorted_spans(spans) -> List[tuple]:
+        """
+        Converts the spans for one of the batch query methods to a list of tuples
+        (start, end, annid, position) sorted by start offset, where annid is None if the span is
+        not an annotation and position is the index of the span in the original iterable.
+        """
+        ret = []
+        for pos, span in enumerate(spans):
+            if isinstance(span, Annotation):
+                ret.append((span.start, span.end, span.id, pos))
+            elif hasattr(span, "start") and hasattr(span, "end"):
+                ret.append((span.start, span.end, None, pos))
+            else:
+                start, end = span
+                ret.append((start, end, None, pos))
+        ret.sort(key=lambda x: x[0])
+        return ret
+
+    def _views_for(self, idlists: List[List[int]]) -> List["AnnotationSetView"]:
+        """
+        Creates a view for each of the lists of annotation ids, which must be in document order.
+        """
+        annotations = self._annotations
+        return [
+            AnnotationSetView(self, [annotations[annid] for annid in annids], ordered=True)
+            for annids in idlists
+        ]
+
+    def within_many(self, spans: Iterable, include_self: bool = False) -> List["AnnotationSet"]:
+        """
+        Gets the annotations within each of the given spans. This returns the same as calling `within` for
+        each of the spans, but finds the annotations for all spans in a single sweep over the offset index,
+        which is much faster for many spans, e.g. to get the annotations for each sentence in a document.
+
+        Args:
+          spans: an iterable of annotations, spans or (start, end) tuples. This is fastest if the spans are
+            already sorted by start offset.
+          include_self: if True, include an annotation in the result for itself if it is in this set.
+
+        Returns:
+          a list with an immutable annotation set for each span, in the order of the spans.
+        """
+        return self._views_for(self._within_many(spans, include_self=include_self))
+
+    def _within_many(self, spans: Iterable, include_self: bool = False, anntypes=None) -> List[List[int]]:
+        """
+        Implements within_many, returns the list of annotation ids for each span.
+        """
+        spans = AnnotationSet._sorted_spans(spans)
+        idlists = [[] for _ in spans]
+        if not spans:
+            return idlists
+        for start, end, _, _ in spans:
+            if start > end:
+                raise Exception("Invalid offset range: {},{}".format(start, end))
+        maxend = max(span[1] for span in spans)
+        nspans = len(spans)
+        nextspan = 0
+        # the spans which start at or before the start of the current interval and do not end before it,
+        # and the smallest end offset of those
+        active = []
+        minend = -1
+        for start, end, annid in self._irange(minoff=spans[0][0], maxoff=maxend, anntypes=anntypes):
+            if nextspan < nspans and spans[nextspan][0] <= start:
+                while nextspan < nspans and spans[nextspan][0] <= start:
+                    active.append(spans[nextspan])
+                    nextspan += 1
+                minend = -1
+            if start > minend:
+                active = [span for span in active if span[1] >= start]
+                if not active:
+                    if nextspan == nspans:
+                        break
+                    continue
+                minend = min(span[1] for span in active)
+            for spanstart, spanend, spanannid, pos in active:
+                if end <= spanend and (include_self or annid != spanannid):
+                    idlists[pos].append(annid)
+        return idlists
+
+    def covering_many(self, spans: Iterable, include_self: bool = False) -> List["AnnotationSet"]:
+        """
+        Gets the annotations covering each of the given spans. This returns the same as calling `covering`
+        for each of the spans, but finds the annotations for all spans in a single sweep over the
+        offset index, which is much faster for many spans, e.g. to get the covering sentence for each token.
+
+        Args:
+          spans: an iterable of annotations, spans or (start, end) tuples. This is fastest if the spans are
+            already sorted by start offset.
+          include_self: if True, include an annotation in the result for itself if it is in this set.
+
+        Returns:
+          a list with an immutable annotation set for each span, in the order of the spans.
+        """
+        return self._views_for(self._covering_many(spans, include_self=include_self))
+
+    def _covering_many(self, spans: Iterable, include_self: bool = False, anntypes=None) -> List[List[int]]:
+        """
+        Implements covering_many, returns the list of annotation ids for each span.
+        """
+        spans = AnnotationSet._sorted_spans(spans)
+        idlists = [[] for _ in spans]
+        if not spans:
+            return idlists
+        intvs = iter(self._irange(maxoff=spans[-1][0], anntypes=anntypes))
+        nextintvl = next(intvs, None)
+        # the intervals which start at or before the start of the current span and do not end before it
+        active = []
+        for spanstart, spanend, spanannid, pos in spans:
+            while nextintvl is not None and nextintvl[0] <= spanstart:
+                active.append(nextintvl)
+                nextintvl = next(intvs, None)
+            active = [intvl for intvl in active if intvl[1] >= spanstart]
+            idlist = idlists[pos]
+            for start, end, annid in active:
+                # a zero length span is not covered by an annotation which starts before and ends at it
+                if end < spanend or (spanstart == spanend and start < spanstart and end == spanend):
+                    continue
+                if include_self or annid != spanannid:
+                    idlist.append(annid)
+        return idlists
 
     @support_annotation_or_set
     def before(
@@ -1211,7 +1795,7 @@ class AnnotationSet:
             ignore = annid
         else:
             ignore = None
-        return self._restrict_intvs(intvs, ignore=ignore)
+        return self._restrict_intvs(intvs, ignore=ignore, ordered=True)
 
     @property
     def span(self) -> Span:
@@ -1279,28 +1863,44 @@ class AnnotationSet:
         }
 
     @staticmethod
-    def from_dict(dictrepr, owner_doc=None, **kwargs):
+    def from_dict(dictrepr, owner_doc=None, anntypes=None, **kwargs):
         """
         Create an AnnotationSet from its dict representation and optionally set the owning document.
 
         Args:
           dictrepr: the dict representation of the annotation set
           owner_doc:  the owning document
-          **kwargs: passed on to the creation of annotations
+          anntypes: if not None, only create the annotations of those types
+          **kwargs: passed on to the creation of annotations, e.g. features=False to ignore the
+              annotation features
 
         Returns:
             the annotation set
         """
         annset = AnnotationSet(dictrepr.get("name"), owner_doc=owner_doc)
         annset._next_annid = dictrepr.get("next_annid")
+        annset._load_dict(dictrepr, anntypes=anntypes, **kwargs)
+        return annset
+
+    def _load_dict(self, dictrepr, anntypes=None, **kwargs) -> None:
+        """
+        Sets the annotations of this set to the ones in the dict representation of a set.
+
+        Args:
+          dictrepr: the dict representation of the annotation set
+          anntypes: if not None, only create the annotations of those types
+          **kwargs: passed on to the creation of annotations
+        """
         if dictrepr.get("annotations"):
-            annset._annotations = dict(
-                (int(a["id"]), Annotation.from_dict(a, owner_set=annset, **kwargs))
-                for a in dictrepr.get("annotations")
+            anns = dictrepr.get("annotations")
+            if anntypes is not None:
+                anns = [a for a in anns if a["type"] in anntypes]
+            self._annotations = dict(
+                (int(a["id"]), Annotation.from_dict(a, owner_set=self, **kwargs))
+                for a in anns
             )
         else:
-            annset._annotations = {}
-        return annset
+            self._annotations = {}
 
     @staticmethod
     def from_anns(anns, deep_copy=False, **kwargs):
@@ -1329,3 +1929,309 @@ class AnnotationSet:
         annset._is_immutable = True
 
         return annset
+
+
+class AnnotationSetView(AnnotationSet):
+    """
+    An immutable, detached annotation set which is a lazy view of some of the annotations of another
+    annotation set. This is what the query methods of an annotation set, e.g. `within` or `with_type`
+    return.
+
+    The view only holds a reference to the set it was created from and the list of matching annotations,
+    or, for a view returned by `with_type`, just the annotation types. Getting the length of the view,
+    iterating over it in document order, checking if it contains an annotation or getting the first or
+    last annotation does not create anything. The offset queries `within`, `covering`, `overlapping`,
+    `startingat` and `coextensive` and the `with_type` method use the indices of the set the view was
+    created from, as long as that set has not been modified since. For a view returned by `with_type`,
+    the offset indices for just the annotations of those types are used, so
+    `annset.with_type("Token").within(sent)` only needs to look at the tokens within the sentence.
+
+    Anything else works exactly as for a detached annotation set: the first time the view is used in some
+    other way, the map from annotation id to annotation is created and from then on the view behaves
+    like any other detached annotation set.
+    """
+
+    def __init__(
+        self,
+        parent: AnnotationSet,
+        anns: Union[List[Annotation], None],
+        ordered: bool = False,
+        anntypes: Union[List[str], None] = None,
+    ):
+        """
+        Create a view. This should not be used directly, views are returned by the query methods of
+        an annotation set.
+
+        Args:
+            parent: the annotation set the annotations are from
+            anns: the list of annotations in the view or None if anntypes is specified
+            ordered: True if the annotations are in document order
+            anntypes: if anns is None, the view contains all annotations of these types
+        """
+        self._init_detached(
+            "detached-from:" + parent.name,
+            parent._index_class,
+            _parent=parent,
+            _parent_version=parent._version,
+            _anns=anns,
+            _anns_dict=None,
+            _annids=None,
+            _ordered=ordered,
+            _anntypes=anntypes,
+            _next_annid=parent._next_annid,
+        )
+        if anns is None:
+            if parent._views is None:
+                parent._views = weakref.WeakSet()
+            parent._views.add(self)
+
+    @property
+    def _annotations(self):
+        if self._anns_dict is None:
+            self._anns_dict = {ann.id: ann for ann in self._fetch_anns()}
+        return self._anns_dict
+
+    @_annotations.setter
+    def _annotations(self, val):
+        self._anns_dict = val
+
+    def _fetch_anns(self) -> List[Annotation]:
+        """
+        Returns the list of annotations in the view, for a view for some annotation types, this
+        gets the annotations from the parent set in document order.
+        """
+        if self._anns is None:
+            self._anns = list(self._parent.iter(with_type=self._anntypes))
+            self._ordered = True
+        return self._anns
+
+    def _sequence(self, ordered: bool = False) -> List[Annotation]:
+        """
+        Returns the list of annotations in the view, which is always the list in document order.
+        """
+        if self._anns_dict is not None:
+            return super()._sequence(ordered=True)
+        anns = self._fetch_anns()
+        if not self._ordered:
+            anns.sort(key=lambda ann: (ann.start, ann.id))
+            self._ordered = True
+        return anns
+
+    def _use_parent(self) -> bool:
+        """
+        Returns True if queries can be answered from the indices of the parent set.
+        """
+        return self._anns_dict is None and self._parent._version == self._parent_version
+
+    def _restrict_view(self, view: "AnnotationSetView") -> "AnnotationSetView":
+        """
+        Restricts a view of the parent set to the annotations which are also in this view.
+        """
+        if self._annids is None:
+            self._annids = set(ann.id for ann in self._anns)
+        annids = self._annids
+        return AnnotationSetView(
+            self._parent, [ann for ann in view._anns if ann.id in annids], ordered=view._ordered
+        )
+
+    def __len__(self) -> int:
+        if self._anns_dict is not None:
+            return len(self._anns_dict)
+        if self._anns is None:
+            index_by_type = self._parent._index_by_type
+            return sum(len(index_by_type.get(anntype, ())) for anntype in self._anntypes)
+        return len(self._anns)
+
+    @property
+    def size(self) -> int:
+        """
+        Returns the number of annotations in the annotation set.
+        """
+        return len(self)
+
+    def __contains__(self, annorannid: Union[int, Annotation]) -> bool:
+        if self._anns_dict is not None:
+            return super().__contains__(annorannid)
+        if self._anns is None:
+            ann = self._parent._annotations.get(
+                annorannid.id if isinstance(annorannid, Annotation) else annorannid
+            )
+            return ann is not None and ann.type in self._anntypes
+        if self._annids is None:
+            self._annids = set(ann.id for ann in self._anns)
+        if isinstance(annorannid, Annotation):
+            return annorannid.id in self._annids
+        return annorannid in self._annids
+
+    contains = __contains__
+
+    def fast_iter(self) -> Generator:
+        """
+        Yields annotations in the order they were found, or in document order once the view has been
+        iterated over in document order.
+        """
+        if self._anns_dict is None:
+            yield from self._fetch_anns()
+        else:
+            yield from super().fast_iter()
+
+    def iter(
+        self,
+        start_ge: Union[int, None] = None,
+        start_lt: Union[None, int] = None,
+        with_type: str = None,
+        reverse: bool = False,
+    ) -> Iterator:
+        """
+        Same as `AnnotationSet.iter`.
+        """
+        if self._anns_dict is None and with_type is None:
+            if self._anns is None and self._use_parent():
+                return self._parent.iter(
+                    start_ge=start_ge, start_lt=start_lt, with_type=self._anntypes, reverse=reverse
+                )
+            if start_ge is None and start_lt is None:
+                # sorting the few annotations we have is cheaper than creating the offset index
+                anns = self._sequence(ordered=True)
+                if reverse:
+                    return reversed(anns)
+                return iter(anns)
+        return super().iter(start_ge=start_ge, start_lt=start_lt, with_type=with_type, reverse=reverse)
+
+    def first(self):
+        """
+        Return the first (or only) annotation in the set by offset.
+        """
+        if self._anns_dict is None and len(self) > 0:
+            return next(self.iter())
+        return super().first()
+
+    def last(self):
+        """
+        Return the last (or only) annotation in the set by offset.
+        """
+        if self._anns_dict is None and len(self) > 0:
+            return next(self.iter(reverse=True))
+        return super().last()
+
+    def with_type(self, *anntype: Union[str, Iterable], non_overlapping: bool = False):
+        """
+        Same as `AnnotationSet.with_type`.
+        """
+        if self._anns_dict is not None or non_overlapping:
+            return super().with_type(*anntype, non_overlapping=non_overlapping)
+        atypes = set()
+        for atype in anntype:
+            if isinstance(atype, str):
+                atypes.add(atype)
+            else:
+                atypes.update(atype)
+        if not atypes:
+            return AnnotationSetView(self._parent, self._fetch_anns(), ordered=self._ordered)
+        if self._anns is None and self._use_parent():
+            return self._parent.with_type([t for t in self._anntypes if t in atypes])
+        return AnnotationSetView(
+            self._parent, [ann for ann in self._fetch_anns() if ann.type in atypes], ordered=self._ordered
+        )
+
+    @support_annotation_or_set
+    def startingat(self, start: int, ignored: Any = None, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.startingat`.
+        """
+        if self._use_parent():
+            ignore = annid if not include_self else None
+            if self._anntypes is not None:
+                return self._parent._typed_query(self._anntypes, "starting_at", start, ignore=ignore)
+            return self._restrict_view(
+                self._parent.startingat(start, annid=annid, include_self=include_self)
+            )
+        return super().startingat(start, annid=annid, include_self=include_self)
+
+    @support_annotation_or_set
+    def overlapping(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.overlapping`.
+        """
+        if self._use_parent():
+            ignore = annid if not include_self else None
+            if self._anntypes is not None:
+                return self._parent._typed_query(self._anntypes, "overlapping", start, end, ignore=ignore)
+            return self._restrict_view(
+                self._parent.overlapping(start, end, annid=annid, include_self=include_self)
+            )
+        return super().overlapping(start, end, annid=annid, include_self=include_self)
+
+    @support_annotation_or_set
+    def covering(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.covering`.
+        """
+        if self._use_parent():
+            ignore = annid if not include_self else None
+            if self._anntypes is not None:
+                return self._parent._typed_query(self._anntypes, "covering", start, end, ignore=ignore)
+            return self._restrict_view(
+                self._parent.covering(start, end, annid=annid, include_self=include_self)
+            )
+        return super().covering(start, end, annid=annid, include_self=include_self)
+
+    @support_annotation_or_set
+    def within(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.within`.
+        """
+        if self._use_parent():
+            if start > end:
+                raise Exception("Invalid offset range: {},{}".format(start, end))
+            ignore = annid if not include_self else None
+            if self._anntypes is not None:
+                return self._parent._typed_query(self._anntypes, "within", start, end, ignore=ignore)
+            return self._restrict_view(
+                self._parent.within(start, end, annid=annid, include_self=include_self)
+            )
+        return super().within(start, end, annid=annid, include_self=include_self)
+
+    @support_annotation_or_set
+    def coextensive(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.coextensive`.
+        """
+        if self._use_parent():
+            ignore = annid if not include_self else None
+            if self._anntypes is not None:
+                return self._parent._typed_query(self._anntypes, "at", start, end, ignore=ignore)
+            return self._restrict_view(
+                self._parent.coextensive(start, end, annid=annid, include_self=include_self)
+            )
+        return super().coextensive(start, end, annid=annid, include_self=include_self)
+
+    def within_many(self, spans: Iterable, include_self: bool = False) -> List[AnnotationSet]:
+        """
+        Same as `AnnotationSet.within_many`.
+        """
+        if self._use_parent():
+            if self._anntypes is not None:
+                return self._parent._views_for(
+                    self._parent._within_many(spans, include_self=include_self, anntypes=self._anntypes)
+                )
+            return [
+                self._restrict_view(view)
+                for view in self._parent.within_many(spans, include_self=include_self)
+            ]
+        return super().within_many(spans, include_self=include_self)
+
+    def covering_many(self, spans: Iterable, include_self: bool = False) -> List[AnnotationSet]:
+        """
+        Same as `AnnotationSet.covering_many`.
+        """
+        if self._use_parent():
+            if self._anntypes is not None:
+                return self._parent._views_for(
+                    self._parent._covering_many(spans, include_self=include_self, anntypes=self._anntypes)
+                )
+            return [
+                self._restrict_view(view)
+                for view in self._parent.covering_many(spans, include_self=include_self)
+            ]
+        return super().covering_many(spans, include_self=include_self)
@@ -158,7 +158,7 @@ class ChangeLog:
         """
         offset_type = self.offset_type
         changes = self.changes
-        if "offset_type" in kwargs and kwargs["offset_type"] != offset_type:
+        if kwargs.get("offset_type") is not None and kwargs["offset_type"] != offset_type:
             om = kwargs.get("offset_mapper")
             if om is None:
                 raise Exception(
@@ -190,7 +190,12 @@ class ChangeLog:
             if "offset_mapper" in kwargs:
                 om = kwargs.get("offset_mapper")
             elif "document" in kwargs:
-                om = OffsetMapper(kwargs.get("document"))
+                document = kwargs.get("document")
+                if isinstance(document, str):
+                    om = OffsetMapper(document)
+                else:
+                    # use the cached offset mapper of the document
+                    om = document.offset_mapper
             else:
                 raise Exception(
                     "Loading a changelog with offset_type JAVA, need kwarg 'offset_mapper' or 'document'"
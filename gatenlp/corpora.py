@@ -11,11 +11,11 @@ DocumentDestination subclasses represent collections that can receive Documents
 """
 
 import os
-import json
 import random
 from abc import ABC, abstractmethod
 import numbers
 from gatenlp.serialization.default import read_lines_from
+from gatenlp.serialization.jsonbackend import get_json_backend
 from gatenlp.document import Document
 
 __pdoc__ = {
@@ -157,6 +157,27 @@ class DocumentDestination(ABC):
         """
         pass
 
+    def flush(self):
+        """
+        Makes sure that all documents appended so far are actually written, e.g. before the state of
+        processing gets saved. By default, this does nothing.
+        """
+        pass
+
+    def tell(self):
+        """
+        Returns the current position of the destination, which can later be passed to `truncate` to remove all
+        documents appended after that position, or None if this is not supported. By default, returns None.
+        """
+        return None
+
+    def truncate(self, position):
+        """
+        Removes all documents appended after the position returned by `tell`, e.g. when resuming processing
+        from the state saved at that position. By default, this does nothing.
+        """
+        pass
+
     def close(self):
         """
         Must have a close method that is used to end writing and close the destination.
@@ -189,15 +210,17 @@ class BdocjsLinesFileDestination(DocumentDestination):
     Writes one line of JSON per document to the a single output file.
     """
 
-    def __init__(self, file):
+    def __init__(self, file, append=False):
         """
 
         Args:
             file: the file to write to. If it exists, it gets overwritten without warning.
                Expected to be a string or an open file handle.
+            append: if True and file is a string, append to the file if it exists instead, e.g. when
+               resuming processing from a checkpoint
         """
         if isinstance(file, str):
-            self.fh = open(file, "wt", encoding="utf-8")
+            self.fh = open(file, "at" if append else "wt", encoding="utf-8")
         else:
             self.fh = file
         self.n = 0
@@ -222,6 +245,19 @@ class BdocjsLinesFileDestination(DocumentDestination):
         self.fh.write("\n")
         self.n += 1
 
+    def flush(self):
+        self.fh.flush()
+
+    def tell(self):
+        self.fh.flush()
+        return self.fh.tell()
+
+    def truncate(self, position):
+        self.fh.seek(0, os.SEEK_END)
+        if self.fh.tell() > position:
+            self.fh.seek(position)
+            self.fh.truncate()
+
     def close(self):
         self.fh.close()
 
@@ -249,9 +285,10 @@ class JsonLinesFileSource(DocumentSource):
         self.data_feature = data_feature
 
     def __iter__(self):
+        loads = get_json_backend().loads
         with open(self.file, "rt", encoding="utf-8") as infp:
             for line in infp:
-                data = json.loads(line)
+                data = loads(line)
                 # TODO: what if the field does not exist? should we use get(text_field, "") instead?
                 text = data[self.text_field]
                 doc = Document(text)
@@ -274,7 +311,10 @@ class JsonLinesFileDestination(DocumentDestination):
     fields from the "__data" document feature.
     """
 
-    def __init__(self, file, document_field="text", document_bdocjs=False, data_fields=True, data_feature="__data"):
+    def __init__(
+        self, file, document_field="text", document_bdocjs=False, data_fields=True, data_feature="__data",
+        append=False,
+    ):
         """
 
         Args:
@@ -286,9 +326,11 @@ class JsonLinesFileDestination(DocumentDestination):
             data_fields: if a list, only store these fields in the json, if False, do not store any additional fields.
                Default is True: store all fields as is.
             data_feature: the name of the data feature, default is "__data"
+            append: if True and file is a string, append to the file if it exists instead, e.g. when
+               resuming processing from a checkpoint
         """
         if isinstance(file, str):
-            self.fh = open(file, "wt", encoding="utf-8")
+            self.fh = open(file, "at" if append else "wt", encoding="utf-8")
         else:
             self.fh = file
         self.n = 0
@@ -325,10 +367,23 @@ class JsonLinesFileDestination(DocumentDestination):
             data[self.document_field] = doc.save_mem(fmt="json")
         else:
             data[self.document_field] = doc.text
-        self.fh.write(json.dumps(data))
+        self.fh.write(get_json_backend().dumps(data))
         self.fh.write("\n")
         self.n += 1
 
+    def flush(self):
+        self.fh.flush()
+
+    def tell(self):
+        self.fh.flush()
+        return self.fh.tell()
+
+    def truncate(self, position):
+        self.fh.seek(0, os.SEEK_END)
+        if self.fh.tell() > position:
+            self.fh.seek(position)
+            self.fh.truncate()
+
     def close(self):
         self.fh.close()
 
@@ -702,12 +757,18 @@ class NumberedDirFilesCorpus(Corpus):
     def __len__(self):
         return self.size
 
+    def exists(self, idx):
+        """
+        Returns True if the document with the index idx exists, without loading it.
+        """
+        return os.path.exists(os.path.join(self.dirpath, self.file_path_maker(idx=idx) + self.ext))
+
     def __getitem__(self, idx):
         assert isinstance(idx, int)
-        path = self.file_path_maker(idx)
+        path = self.file_path_maker(idx=idx)
         path = path + self.ext
         abspath = os.path.join(self.dirpath, path)
-        if os.path.exists(path):
+        if os.path.exists(abspath):
             doc = Document.load(abspath, fmt=self.fmt)
             doc.features[self.idxfeatname()] = idx
             doc.features["__idx"] = idx
@@ -720,14 +781,18 @@ class NumberedDirFilesCorpus(Corpus):
     def __setitem__(self, idx, doc):
         assert isinstance(idx, int)
         assert doc is None or isinstance(doc, Document)
-        path = self.file_path_maker(idx)
+        path = self.file_path_maker(idx=idx)
         path = path + self.ext
+        abspath = os.path.join(self.dirpath, path)
         if doc is None:
             if self.store_none:
-                if os.path.exists(path):
-                    os.remove(path)
+                if os.path.exists(abspath):
+                    os.remove(abspath)
         else:
-            doc = Document.save(os.path.join(self.dirpath, path), fmt=self.fmt)
+            dirname = os.path.dirname(abspath)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            doc.save(abspath, fmt=self.fmt)
 
 
 class TsvFileSource(DocumentSource):
@@ -1106,9 +1171,20 @@ class CachedCorpus(Corpus):
         if tmp is None:
             tmp = self.basecorpus[index]
             if self.cacheonread:
-                self.basecorpus[index] = tmp
+                self.cachecorpus[index] = tmp
         self.setidxfeature(tmp, index)
         return tmp
 
+    def is_cached(self, index):
+        """
+        Returns True if the document with the index is in the cache corpus, e.g. because it has already been
+        processed and stored. If the cache corpus has an `exists` method, like `NumberedDirFilesCorpus`,
+        this is used to check without loading the document.
+        """
+        exists = getattr(self.cachecorpus, "exists", None)
+        if exists is not None:
+            return exists(index)
+        return self.cachecorpus[index] is not None
+
     def __setitem__(self, index, value):
         self.cachecorpus[index] = value
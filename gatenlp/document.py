@@ -11,7 +11,7 @@ from gatenlp.annotation_set import AnnotationSet
 from gatenlp.annotation import Annotation
 from gatenlp.offsetmapper import OffsetMapper, OFFSET_TYPE_PYTHON, OFFSET_TYPE_JAVA
 from gatenlp.features import Features
-from gatenlp.utils import in_notebook
+from gatenlp.utils import in_notebook, parse_annsets_spec
 from gatenlp.changelog import ChangeLog
 
 from gatenlp.changelog_consts import (
@@ -39,6 +39,38 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def _annsets_from_dict(doc, setdicts, annsets=None, features=True, lazy=False):
+    """
+    Creates the annotation sets of the document from the dictionary which maps set names to the dict
+    representations of the sets, only including the sets and types in the annsets specification.
+
+    Args:
+        doc: the document which owns the sets
+        setdicts: dictionary mapping set names to set dict representations
+        annsets: if not None, a list of set names or (setname, types) tuples to include
+        features: if False, the annotation features are not included
+        lazy: if True, the sets which are included completely keep their dict representation and only create
+            their annotations when they get used first
+
+    Returns:
+        dictionary mapping set names to annotation sets
+    """
+    specs = parse_annsets_spec(annsets)
+    sets = {}
+    for name, adict in setdicts.items():
+        if specs is not None and name not in specs:
+            continue
+        anntypes = None if specs is None else specs[name]
+        if lazy and anntypes is None and features:
+            sets[name] = AnnotationSet._from_lazy(
+                adict.get("name"), doc, adict.get("next_annid"), len(adict.get("annotations") or []),
+                "dict", adict, AnnotationSet._load_dict, doc.offset_type,
+            )
+        else:
+            sets[name] = AnnotationSet.from_dict(adict, owner_doc=doc, anntypes=anntypes, features=features)
+    return sets
+
+
 class Document:
     """
     Represent a GATE document. This is different from the original Java GATE representation in
@@ -83,6 +115,35 @@ class Document:
         self._text = text
         self.offset_type = OFFSET_TYPE_PYTHON
         self._name = ""
+        # the offset mapper for the text, created when first needed
+        self._offset_mapper = None
+        self._offset_mapper_hits = 0
+        self._offset_mapper_misses = 0
+
+    @property
+    def offset_mapper(self) -> OffsetMapper:
+        """
+        Get the offset mapper for the text of the document, or None if the document does not have text.
+
+        The offset mapper gets created the first time it is needed and is then re-used for all offset
+        conversions of the document, until the text of the document is set.
+        """
+        if self._offset_mapper is None:
+            if self._text is None:
+                return None
+            self._offset_mapper_misses += 1
+            self._offset_mapper = OffsetMapper(self._text)
+        else:
+            self._offset_mapper_hits += 1
+        return self._offset_mapper
+
+    @property
+    def offset_mapper_stats(self) -> dict:
+        """
+        Get a dictionary with the number of times the cached offset mapper was re-used ("hits") and
+        the number of times it had to be created ("misses").
+        """
+        return dict(hits=self._offset_mapper_hits, misses=self._offset_mapper_misses)
 
     @property
     def name(self):
@@ -129,10 +190,14 @@ class Document:
         annset_names = self._annotation_sets.keys()
         for annset_name in annset_names:
             annset = self._annotation_sets[annset_name]
-            if annset._annotations is not None:
-                for ann in annset._annotations.values():
-                    ann._start = method(ann._start)
-                    ann._end = method(ann._end)
+            # lazily loaded sets get converted when their annotations get created
+            if not annset._is_lazy() and annset._annotations is not None:
+                # convert the offsets of all annotations in the set at once
+                anns = list(annset._annotations.values())
+                offsets = method([off for ann in anns for off in (ann._start, ann._end)])
+                for i, ann in enumerate(anns):
+                    ann._start = offsets[2 * i]
+                    ann._end = offsets[2 * i + 1]
 
     def to_offset_type(self, offsettype: str) -> OffsetMapper:
         """Convert all the offsets of all the annotations in this document to the
@@ -157,12 +222,12 @@ class Document:
             return
         if offsettype == OFFSET_TYPE_JAVA and self.offset_type == OFFSET_TYPE_PYTHON:
             # convert from currently python to java
-            om = OffsetMapper(self._text)
+            om = self.offset_mapper
             self._fixup_annotations(om.convert_to_java)
             self.offset_type = OFFSET_TYPE_JAVA
         elif offsettype == OFFSET_TYPE_PYTHON and self.offset_type == OFFSET_TYPE_JAVA:
             # convert from currently java to python
-            om = OffsetMapper(self._text)
+            om = self.offset_mapper
             self._fixup_annotations(om.convert_to_python)
             self.offset_type = OFFSET_TYPE_PYTHON
         else:
@@ -350,6 +415,7 @@ class Document:
         """
         if self._text is None:
             self._text = value
+            self._offset_mapper = None
         else:
             raise NotImplementedError("Text cannot be modified")
 
@@ -504,7 +570,7 @@ class Document:
             assert offset_type == OFFSET_TYPE_JAVA or offset_type == OFFSET_TYPE_PYTHON
             if offset_type != self.offset_type:
                 if self._text is not None:
-                    om = OffsetMapper(self._text)
+                    om = self.offset_mapper
                     kwargs["offset_mapper"] = om
                     kwargs["offset_type"] = offset_type
         else:
@@ -542,11 +608,16 @@ class Document:
         }
 
     @staticmethod
-    def from_dict(dictrepr, **kwargs):
+    def from_dict(dictrepr, annsets=None, features=True, lazy=False, **kwargs):
         """Return a Document instance as represented by the dictionary dictrepr.
 
         Args:
           dictrepr: return: the initialized Document instance
+          annsets: if not None, a list of annotation set names or tuples of set name and a
+              list of annotation types: only those sets and types are created
+          features: if False, the annotations are created without their features
+          lazy: if True, annotation sets keep their dictionary representation and the annotations only
+              get created when the set gets accessed for the first time, e.g. with `annset(name)`
           **kwargs:
 
         Returns:
@@ -562,11 +633,9 @@ class Document:
             and doc.offset_type != OFFSET_TYPE_PYTHON
         ):
             raise Exception("Invalid offset type, cannot load: ", doc.offset_type)
-        annsets = {
-            name: AnnotationSet.from_dict(adict, owner_doc=doc)
-            for name, adict in dictrepr.get("annotation_sets").items()
-        }
-        doc._annotation_sets = annsets
+        doc._annotation_sets = _annsets_from_dict(
+            doc, dictrepr.get("annotation_sets"), annsets=annsets, features=features, lazy=lazy
+        )
         return doc
 
     def save(
@@ -628,7 +697,9 @@ class Document:
             fmt(Document, self, to_mem=True, offset_type=offset_type, **kwargs)
 
     @staticmethod
-    def load(source, fmt=None, mod="gatenlp.serialization.default", **kwargs):
+    def load(
+        source, fmt=None, mod="gatenlp.serialization.default", annsets=None, features=True, lazy=False, **kwargs
+    ):
         """
         Load or import a document from the given source. The source can be a file path or
         file name or a URL. If the type of the source is str, then if it starts with
@@ -649,11 +720,26 @@ class Document:
                 like "text/bdocjs".
           mod: the name of a module where the document loader is implemented.
               (Default value = "gatenlp.serialization.default")
+          annsets: if not None, a list of annotation set names or tuples of set name and a
+              list of annotation types to load, the formats bdocjs, bdocym, bdocmp and bdocmm
+              skip the other sets and types while loading.
+          features: if False, do not load the features of annotations (supported by the same
+              formats as annsets)
+          lazy: if True, the annotations of a set only get created when the set gets used for the
+              first time, `annset_names()` and the size of a set are available without that (supported by
+              bdocjs, bdocym, bdocmp). Sets which have not been used get saved from the loaded data
+              when saving as bdocjs or bdocmp again.
           kwargs: additional format specific keyword arguments to pass to the loader
 
         Returns:
           the loaded document
         """
+        if annsets is not None:
+            kwargs["annsets"] = annsets
+        if not features:
+            kwargs["features"] = False
+        if lazy:
+            kwargs["lazy"] = True
         if fmt is None or isinstance(fmt, str):
             m = importlib.import_module(mod)
             loader = m.get_document_loader(source, fmt)
@@ -665,7 +751,9 @@ class Document:
         return doc
 
     @staticmethod
-    def load_mem(source, fmt="json", mod="gatenlp.serialization.default", **kwargs):
+    def load_mem(
+        source, fmt="json", mod="gatenlp.serialization.default", annsets=None, features=True, lazy=False, **kwargs
+    ):
         """
         Create a document from the in-memory serialization in source. Source can be a string or
         bytes, depending on the format.
@@ -678,10 +766,20 @@ class Document:
                 assumed to be a callable that retrieves and returns the document
             mod: the name of the module where the loader is implemented
                 (Default value = "gatenlp.serialization.default")
+            annsets: if not None, a list of annotation set names or tuples of set name and a
+                list of annotation types to load, see `load`
+            features: if False, do not load the features of annotations
+            lazy: if True, only create the annotations of a set when it gets accessed first, see `load`
             kwargs: additional arguments to pass to the loader
         """
         if not fmt:
             raise Exception("Format required.")
+        if annsets is not None:
+            kwargs["annsets"] = annsets
+        if not features:
+            kwargs["features"] = False
+        if lazy:
+            kwargs["lazy"] = True
         if isinstance(fmt, str):
             m = importlib.import_module(mod)
             loader = m.get_document_loader(None, fmt)
@@ -703,6 +801,7 @@ class Document:
             shallow copy of the document
         """
         doc = Document(self._text)
+        doc._offset_mapper = self._offset_mapper
         doc._annotation_sets = dict()
         for name, aset in self._annotation_sets.items():
             doc._annotation_sets[name] = aset.copy()
@@ -729,6 +828,7 @@ class Document:
         if annsets is None:
             return self.__copy__()
         doc = Document(self._text)
+        doc._offset_mapper = self._offset_mapper
         doc.offset_type = self.offset_type
         doc._features = self._features.copy()
         doc._annotation_sets = dict()
@@ -768,6 +868,7 @@ class Document:
         else:
             fts = None
         doc = Document(self._text, features=fts)
+        doc._offset_mapper = self._offset_mapper
         doc._changelog = None
         doc.offset_type = self.offset_type
         if annsets is None:
@@ -904,6 +1005,9 @@ class MultiDocument(Document):
         self._features = doc._features
         self._annotation_sets = doc._annotation_sets
         self._text = doc._text
+        self._offset_mapper = doc._offset_mapper
+        self._offset_mapper_hits = doc._offset_mapper_hits
+        self._offset_mapper_misses = doc._offset_mapper_misses
         self.offset_type = OFFSET_TYPE_PYTHON
         self._name = doc._name
         self._docid = docid
@@ -944,12 +1048,16 @@ class MultiDocument(Document):
         return thedict
 
     @staticmethod
-    def from_dict(dictrepr, **kwargs):
+    def from_dict(dictrepr, annsets=None, features=True, lazy=False, **kwargs):
         """
         Create a MultiDocument from the dictionary representation.
 
         Args:
             dictrepr: the dictionary representation
+            annsets: if not None, a list of annotation set names or tuples of set name and a
+                list of annotation types: only those sets and types are created
+            features: if False, the annotations are created without their features
+            lazy: if True, annotation sets only create their annotations when they get accessed first
             **kwargs: additional kwargs to pass on
 
         Returns:
@@ -965,11 +1073,9 @@ class MultiDocument(Document):
             and doc.offset_type != OFFSET_TYPE_PYTHON
         ):
             raise Exception("Invalid offset type, cannot load: ", doc.offset_type)
-        annsets = {
-            name: AnnotationSet.from_dict(adict, owner_doc=doc)
-            for name, adict in dictrepr.get("annotation_sets").items()
-        }
-        doc._annotation_sets = annsets
+        doc._annotation_sets = _annsets_from_dict(
+            doc, dictrepr.get("annotation_sets"), annsets=annsets, features=features, lazy=lazy
+        )
         doc.documents = {
             did: Document.from_dict(d)
             for did, d in dictrepr.get("documents", {}).items()
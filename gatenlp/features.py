@@ -15,6 +15,7 @@ Module that implements class Feature for representing features.
 # wrapping an actual dict, the collections.UserDict approach seems to be more adequate.
 
 from collections import UserDict
+from types import MappingProxyType
 import copy as lib_copy
 
 
@@ -166,3 +167,39 @@ class Features(UserDict):
         else:
             ret.data = thedict.copy()
         return ret
+
+
+class _EmptyFeatures(Features):
+    """
+    The class of the shared, immutable empty features `EMPTY_FEATURES`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.data = MappingProxyType({})
+
+    def __setitem__(self, featurename, featurevalue):
+        raise Exception("Cannot set a feature in the shared empty features")
+
+    def __delitem__(self, featurename):
+        raise Exception("Cannot remove a feature from the shared empty features")
+
+    def clear(self):
+        pass
+
+    def __repr__(self):
+        return "Features({})"
+
+    def __copy__(self):
+        return self
+
+    def __reduce__(self):
+        # there is only one instance, which gets restored when unpickling or deep copying
+        return "EMPTY_FEATURES"
+
+
+EMPTY_FEATURES = _EmptyFeatures()
+"""
+A shared immutable empty Features instance. This is used by annotations which do not have any features,
+instead of creating a separate Features instance for each of them.
+"""
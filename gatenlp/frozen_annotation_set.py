@@ -0,0 +1,559 @@
+"""
+Module for the FrozenAnnotationSet class, an immutable annotation set which stores the annotations in
+columns instead of as Annotation objects.
+"""
+
+from array import array
+from typing import Any, Union, Iterable, KeysView, Iterator, Generator
+from gatenlp.span import Span
+from gatenlp.annotation import Annotation
+from gatenlp.annotation_set import AnnotationSet
+from gatenlp.features import Features, EMPTY_FEATURES
+from gatenlp.impl import SortedIntvls
+from gatenlp.utils import support_annotation_or_set
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class FrozenAnnotationSet(AnnotationSet):
+    """
+    An immutable, detached annotation set which stores the annotations in columns: arrays of the
+    start offsets, end offsets, annotation ids and type codes of all annotations, sorted in document order,
+    a list with the annotation type for each type code and a list of feature dictionaries.
+
+    This needs a lot less memory than a normal annotation set and if numpy is installed, all the
+    query methods (`within`, `covering`, `overlapping`, `with_type`, `iter` ...) are carried out
+    as vectorized operations on those columns and return another frozen annotation set.
+    Annotation objects only get created when they are actually needed, e.g. when iterating over the set
+    and are then kept, so the same annotation object is returned every time.
+
+    If numpy is not installed, the annotations get created and the set works like any other
+    immutable detached annotation set, when it is used.
+
+    A frozen annotation set gets created with `AnnotationSet.freeze()`. The feature dictionaries of the
+    annotations are shared with the annotations of the set the frozen set was created from, just like the
+    annotations themselves are shared between a set and the detached sets created from it.
+    """
+
+    def __init__(self, name, starts, ends, ids, tcodes, next_annid=0, root=None, rootpos=None, index_class=None):
+        """
+        Create a frozen annotation set from the columns. This should not be used directly, instead use
+        `AnnotationSet.freeze()`.
+
+        Args:
+            name: the name of the set
+            starts: array of start offsets, sorted
+            ends: array of end offsets
+            ids: array of annotation ids
+            tcodes: array of type codes
+            next_annid: the next annotation id of the set the annotations are from
+            root: the frozen set which holds the type names, features and created annotations for
+                the columns, if None, this is that set
+            rootpos: array with the position in the root set for each position in this set,
+                or None if this is the root set
+            index_class: the index class to use if the annotations are needed in a normal annotation set
+        """
+        self._init_detached(
+            name,
+            index_class if index_class is not None else SortedIntvls,
+            _starts=starts,
+            _ends=ends,
+            _ids=ids,
+            _tcodes=tcodes,
+            _root=root if root is not None else self,
+            _rootpos=rootpos,
+            _sorted_ids=None,
+            _anns_dict=None,
+            _next_annid=next_annid,
+        )
+
+    @staticmethod
+    def from_annset(annset: AnnotationSet) -> "FrozenAnnotationSet":
+        """
+        Create a frozen annotation set from the annotations in the given annotation set.
+
+        Args:
+            annset: the annotation set
+
+        Returns:
+            the frozen annotation set
+        """
+        anns = sorted(annset.fast_iter(), key=lambda ann: (ann.start, ann.id))
+        typecodes = {}
+        for ann in anns:
+            if ann.type not in typecodes:
+                typecodes[ann.type] = len(typecodes)
+        starts = array("q", (ann.start for ann in anns))
+        ends = array("q", (ann.end for ann in anns))
+        ids = array("q", (ann.id for ann in anns))
+        tcodes = array("l", (typecodes[ann.type] for ann in anns))
+        if np is not None:
+            starts = np.frombuffer(starts, dtype=np.int64)
+            ends = np.frombuffer(ends, dtype=np.int64)
+            ids = np.frombuffer(ids, dtype=np.int64)
+            tcodes = np.array(tcodes, dtype=np.int32)
+        frozen = FrozenAnnotationSet(
+            annset.name, starts, ends, ids, tcodes, next_annid=annset._next_annid, index_class=annset._index_class
+        )
+        frozen._typenames = list(typecodes.keys())
+        frozen._typecodes = typecodes
+        frozen._feats = [
+            None if len(ann._features) == 0 else ann._features.data for ann in anns
+        ]
+        frozen._created = {}
+        return frozen
+
+    def freeze(self) -> "FrozenAnnotationSet":
+        """
+        Returns this set, which is already frozen.
+        """
+        return self
+
+    def _subset(self, positions) -> "FrozenAnnotationSet":
+        """
+        Create a frozen set from the annotations at the given positions, which must be increasing.
+        """
+        if self._rootpos is None:
+            rootpos = positions
+        else:
+            rootpos = self._rootpos[positions]
+        return FrozenAnnotationSet(
+            "detached-from:" + self.name,
+            self._starts[positions],
+            self._ends[positions],
+            self._ids[positions],
+            self._tcodes[positions],
+            next_annid=self._next_annid,
+            root=self._root,
+            rootpos=rootpos,
+            index_class=self._index_class,
+        )
+
+    def _result(self, lo: int, mask, annid=None, include_self=False) -> "FrozenAnnotationSet":
+        """
+        Create a frozen set from the annotations where mask is true, mask starts at position lo.
+        """
+        positions = np.flatnonzero(mask)
+        if lo:
+            positions += lo
+        if not include_self and annid is not None:
+            positions = positions[self._ids[positions] != annid]
+        return self._subset(positions)
+
+    def _ann(self, pos: int) -> Annotation:
+        """
+        Returns the annotation at the given position, creates it if necessary.
+        """
+        root = self._root
+        rpos = pos if self._rootpos is None else int(self._rootpos[pos])
+        ann = root._created.get(rpos)
+        if ann is None:
+            ann = Annotation(
+                int(root._starts[rpos]),
+                int(root._ends[rpos]),
+                root._typenames[root._tcodes[rpos]],
+                annid=int(root._ids[rpos]),
+            )
+            feats = root._feats[rpos]
+            if feats is not None:
+                features = Features(logger=ann._log_feature_change)
+                features.data = feats
+                ann._features = features
+            root._created[rpos] = ann
+        return ann
+
+    def _pos4id(self, annid: int) -> Union[int, None]:
+        """
+        Returns the position of the annotation with the given id or None.
+        """
+        if self._sorted_ids is None:
+            if np is not None:
+                order = np.argsort(self._ids, kind="stable")
+                self._sorted_ids = (self._ids[order], order)
+            else:
+                order = sorted(range(len(self._ids)), key=lambda i: self._ids[i])
+                self._sorted_ids = ([self._ids[i] for i in order], order)
+        sorted_ids, order = self._sorted_ids
+        if np is not None:
+            i = int(np.searchsorted(sorted_ids, annid))
+        else:
+            from bisect import bisect_left
+            i = bisect_left(sorted_ids, annid)
+        if i < len(sorted_ids) and sorted_ids[i] == annid:
+            return int(order[i])
+        return None
+
+    @property
+    def _annotations(self):
+        if self._anns_dict is None:
+            self._anns_dict = {int(self._ids[i]): self._ann(i) for i in range(len(self._ids))}
+        return self._anns_dict
+
+    @_annotations.setter
+    def _annotations(self, val):
+        self._anns_dict = val
+
+    @property
+    def immutable(self) -> bool:
+        """
+        A frozen set is always immutable, to get a mutable detached set use `copy()`.
+        """
+        return True
+
+    @immutable.setter
+    def immutable(self, val: bool) -> None:
+        if not val:
+            raise Exception("A frozen annotation set cannot be made mutable, use copy() instead")
+
+    def clear(self) -> None:
+        raise Exception("Cannot clear a frozen annotation set")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def size(self) -> int:
+        """
+        Returns the number of annotations in the annotation set.
+        """
+        return len(self._ids)
+
+    def __contains__(self, annorannid: Union[int, Annotation]) -> bool:
+        if isinstance(annorannid, Annotation):
+            annorannid = annorannid.id
+        return self._pos4id(annorannid) is not None
+
+    contains = __contains__
+
+    def get(self, annid: Union[int, Annotation], default=None) -> Union[Annotation, None]:
+        """
+        Same as `AnnotationSet.get`.
+        """
+        if isinstance(annid, Annotation):
+            annid = annid.id
+        pos = self._pos4id(annid)
+        if pos is None:
+            return default
+        return self._ann(pos)
+
+    def __getitem__(self, annid):
+        pos = self._pos4id(annid)
+        if pos is None:
+            raise KeyError(annid)
+        return self._ann(pos)
+
+    def fast_iter(self) -> Generator:
+        """
+        Yields annotations in document order.
+        """
+        for i in range(len(self._ids)):
+            yield self._ann(i)
+
+    def iter(
+        self,
+        start_ge: Union[int, None] = None,
+        start_lt: Union[None, int] = None,
+        with_type: str = None,
+        reverse: bool = False,
+    ) -> Iterator:
+        """
+        Same as `AnnotationSet.iter`.
+        """
+        if np is None:
+            return super().iter(start_ge=start_ge, start_lt=start_lt, with_type=with_type, reverse=reverse)
+        if start_ge is not None:
+            assert start_ge >= 0
+        if start_lt is not None:
+            assert start_lt >= 1
+        if start_lt is not None and start_ge is not None:
+            assert start_lt > start_ge
+        lo = 0 if start_ge is None else int(np.searchsorted(self._starts, start_ge, "left"))
+        hi = len(self._starts) if start_lt is None else int(np.searchsorted(self._starts, start_lt, "left"))
+        if with_type is not None:
+            if isinstance(with_type, str):
+                with_type = [with_type]
+            positions = np.flatnonzero(np.isin(self._tcodes[lo:hi], self._codes4types(with_type))) + lo
+            positions = positions.tolist()
+        else:
+            positions = range(lo, hi)
+        if reverse:
+            positions = reversed(positions)
+        return (self._ann(i) for i in positions)
+
+    def for_idx(self, idx, default=None, ordered=False):
+        """
+        Same as `AnnotationSet.for_idx`, the annotations in a frozen set are always in document order.
+        """
+        n = len(self._ids)
+        if isinstance(idx, slice):
+            return [self._ann(i) for i in range(n)[idx]]
+        if -n <= idx < n:
+            return self._ann(idx + n if idx < 0 else idx)
+        return default
+
+    def first(self):
+        """
+        Return the first (or only) annotation in the set by offset.
+        """
+        if len(self._ids) == 0:
+            raise Exception("Empty set, there is no first annotation")
+        return self._ann(0)
+
+    def last(self):
+        """
+        Return the last (or only) annotation in the set by offset.
+        """
+        if len(self._ids) == 0:
+            raise Exception("Empty set, there is no last annotation")
+        return self._ann(len(self._ids) - 1)
+
+    @property
+    def start(self):
+        """
+        Same as `AnnotationSet.start`.
+        """
+        if len(self._ids) == 0:
+            raise Exception("Annotation set is empty, cannot determine start offset")
+        return int(self._starts[0])
+
+    @property
+    def end(self):
+        """
+        Same as `AnnotationSet.end`.
+        """
+        if len(self._ids) == 0:
+            raise Exception("Annotation set is empty, cannot determine end offset")
+        if np is not None:
+            return int(self._ends.max())
+        return max(self._ends)
+
+    @property
+    def span(self):
+        """
+        Same as `AnnotationSet.span`.
+        """
+        if len(self._ids) == 0:
+            return Span(0, 0)
+        return Span(self.start, self.end)
+
+    @property
+    def type_names(self) -> KeysView[str]:
+        """
+        Gets the names of all types in this set.
+        """
+        typenames = self._root._typenames
+        return dict.fromkeys(typenames[code] for code in sorted(set(self._tcodes))).keys()
+
+    def _codes4types(self, anntypes: Iterable[str]):
+        """
+        Returns the list of type codes for those of the annotation types which are known.
+        """
+        typecodes = self._root._typecodes
+        return [typecodes[anntype] for anntype in anntypes if anntype in typecodes]
+
+    def with_type(self, *anntype: Union[str, Iterable], non_overlapping: bool = False):
+        """
+        Same as `AnnotationSet.with_type`.
+        """
+        if np is None or non_overlapping:
+            return super().with_type(*anntype, non_overlapping=non_overlapping)
+        atypes = []
+        for atype in anntype:
+            if isinstance(atype, str):
+                atypes.append(atype)
+            else:
+                atypes.extend(atype)
+        if not atypes:
+            return self
+        codes = self._codes4types(atypes)
+        if len(codes) == 1:
+            mask = self._tcodes == codes[0]
+        else:
+            mask = np.isin(self._tcodes, codes)
+        return self._result(0, mask)
+
+    @support_annotation_or_set
+    def startingat(self, start: int, ignored: Any = None, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.startingat`.
+        """
+        if np is None:
+            return super().startingat(start, annid=annid, include_self=include_self)
+        lo = int(np.searchsorted(self._starts, start, "left"))
+        hi = int(np.searchsorted(self._starts, start, "right"))
+        return self._result(lo, np.ones(hi - lo, dtype=bool), annid, include_self)
+
+    @support_annotation_or_set
+    def start_min_ge(self, offset: int, ignored: Any = None, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.start_min_ge`.
+        """
+        if np is None:
+            return super().start_min_ge(offset, annid=annid, include_self=include_self)
+        starts = self._starts
+        lo = int(np.searchsorted(starts, offset, "left"))
+        if lo == len(starts):
+            hi = lo
+        else:
+            hi = int(np.searchsorted(starts, starts[lo], "right"))
+        return self._result(lo, np.ones(hi - lo, dtype=bool), annid, include_self)
+
+    @support_annotation_or_set
+    def start_ge(self, start: int, ignored: Any = None, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.start_ge`.
+        """
+        if np is None:
+            return super().start_ge(start, annid=annid, include_self=include_self)
+        lo = int(np.searchsorted(self._starts, start, "left"))
+        return self._result(lo, np.ones(len(self._starts) - lo, dtype=bool), annid, include_self)
+
+    @support_annotation_or_set
+    def start_lt(self, offset: int, ignored: Any = None, annid=None):
+        """
+        Same as `AnnotationSet.start_lt`.
+        """
+        if np is None:
+            return super().start_lt(offset)
+        hi = int(np.searchsorted(self._starts, offset, "left"))
+        return self._result(0, np.ones(hi, dtype=bool))
+
+    @support_annotation_or_set
+    def overlapping(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.overlapping`.
+        """
+        if np is None:
+            return super().overlapping(start, end, annid=annid, include_self=include_self)
+        # this uses the same conditions as the interval indices
+        if start == end:
+            hi = int(np.searchsorted(self._starts, end, "right"))
+            starts = self._starts[:hi]
+            ends = self._ends[:hi]
+            mask = ((starts < start) & (ends > start)) | ((starts == start) & (ends >= start))
+        else:
+            hi = int(np.searchsorted(self._starts, end - 1, "right"))
+            starts = self._starts[:hi]
+            ends = self._ends[:hi]
+            mask = np.where(starts == ends, starts >= start, ends > start + 1)
+        return self._result(0, mask, annid, include_self)
+
+    @support_annotation_or_set
+    def covering(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.covering`.
+        """
+        if np is None:
+            return super().covering(start, end, annid=annid, include_self=include_self)
+        hi = int(np.searchsorted(self._starts, start, "right"))
+        ends = self._ends[:hi]
+        mask = ends >= end
+        if start == end:
+            # a zero length range is not covered by an annotation which starts before and ends at it
+            mask &= ~((self._starts[:hi] < start) & (ends == end))
+        return self._result(0, mask, annid, include_self)
+
+    @support_annotation_or_set
+    def within(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.within`.
+        """
+        if start > end:
+            raise Exception("Invalid offset range: {},{}".format(start, end))
+        if np is None:
+            return super().within(start, end, annid=annid, include_self=include_self)
+        lo = int(np.searchsorted(self._starts, start, "left"))
+        hi = int(np.searchsorted(self._starts, end, "right"))
+        return self._result(lo, self._ends[lo:hi] <= end, annid, include_self)
+
+    @support_annotation_or_set
+    def coextensive(self, start: int, end: int, annid=None, include_self=False):
+        """
+        Same as `AnnotationSet.coextensive`.
+        """
+        if np is None:
+            return super().coextensive(start, end, annid=annid, include_self=include_self)
+        lo = int(np.searchsorted(self._starts, start, "left"))
+        hi = int(np.searchsorted(self._starts, start, "right"))
+        return self._result(lo, self._ends[lo:hi] == end, annid, include_self)
+
+    @support_annotation_or_set
+    def before(self, start: int, end: int, annid=None, include_self=False, immediately=False):
+        """
+        Same as `AnnotationSet.before`.
+        """
+        if np is None:
+            return super().before(start, end, annid=annid, include_self=include_self, immediately=immediately)
+        if immediately:
+            mask = self._ends == start
+        else:
+            mask = self._ends <= start
+        return self._result(0, mask, annid, include_self)
+
+    @support_annotation_or_set
+    def after(self, start: int, end: int, annid=None, include_self=False, immediately=False):
+        """
+        Same as `AnnotationSet.after`.
+        """
+        if np is None:
+            return super().after(start, end, annid=annid, include_self=include_self, immediately=immediately)
+        lo = int(np.searchsorted(self._starts, end, "left"))
+        if immediately:
+            hi = int(np.searchsorted(self._starts, end, "right"))
+        else:
+            hi = len(self._starts)
+        return self._result(lo, np.ones(hi - lo, dtype=bool), annid, include_self)
+
+    def within_many(self, spans: Iterable, include_self: bool = False):
+        """
+        Same as `AnnotationSet.within_many`.
+        """
+        if np is None:
+            return super().within_many(spans, include_self=include_self)
+        return [self.within(span, include_self=include_self) for span in spans]
+
+    def covering_many(self, spans: Iterable, include_self: bool = False):
+        """
+        Same as `AnnotationSet.covering_many`.
+        """
+        if np is None:
+            return super().covering_many(spans, include_self=include_self)
+        return [self.covering(span, include_self=include_self) for span in spans]
+
+    def to_dict(self, anntypes=None, **kwargs):
+        """
+        Same as `AnnotationSet.to_dict`, the annotations are in document order.
+        """
+        if kwargs:
+            return super().to_dict(anntypes=anntypes, **kwargs)
+        root = self._root
+        typenames = root._typenames
+        if anntypes is not None:
+            anntypes = set(anntypes)
+        anns_list = []
+        for i in range(len(self._ids)):
+            rpos = i if self._rootpos is None else int(self._rootpos[i])
+            anntype = typenames[root._tcodes[rpos]]
+            if anntypes is not None and anntype not in anntypes:
+                continue
+            ann = root._created.get(rpos)
+            if ann is not None:
+                anns_list.append(ann.to_dict())
+                continue
+            feats = root._feats[rpos]
+            anns_list.append({
+                "type": anntype,
+                "start": int(root._starts[rpos]),
+                "end": int(root._ends[rpos]),
+                "id": int(root._ids[rpos]),
+                "features": EMPTY_FEATURES.to_dict() if feats is None else
+                {k: v for k, v in feats.items() if not k.startswith("__")},
+            })
+        return {
+            "name": self.name,
+            "annotations": anns_list,
+            "next_annid": self._next_annid,
+        }
@@ -15,6 +15,7 @@ from gatenlp.changelog import ChangeLog
 from gatenlp.document import Document
 from gatenlp.offsetmapper import OFFSET_TYPE_JAVA, OFFSET_TYPE_PYTHON
 from gatenlp.utils import init_logger
+from gatenlp.serialization.jsonbackend import get_json_backend
 from gatenlp.version import __version__ as gatenlp_version
 import json
 
@@ -321,9 +322,10 @@ def interact(args=None, annotator=None):
     if args.mode == "pipe":
         if args.format != "json":
             raise Exception("For interaction mode pipe, only format=json is supported")
+        backend = get_json_backend()
         for line in instream:
             try:
-                request = json.loads(line)
+                request = backend.loads(line)
             except Exception as ex:
                 logger.error("Unable to load from JSON:\n{}".format(line))
                 raise ex
@@ -344,7 +346,7 @@ def interact(args=None, annotator=None):
                     if om:
                         # replace True is faster, and we do not need the ChangeLog any more!
                         chlog.fixup_changes(
-                            offset_mapper=om, offset_type=OFFSET_TYPE_JAVA, replace=True
+                            offset_mapper=doc.offset_mapper, offset_type=OFFSET_TYPE_JAVA, replace=True
                         )
                     ret = doc.changelog.to_dict()
                     logger.debug("Returning CHANGELOG: {}".format(ret))
@@ -388,7 +390,7 @@ def interact(args=None, annotator=None):
                     "stacktrace": st,
                 }
             logger.debug("Sending back response: {}".format(response))
-            print(json.dumps(response), file=ostream)
+            print(backend.dumps(response), file=ostream)
 
             ostream.flush()
             if stop_requested:
@@ -24,5 +24,16 @@ class GatenlpConfig:
         self.doc_html_repr_height1_nostretch = "max-height: 20em;"
         self.doc_html_repr_height2_nostretch = "max-height: 14em;"
 
+        # The JSON implementation to use for reading and writing JSON, one of "json", "orjson", "ujson",
+        # "rapidjson" or "auto" to use the first of those which is installed. If None, the environment
+        # variable GATENLP_JSON_BACKEND is used, or "json" if that is not set either.
+        # See gatenlp.serialization.jsonbackend
+        self.json_backend = None
+
+        # The compression level to use for each compression codec ("gzip", "zstd", "lz4") when saving
+        # compressed documents, codecs not in the dictionary use their default level (gzip: 9, zstd: 3, lz4: 0).
+        # See gatenlp.serialization.compression
+        self.compression_levels = {}
+
 
 gatenlpconfig = GatenlpConfig()
@@ -976,6 +976,10 @@ class GateWorkerAnnotator(Annotator):
     # or document and selection of annotation sets/annotation types, runs pipeline,
     # and then fetches one or more annotation sets and updates the local document with them.
     # TODO: parameter to influence how exceptions are handled
+
+    # the Java GATE pipeline can only process one document at a time
+    max_concurrency = 1
+
     def __init__(
         self,
         pipeline,
@@ -5,3 +5,5 @@ by other libraries or by better implementations in a separate packate.
 """
 
 from gatenlp.impl.sortedintvls import SortedIntvls
+from gatenlp.impl.arrayintvls import ArrayIntvls
+from gatenlp.impl.treeintvls import TreeIntvls
@@ -0,0 +1,381 @@
+"""
+Module that provides an array-backed alternative to SortedIntvls which implements the same
+interval-based operations.
+
+Instead of keeping tuples in sorted lists, the start offsets, end offsets and annotation ids are
+stored in parallel typed arrays (module `array`). One set of columns is sorted by start offset
+(then annotation id, or end offset and annotation id if by_ol is True), a second set of columns
+is sorted by end offset. All lookups are done with binary search on the offset columns, no key function
+is needed and each interval only needs a few bytes of memory.
+
+Building the index from many intervals at once is best done with `update()` which sorts everything
+in one go (using numpy if it is installed).
+
+NOTE: unlike SortedIntvls, the data element of each interval must be an int (the annotation id).
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional and only used to speed up bulk loading
+    np = None
+
+TYPECODE = "q"
+
+
+def _take(arr, order):
+    """
+    Return a new typed array with the elements of arr in the order given by the numpy index array order.
+    """
+    ret = array(TYPECODE)
+    ret.frombytes(np.frombuffer(arr, dtype=np.int64)[order].tobytes())
+    return ret
+
+
+class ArrayIntvls:
+    """
+    Interval index that stores intervals in parallel typed arrays, see module documentation.
+    """
+
+    def __init__(self, by_ol=False):
+        """
+        Create an array-backed interval index. By default, this sorts by start offset and
+        annotation id. If by_ol is True, sorts by start offset, end offset and annotation id.
+
+        Args:
+            by_ol: if True, use start offset, end offset, annotation id
+        """
+        self._by_ol = by_ol
+        # the columns sorted by start offset
+        self._starts = array(TYPECODE)
+        self._ends = array(TYPECODE)
+        self._ids = array(TYPECODE)
+        # the columns sorted by end offset, start offset, annotation id
+        self._e_ends = array(TYPECODE)
+        self._e_starts = array(TYPECODE)
+        self._e_ids = array(TYPECODE)
+        # upper bound for the length of any interval in the index, this is used to limit the
+        # range of start offsets that needs to get checked for overlapping and covering intervals.
+        # This is not updated when intervals get removed, so it may be larger than necessary.
+        self._maxlen = 0
+
+    def _pos_by_start(self, start, end, data):
+        """
+        Return the position where the interval is or should get inserted in the start offset columns.
+        """
+        lo = bisect_left(self._starts, start)
+        hi = bisect_right(self._starts, start, lo)
+        if self._by_ol:
+            lo = bisect_left(self._ends, end, lo, hi)
+            hi = bisect_right(self._ends, end, lo, hi)
+        return bisect_left(self._ids, data, lo, hi)
+
+    def _pos_by_end(self, start, end, data):
+        """
+        Return the position where the interval is or should get inserted in the end offset columns.
+        """
+        lo = bisect_left(self._e_ends, end)
+        hi = bisect_right(self._e_ends, end, lo)
+        lo = bisect_left(self._e_starts, start, lo, hi)
+        hi = bisect_right(self._e_starts, start, lo, hi)
+        return bisect_left(self._e_ids, data, lo, hi)
+
+    def _load(self, starts, ends, ids):
+        """
+        Replace the content of the index with the intervals from the given (unsorted) columns,
+        sorting all of them at once.
+        """
+        n = len(starts)
+        if n == 0:
+            self.__init__(by_ol=self._by_ol)
+            return
+        if np is not None:
+            s = np.frombuffer(starts, dtype=np.int64)
+            e = np.frombuffer(ends, dtype=np.int64)
+            i = np.frombuffer(ids, dtype=np.int64)
+            if self._by_ol:
+                order = np.lexsort((i, e, s))
+            else:
+                order = np.lexsort((i, s))
+            self._starts = _take(starts, order)
+            self._ends = _take(ends, order)
+            self._ids = _take(ids, order)
+            order = np.lexsort((i, s, e))
+            self._e_ends = _take(ends, order)
+            self._e_starts = _take(starts, order)
+            self._e_ids = _take(ids, order)
+            self._maxlen = int((e - s).max())
+        else:
+            if self._by_ol:
+                tmp = sorted(zip(starts, ends, ids))
+                self._starts = array(TYPECODE, (t[0] for t in tmp))
+                self._ends = array(TYPECODE, (t[1] for t in tmp))
+                self._ids = array(TYPECODE, (t[2] for t in tmp))
+            else:
+                tmp = sorted(zip(starts, ids, ends))
+                self._starts = array(TYPECODE, (t[0] for t in tmp))
+                self._ids = array(TYPECODE, (t[1] for t in tmp))
+                self._ends = array(TYPECODE, (t[2] for t in tmp))
+            tmp = sorted(zip(ends, starts, ids))
+            self._e_ends = array(TYPECODE, (t[0] for t in tmp))
+            self._e_starts = array(TYPECODE, (t[1] for t in tmp))
+            self._e_ids = array(TYPECODE, (t[2] for t in tmp))
+            self._maxlen = max(e - s for s, e in zip(starts, ends))
+
+    def add(self, start, end, data):
+        """
+        Adds an interval.
+        """
+        pos = self._pos_by_start(start, end, data)
+        self._starts.insert(pos, start)
+        self._ends.insert(pos, end)
+        self._ids.insert(pos, data)
+        pos = self._pos_by_end(start, end, data)
+        self._e_ends.insert(pos, end)
+        self._e_starts.insert(pos, start)
+        self._e_ids.insert(pos, data)
+        if end - start > self._maxlen:
+            self._maxlen = end - start
+
+    def update(self, tupleiterable):
+        """
+        Updates from an iterable of intervals. All intervals, including those already in the index,
+        get sorted once, so this is much faster than adding the intervals one by one, unless only very
+        few intervals get added to a big index.
+        """
+        if not isinstance(tupleiterable, (list, tuple)):
+            tupleiterable = list(tupleiterable)
+        if len(tupleiterable) * 16 < len(self._starts):
+            for intvl in tupleiterable:
+                self.add(intvl[0], intvl[1], intvl[2])
+            return
+        starts = array(TYPECODE, self._starts)
+        ends = array(TYPECODE, self._ends)
+        ids = array(TYPECODE, self._ids)
+        for intvl in tupleiterable:
+            starts.append(intvl[0])
+            ends.append(intvl[1])
+            ids.append(intvl[2])
+        self._load(starts, ends, ids)
+
+    def _delete(self, start, end, data):
+        """
+        Remove the interval and return True, or return False if the interval does not exist.
+        """
+        pos = self._pos_by_start(start, end, data)
+        if (
+            pos == len(self._starts)
+            or self._starts[pos] != start
+            or self._ends[pos] != end
+            or self._ids[pos] != data
+        ):
+            return False
+        del self._starts[pos]
+        del self._ends[pos]
+        del self._ids[pos]
+        pos = self._pos_by_end(start, end, data)
+        del self._e_ends[pos]
+        del self._e_starts[pos]
+        del self._e_ids[pos]
+        return True
+
+    def remove(self, start, end, data):
+        """
+        Removes an interval, exception if the interval does not exist.
+        """
+        if not self._delete(start, end, data):
+            raise ValueError(f"Interval {(start, end, data)} not in index")
+
+    def discard(self, start, end, data):
+        """
+        Removes and interval, do nothing if the interval does not exist.
+        """
+        self._delete(start, end, data)
+
+    def __len__(self):
+        """
+        Returns the number of intervals.
+        """
+        return len(self._starts)
+
+    def _iter_by_start(self, lo, hi, reverse=False):
+        """
+        Yields the (start, end, data) tuples at positions lo to hi-1 of the start offset columns.
+        """
+        starts, ends, ids = self._starts, self._ends, self._ids
+        if reverse:
+            for i in range(hi - 1, lo - 1, -1):
+                yield starts[i], ends[i], ids[i]
+        else:
+            for i in range(lo, hi):
+                yield starts[i], ends[i], ids[i]
+
+    def _iter_by_end(self, lo, hi):
+        """
+        Yields the (start, end, data) tuples at positions lo to hi-1 of the end offset columns.
+        """
+        starts, ends, ids = self._e_starts, self._e_ends, self._e_ids
+        for i in range(lo, hi):
+            yield starts[i], ends[i], ids[i]
+
+    def starting_at(self, offset):
+        """
+        Returns an iterable of (start, end, data) tuples where start==offset
+        """
+        lo = bisect_left(self._starts, offset)
+        hi = bisect_right(self._starts, offset, lo)
+        return self._iter_by_start(lo, hi)
+
+    def ending_at(self, offset):
+        """
+        Returns an iterable of (start, end, data) tuples where end==offset
+        """
+        lo = bisect_left(self._e_ends, offset)
+        hi = bisect_right(self._e_ends, offset, lo)
+        return self._iter_by_end(lo, hi)
+
+    def at(self, start, end):
+        """
+        Returns an iterable of tuples where start==start and end==end
+        """
+        for intvl in self.starting_at(start):
+            if intvl[1] == end:
+                yield intvl
+
+    def within(self, start, end):
+        """
+        Returns intervals which are fully contained within start...end
+        """
+        lo = bisect_left(self._starts, start)
+        hi = bisect_right(self._starts, end, lo)
+        for intvl in self._iter_by_start(lo, hi):
+            if intvl[1] <= end:
+                yield intvl
+
+    def starting_from(self, offset):
+        """
+        Returns intervals that start at or after offset.
+        """
+        return self._iter_by_start(bisect_left(self._starts, offset), len(self._starts))
+
+    def starting_before(self, offset):
+        """
+        Returns intervals  that start before offset.
+        """
+        return self._iter_by_start(0, bisect_left(self._starts, offset))
+
+    def ending_to(self, offset):
+        """
+        Returns intervals that end before or at the given end offset.
+        """
+        return self._iter_by_end(0, bisect_right(self._e_ends, offset))
+
+    def ending_after(self, offset):
+        """
+        Returns intervals the end after the given offset.
+        """
+        return self._iter_by_end(bisect_right(self._e_ends, offset), len(self._e_ends))
+
+    def covering(self, start, end):
+        """
+        Returns intervals that contain the given range.
+        """
+        # Any interval that ends at or after end and is not longer than maxlen must start at or after
+        # end-maxlen, so only intervals starting between end-maxlen and start need to get checked.
+        lo = bisect_left(self._starts, end - self._maxlen)
+        hi = bisect_right(self._starts, start, lo)
+        if start == end:
+            for intvl in self._iter_by_start(lo, hi):
+                if intvl[0] < start and intvl[1] > end:
+                    yield intvl
+                elif intvl[0] == start and intvl[1] >= end:
+                    yield intvl
+        else:
+            for intvl in self._iter_by_start(lo, hi):
+                if intvl[1] >= end:
+                    yield intvl
+
+    def overlapping(self, start, end):
+        """
+        Returns intervals that overlap with the given range.
+        """
+        # Same conditions as for SortedIntvls, but we only need to check the intervals which start
+        # at or after start-maxlen, since all intervals which start earlier must end before start.
+        lo = bisect_left(self._starts, start - self._maxlen)
+        if start == end:
+            hi = bisect_right(self._starts, end, lo)
+            for intvl in self._iter_by_start(lo, hi):
+                if intvl[0] < start and intvl[1] > start:
+                    yield intvl
+                elif intvl[0] == start and intvl[1] >= start:
+                    yield intvl
+        else:
+            hi = bisect_right(self._starts, end - 1, lo)
+            for intvl in self._iter_by_start(lo, hi):
+                if intvl[0] == intvl[1]:
+                    if intvl[0] >= start:
+                        yield intvl
+                else:
+                    if intvl[1] > start + 1:
+                        yield intvl
+
+    def firsts(self):
+        """
+        Yields all intervals which start at the smallest known offset.
+        """
+        if len(self._starts) == 0:
+            return iter([])
+        return self.starting_at(self._starts[0])
+
+    def lasts(self):
+        """
+        Yields all intervals which start at the last known start offset.
+        """
+        if len(self._starts) == 0:
+            return iter([])
+        return self.starting_at(self._starts[-1])
+
+    def min_start(self):
+        """
+        Returns the smallest known start offset.
+        """
+        return self._starts[0]
+
+    def max_end(self):
+        """
+        Returns the biggest known end offset.
+        """
+        return self._e_ends[-1]
+
+    def irange(self, minoff=None, maxoff=None, reverse=False, inclusive=(True, True)):
+        """
+        Yields an iterator of intervals with a start offset between minoff and maxoff, inclusive.
+
+        Args:
+          minoff: minimum offset, default None indicates any
+          maxoff: maximum offset, default None indicates any
+          reverse: if `True` yield in reverse order
+          inclusive: if the minoff and maxoff values should be inclusive, default is (True,True)
+
+        Returns:
+
+        """
+        if minoff is None:
+            lo = 0
+        elif inclusive[0]:
+            lo = bisect_left(self._starts, minoff)
+        else:
+            lo = bisect_right(self._starts, minoff)
+        if maxoff is None:
+            hi = len(self._starts)
+        elif inclusive[1]:
+            hi = bisect_right(self._starts, maxoff, lo)
+        else:
+            hi = bisect_left(self._starts, maxoff, lo)
+        return self._iter_by_start(lo, hi, reverse=reverse)
+
+    def __repr__(self):
+        return "ArrayIntvls({})".format(list(self._iter_by_start(0, len(self._starts))))
@@ -242,8 +242,16 @@ class SortedIntvls:
         Returns:
 
         """
+        # the keys are tuples which start with the start offset, so we convert the offsets
+        # to one element tuples with bounds that include exactly the intended start offsets
+        min_key = None
+        max_key = None
+        if minoff is not None:
+            min_key = (minoff,) if inclusive[0] else (minoff + 1,)
+        if maxoff is not None:
+            max_key = (maxoff + 1,) if inclusive[1] else (maxoff,)
         return self._by_start.irange_key(
-            min_key=minoff, max_key=maxoff, reverse=reverse, inclusive=inclusive
+            min_key=min_key, max_key=max_key, reverse=reverse, inclusive=(True, False)
         )
 
     def __repr__(self):
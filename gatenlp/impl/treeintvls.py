@@ -0,0 +1,148 @@
+"""
+Module that provides an interval index which answers overlapping and covering queries in
+O(log n + k) for k result intervals.
+
+This extends the ArrayIntvls index with an augmented (max-end) interval tree: the intervals sorted by
+start offset are the leaves of an implicit, perfectly balanced binary tree which is stored in a
+single typed array where each node holds the biggest end offset of all intervals below it.
+To find all intervals which start before some offset and end at or after some other offset,
+only the subtrees which can contain such intervals need to be visited, all other subtrees get pruned.
+
+The tree gets created on the first overlapping or covering query and is discarded whenever intervals
+are added or removed, so the index works best when it is queried a lot between changes, e.g. when
+annotations get looked up after some annotator has added them.
+"""
+
+from array import array
+from bisect import bisect_right
+from gatenlp.impl.arrayintvls import ArrayIntvls, TYPECODE, np
+
+NOEND = -1
+
+
+class TreeIntvls(ArrayIntvls):
+    """
+    Interval index with an augmented max-end tree, see module documentation.
+    """
+
+    def __init__(self, by_ol=False):
+        """
+        Create an interval index. By default, this sorts by start offset and
+        annotation id. If by_ol is True, sorts by start offset, end offset and annotation id.
+
+        Args:
+            by_ol: if True, use start offset, end offset, annotation id
+        """
+        super().__init__(by_ol=by_ol)
+        self._tree = None
+        self._leaves = 0
+
+    def _build_tree(self):
+        """
+        Create the max-end tree from the end offsets of the intervals sorted by start offset.
+        Node 1 is the root, the children of node i are 2i and 2i+1 and the leaves start at
+        index self._leaves.
+        """
+        n = len(self._ends)
+        leaves = 1
+        while leaves < n:
+            leaves *= 2
+        if np is not None:
+            level = np.full(leaves, NOEND, dtype=np.int64)
+            level[:n] = np.frombuffer(self._ends, dtype=np.int64)
+            levels = [level]
+            while len(level) > 1:
+                level = level.reshape(-1, 2).max(axis=1)
+                levels.append(level)
+            levels.append(np.full(1, NOEND, dtype=np.int64))
+            tree = array(TYPECODE)
+            tree.frombytes(np.concatenate(levels[::-1]).tobytes())
+        else:
+            tree = array(TYPECODE, [NOEND]) * (2 * leaves)
+            tree[leaves:leaves + n] = self._ends
+            for i in range(leaves - 1, 0, -1):
+                left = tree[2 * i]
+                right = tree[2 * i + 1]
+                tree[i] = left if left > right else right
+        self._tree = tree
+        self._leaves = leaves
+
+    def _ending_from(self, hi, minend):
+        """
+        Yields the positions of all intervals among the first hi intervals (by start offset) which
+        end at or after minend, in increasing order.
+        """
+        if hi == 0:
+            return
+        if self._tree is None:
+            self._build_tree()
+        tree = self._tree
+        leaves = self._leaves
+        # stack of (node, first leaf position, number of leaves), right child gets pushed first
+        # so we process positions in increasing order
+        stack = [(1, 0, leaves)]
+        while stack:
+            node, first, size = stack.pop()
+            if first >= hi or tree[node] < minend:
+                continue
+            if size == 1:
+                yield first
+            else:
+                size = size // 2
+                stack.append((2 * node + 1, first + size, size))
+                stack.append((2 * node, first, size))
+
+    def _load(self, starts, ends, ids):
+        super()._load(starts, ends, ids)
+        self._tree = None
+
+    def add(self, start, end, data):
+        """
+        Adds an interval.
+        """
+        super().add(start, end, data)
+        self._tree = None
+
+    def _delete(self, start, end, data):
+        deleted = super()._delete(start, end, data)
+        if deleted:
+            self._tree = None
+        return deleted
+
+    def covering(self, start, end):
+        """
+        Returns intervals that contain the given range.
+        """
+        starts, ends, ids = self._starts, self._ends, self._ids
+        hi = bisect_right(starts, start)
+        for i in self._ending_from(hi, end):
+            # a zero length range is not covered by an interval which starts before and ends at it
+            if start == end and starts[i] < start and ends[i] == end:
+                continue
+            yield starts[i], ends[i], ids[i]
+
+    def overlapping(self, start, end):
+        """
+        Returns intervals that overlap with the given range.
+        """
+        # This uses the same conditions as SortedIntvls.overlapping, all of which require
+        # that the interval ends at or after start, so the tree can prune by that end offset.
+        starts, ends, ids = self._starts, self._ends, self._ids
+        if start == end:
+            hi = bisect_right(starts, end)
+            for i in self._ending_from(hi, start):
+                if starts[i] < start and ends[i] > start:
+                    yield starts[i], ends[i], ids[i]
+                elif starts[i] == start:
+                    yield starts[i], ends[i], ids[i]
+        else:
+            hi = bisect_right(starts, end - 1)
+            for i in self._ending_from(hi, start):
+                if starts[i] == ends[i]:
+                    if starts[i] >= start:
+                        yield starts[i], ends[i], ids[i]
+                elif ends[i] > start + 1:
+                    yield starts[i], ends[i], ids[i]
+
+    def __repr__(self):
+        return "TreeIntvls({})".format(list(self._iter_by_start(0, len(self._starts))))
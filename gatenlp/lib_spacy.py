@@ -25,6 +25,7 @@ class AnnSpacy(Annotator):
         add_nounchunks=True,
         add_deps=True,
         ent_prefix=None,
+        batch_size=None,
     ):
         """
         Create an annotator for running a spacy pipeline on documents.
@@ -42,6 +43,8 @@ class AnnSpacy(Annotator):
         :param add_nounchunks: if nounchunks should be added
         :param add_deps: if dependencies should be added
         :param ent_prefix: the prefix to add to all entity annotation types
+        :param batch_size: the batch size to pass to the spacy pipe method when processing several documents
+          with process_batch, if None, the spacy default
         :param kwargs: if no preconfigured pipeline is specified, pass these arguments to
            the stanza.Pipeline() constructor see https://stanfordnlp.github.io/stanza/pipeline.html#pipeline
         """
@@ -57,6 +60,7 @@ class AnnSpacy(Annotator):
         self.add_sentences = add_sentences
         self.add_nounchunks = add_nounchunks
         self.add_deps = add_deps
+        self.batch_size = batch_size
         if pipeline:
             self.pipeline = pipeline
         else:
@@ -64,6 +68,26 @@ class AnnSpacy(Annotator):
 
     def __call__(self, doc, **kwargs):
         spacy_doc = self.pipeline(doc.text)
+        return self._add_annotations(spacy_doc, doc)
+
+    def process_batch(self, docs, **kwargs):
+        """
+        Runs the spacy pipeline on the texts of all the documents with the spacy pipe method and
+        adds the annotations to each document.
+
+        :param docs: a list of documents
+        :param kwargs: ignored
+        :return: the list of documents
+        """
+        texts = [doc.text for doc in docs]
+        if self.batch_size is None:
+            spacy_docs = self.pipeline.pipe(texts)
+        else:
+            spacy_docs = self.pipeline.pipe(texts, batch_size=self.batch_size)
+        # spacy yields the results in the order of the texts
+        return [self._add_annotations(spacy_doc, doc) for spacy_doc, doc in zip(spacy_docs, docs)]
+
+    def _add_annotations(self, spacy_doc, doc):
         spacy2gatenlp(
             spacy_doc,
             doc,
@@ -149,74 +173,76 @@ def spacy2gatenlp(
         retdoc = gatenlpdoc
     toki2annid = {}
     annset = retdoc.annset(setname)
-    for tok in spacydoc:
-        from_off = tok.idx
-        to_off = tok.idx + len(tok)
-        # is_space = tok.is_space
-        fm = {
-            "_i": tok.i,
-            "is_alpha": tok.is_alpha,
-            "is_bracket": tok.is_bracket,
-            "is_currency": tok.is_currency,
-            "is_digit": tok.is_digit,
-            "is_left_punct": tok.is_left_punct,
-            "is_lower": tok.is_lower,
-            "is_oov": tok.is_oov,
-            "is_punct": tok.is_punct,
-            "is_quote": tok.is_quote,
-            "is_right_punct": tok.is_right_punct,
-            "is_sent_start": tok.is_sent_start,
-            "is_space": tok.is_space,
-            "is_stop": tok.is_stop,
-            "is_title": tok.is_title,
-            "is_upper": tok.is_upper,
-            "lang": tok.lang_,
-            "lemma": tok.lemma_,
-            "like_email": tok.like_email,
-            "like_num": tok.like_num,
-            "like_url": tok.like_url,
-            "orth": tok.orth,
-            "pos": tok.pos_,
-            "prefix": tok.prefix_,
-            "prob": tok.prob,
-            "rank": tok.rank,
-            "sentiment": tok.sentiment,
-            "tag": tok.tag_,
-            "shape": tok.shape_,
-            "suffix": tok.suffix_,
-        }
-        if spacydoc.is_nered and add_ents:
-            fm["ent_type"] = tok.ent_type_
-        if spacydoc.is_parsed and add_dep:
-            fm["dep"] = tok.dep_
-        if tok.is_space:
-            anntype = spacetoken_type
-        else:
-            anntype = token_type
-        annid = annset.add(from_off, to_off, anntype, fm).id
-        toki2annid[tok.i] = annid
-        # print("Added annotation with id: {} for token {}".format(annid, tok.i))
-        ws = tok.whitespace_
-        if len(ws) > 0:
-            annset.add(to_off, to_off + len(ws), spacetoken_type, {"is_space": True})
-    # if we have a dependency parse, now also add the parse edges
-    if spacydoc.is_parsed and add_tokens and add_dep:
+    # we add a lot of annotations, update the offset index in bulk once we are done
+    with annset.deferred_indexing():
         for tok in spacydoc:
-            ann = annset.get(toki2annid[tok.i])
-            ann.features["head"] = toki2annid[tok.head.i]
-            ann.features["left_edge"] = toki2annid[tok.left_edge.i]
-            ann.features["right_edge"] = toki2annid[tok.right_edge.i]
-    if spacydoc.ents and add_ents:
-        for ent in spacydoc.ents:
-            if ent_prefix:
-                entname = ent_prefix + ent.label_
+            from_off = tok.idx
+            to_off = tok.idx + len(tok)
+            # is_space = tok.is_space
+            fm = {
+                "_i": tok.i,
+                "is_alpha": tok.is_alpha,
+                "is_bracket": tok.is_bracket,
+                "is_currency": tok.is_currency,
+                "is_digit": tok.is_digit,
+                "is_left_punct": tok.is_left_punct,
+                "is_lower": tok.is_lower,
+                "is_oov": tok.is_oov,
+                "is_punct": tok.is_punct,
+                "is_quote": tok.is_quote,
+                "is_right_punct": tok.is_right_punct,
+                "is_sent_start": tok.is_sent_start,
+                "is_space": tok.is_space,
+                "is_stop": tok.is_stop,
+                "is_title": tok.is_title,
+                "is_upper": tok.is_upper,
+                "lang": tok.lang_,
+                "lemma": tok.lemma_,
+                "like_email": tok.like_email,
+                "like_num": tok.like_num,
+                "like_url": tok.like_url,
+                "orth": tok.orth,
+                "pos": tok.pos_,
+                "prefix": tok.prefix_,
+                "prob": tok.prob,
+                "rank": tok.rank,
+                "sentiment": tok.sentiment,
+                "tag": tok.tag_,
+                "shape": tok.shape_,
+                "suffix": tok.suffix_,
+            }
+            if spacydoc.is_nered and add_ents:
+                fm["ent_type"] = tok.ent_type_
+            if spacydoc.is_parsed and add_dep:
+                fm["dep"] = tok.dep_
+            if tok.is_space:
+                anntype = spacetoken_type
             else:
-                entname = ent.label_
-            annset.add(ent.start_char, ent.end_char, entname, {"lemma": ent.lemma_})
-    if spacydoc.sents and add_sents:
-        for sent in spacydoc.sents:
-            annset.add(sent.start_char, sent.end_char, sentence_type, {})
-    if spacydoc.noun_chunks and add_nounchunks:
-        for chunk in spacydoc.noun_chunks:
-            annset.add(chunk.start_char, chunk.end_char, nounchunk_type, {})
+                anntype = token_type
+            annid = annset.add(from_off, to_off, anntype, fm).id
+            toki2annid[tok.i] = annid
+            # print("Added annotation with id: {} for token {}".format(annid, tok.i))
+            ws = tok.whitespace_
+            if len(ws) > 0:
+                annset.add(to_off, to_off + len(ws), spacetoken_type, {"is_space": True})
+        # if we have a dependency parse, now also add the parse edges
+        if spacydoc.is_parsed and add_tokens and add_dep:
+            for tok in spacydoc:
+                ann = annset.get(toki2annid[tok.i])
+                ann.features["head"] = toki2annid[tok.head.i]
+                ann.features["left_edge"] = toki2annid[tok.left_edge.i]
+                ann.features["right_edge"] = toki2annid[tok.right_edge.i]
+        if spacydoc.ents and add_ents:
+            for ent in spacydoc.ents:
+                if ent_prefix:
+                    entname = ent_prefix + ent.label_
+                else:
+                    entname = ent.label_
+                annset.add(ent.start_char, ent.end_char, entname, {"lemma": ent.lemma_})
+        if spacydoc.sents and add_sents:
+            for sent in spacydoc.sents:
+                annset.add(sent.start_char, sent.end_char, sentence_type, {})
+        if spacydoc.noun_chunks and add_nounchunks:
+            for chunk in spacydoc.noun_chunks:
+                annset.add(chunk.start_char, chunk.end_char, nounchunk_type, {})
     return retdoc
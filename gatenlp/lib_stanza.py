@@ -51,6 +51,27 @@ class AnnStanza(Annotator):
 
     def __call__(self, doc, **kwargs):
         stanza_doc = self.pipeline(doc.text)
+        return self._add_annotations(stanza_doc, doc)
+
+    def process_batch(self, docs, **kwargs):
+        """
+        Runs the stanza pipeline on all the documents in one call and adds the annotations to each document.
+        Stanza then processes the texts together in the batches configured for each of its processors, e.g.
+        with the `tokenize_batch_size` or `pos_batch_size` pipeline arguments.
+
+        Args:
+            docs: a list of documents
+            **kwargs: ignored
+
+        Returns:
+            the list of documents
+        """
+        if not docs:
+            return []
+        stanza_docs = self.pipeline([stanza.Document([], text=doc.text) for doc in docs])
+        return [self._add_annotations(stanza_doc, doc) for stanza_doc, doc in zip(stanza_docs, docs)]
+
+    def _add_annotations(self, stanza_doc, doc):
         stanza2gatenlp(
             stanza_doc,
             doc,
@@ -163,77 +184,79 @@ def stanza2gatenlp(
         retdoc = gatenlpdoc
     toki2annid = {}
     annset = retdoc.annset(setname)
-    # stanford nlp processes text in sentence chunks, so we do everything per sentence
-    notmatchedidx = 0
-    for sent in stanzadoc.sentences:
-        # go through the tokens: in stanza, each token is a list of dicts, normally there is one dict
-        # which also has the offset information in "misc", but for multiword tokens, there seems to be
-        # one "header" dict for the range of words which has the offset info and NER label and then
-        # one additional element per word which has all the rest.
-        # For our purposes we create a list of dicts where for normal tokens we just copy the element, but for
-        # multiword tokens we copy over something that has fake offsets and all the features
-        newtokens = []
-        for t in sent.tokens:
-            t = t.to_dict()
-            if len(t) == 1:
-                newtokens.append(tok2tok(t[0]))
-            else:
-                tokinfo = tok2tok(t[0])
-                words = t[1:]
-                fm = tokinfo.get("fm")
-                ner = fm.get("ner")
-                text = fm.get("text")
-                start = tokinfo["start"]
-                end = tokinfo["end"]
-                for i, w in enumerate(words):
-                    tok = tok2tok(w)
-                    tok["fm"]["ner"] = ner
-                    tok["fm"]["token_text"] = text
-                    os = min(start + i, end - 1)
-                    tok["start"] = os
-                    if i == len(words) - 1:
-                        tok["end"] = end
-                    else:
-                        tok["end"] = os + 1
-                    newtokens.append(tok)
-        # print(f"\n!!!!!!DEBUG: newtokens={newtokens}")
-        # now go through the new token list and create annotations
-        idx2annid = {}  # map stanza word id to annotation id
-        starts = []
-        ends = []
-        for t in newtokens:
-            start = t["start"]
-            end = t["end"]
-            stanzaid = t["id"]
-            starts.append(start)
-            ends.append(end)
-            annid = annset.add(start, end, token_type, features=t["fm"]).id
-            idx2annid[str(stanzaid)] = annid
-        # print(f"\n!!!!!!DEBUG: idx2annid={idx2annid}")
-        # create a sentence annotation from beginning of first word to end of last
-        sentid = annset.add(starts[0], ends[-1], sentence_type).id
-        # now replace the head index with the corresponding annid, the head index "0" is
-        # mapped to the sentence annotation
-        idx2annid["0"] = sentid
-        for annid in list(idx2annid.values()):
-            ann = annset.get(annid)
-            hd = ann.features.get("head")
-            if hd is not None:
-                hd = str(hd)
-                headId = idx2annid.get(hd)
-                if headId is None:
-                    logger.error(
-                        f"Could not find head id: {hd} for {ann} in document {gatenlpdoc.name}"
-                    )
+    # we add a lot of annotations, update the offset index in bulk once we are done
+    with annset.deferred_indexing():
+        # stanford nlp processes text in sentence chunks, so we do everything per sentence
+        notmatchedidx = 0
+        for sent in stanzadoc.sentences:
+            # go through the tokens: in stanza, each token is a list of dicts, normally there is one dict
+            # which also has the offset information in "misc", but for multiword tokens, there seems to be
+            # one "header" dict for the range of words which has the offset info and NER label and then
+            # one additional element per word which has all the rest.
+            # For our purposes we create a list of dicts where for normal tokens we just copy the element, but for
+            # multiword tokens we copy over something that has fake offsets and all the features
+            newtokens = []
+            for t in sent.tokens:
+                t = t.to_dict()
+                if len(t) == 1:
+                    newtokens.append(tok2tok(t[0]))
                 else:
-                    ann.features["head"] = idx2annid[hd]
+                    tokinfo = tok2tok(t[0])
+                    words = t[1:]
+                    fm = tokinfo.get("fm")
+                    ner = fm.get("ner")
+                    text = fm.get("text")
+                    start = tokinfo["start"]
+                    end = tokinfo["end"]
+                    for i, w in enumerate(words):
+                        tok = tok2tok(w)
+                        tok["fm"]["ner"] = ner
+                        tok["fm"]["token_text"] = text
+                        os = min(start + i, end - 1)
+                        tok["start"] = os
+                        if i == len(words) - 1:
+                            tok["end"] = end
+                        else:
+                            tok["end"] = os + 1
+                        newtokens.append(tok)
+            # print(f"\n!!!!!!DEBUG: newtokens={newtokens}")
+            # now go through the new token list and create annotations
+            idx2annid = {}  # map stanza word id to annotation id
+            starts = []
+            ends = []
+            for t in newtokens:
+                start = t["start"]
+                end = t["end"]
+                stanzaid = t["id"]
+                starts.append(start)
+                ends.append(end)
+                annid = annset.add(start, end, token_type, features=t["fm"]).id
+                idx2annid[str(stanzaid)] = annid
+            # print(f"\n!!!!!!DEBUG: idx2annid={idx2annid}")
+            # create a sentence annotation from beginning of first word to end of last
+            sentid = annset.add(starts[0], ends[-1], sentence_type).id
+            # now replace the head index with the corresponding annid, the head index "0" is
+            # mapped to the sentence annotation
+            idx2annid["0"] = sentid
+            for annid in list(idx2annid.values()):
+                ann = annset.get(annid)
+                hd = ann.features.get("head")
+                if hd is not None:
+                    hd = str(hd)
+                    headId = idx2annid.get(hd)
+                    if headId is None:
+                        logger.error(
+                            f"Could not find head id: {hd} for {ann} in document {gatenlpdoc.name}"
+                        )
+                    else:
+                        ann.features["head"] = idx2annid[hd]
 
-    # add the entities
-    if add_entities:
-        for e in stanzadoc.entities:
-            if ent_prefix:
-                anntype = ent_prefix + e.type
-            else:
-                anntype = e.type
-            annset.add(e.start_char, e.end_char, anntype)
+        # add the entities
+        if add_entities:
+            for e in stanzadoc.entities:
+                if ent_prefix:
+                    anntype = ent_prefix + e.type
+                else:
+                    anntype = e.type
+                annset.add(e.start_char, e.end_char, anntype)
     return retdoc
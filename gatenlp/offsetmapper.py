@@ -4,73 +4,99 @@ Java strings are represented as UTF16 while Python strings are represented as Un
 differ if a Unicode character needs more than one UTF16 code unit.
 """
 
+import re
 import numbers
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional and only used to convert many offsets at once
+    np = None
 
 OFFSET_TYPE_JAVA = "j"
 OFFSET_TYPE_PYTHON = "p"
 
+# characters outside the basic multilingual plane need two UTF16 code units
+ASTRAL_CHAR = re.compile("[\U00010000-\U0010FFFF]")
+# str.isascii is a fast check for the most common case, but only exists from Python 3.7 on
+_HAS_ISASCII = hasattr(str, "isascii")
+
 
 class OffsetMapper:
     def __init__(self, text: str):
         """
-        Calculate the tables for mapping unicode code points to utf16 code units.
+        Find the characters in the text which need two UTF16 code units for mapping unicode code points to
+        utf16 code units.
 
-        NOTE: currently this optimizes for conversion speed at the cost of memory, with one special case:
-        if after creating the java2python table we find that all offsets are identical, we discard
-        the tables and just set a flag for that.
+        Only the python offsets of those characters are stored, in a sorted array, and offsets get converted
+        by finding the number of such characters before an offset with bisect. If the text contains only
+        characters from the basic multilingual plane, all offsets are identical and we just set a flag for
+        that.
 
         Args:
             text: the text as a python string
         """
-        # for now, remove dependency on numpy and use simple python lists of integers
-        # import numpy as np
-        cur_java_off = 0
-        python2java_list = [0]
-        java2python_list = []
-        last = len(text) - 1
-        for i, c in enumerate(text):
-            # get the java size of the current character
-            width = int(len(c.encode("utf-16be")) / 2)
-            assert width == 1 or width == 2
-            # the next java offset we get by incrementing the java offset by the with of the current char
-            cur_java_off += width
-            if i != last:
-                python2java_list.append(cur_java_off)
-            # i is the current python offset, so we append as many times to java2python_list as we have width
-            java2python_list.append(i)
-            if width == 2:
-                java2python_list.append(i)
-        if len(java2python_list) == len(text):
-            self.python2java = None
-            self.java2python = None
+        if not isinstance(text, str):
+            # e.g. a Document
+            text = text.text
+        self.text_length = len(text)
+        if (_HAS_ISASCII and text.isascii()) or not ASTRAL_CHAR.search(text):
+            self._astral_python = None
+            self._astral_java = None
             self.bijective = len(text)
         else:
-            python2java_list.append(python2java_list[-1] + 1)
-            # self.python2java = np.array(python2java_list, np.int32)
-            self.python2java = python2java_list
-            # self.java2python = np.array(java2python_list, np.int32)
-            java2python_list.append(java2python_list[-1] + 1)
-            self.java2python = java2python_list
+            # the python offsets of the astral characters and the java offsets where they start
+            self._astral_python = array("q", (m.start() for m in ASTRAL_CHAR.finditer(text)))
+            self._astral_java = array("q", (off + i for i, off in enumerate(self._astral_python)))
             self.bijective = None  # if we have identical offsets, this is set to the length of the text instead
 
-    def _convert_from(self, offsets, from_table=None):
+    @property
+    def python2java(self):
+        """
+        The full table which maps each python offset to a java offset, or None if the offsets are identical.
+        This gets created each time it is accessed, use `convert_to_java` to convert offsets instead.
+        """
+        if self.bijective is not None:
+            return None
+        return self.convert_to_java(range(self.text_length + 1))
+
+    @property
+    def java2python(self):
         """
+        The full table which maps each java offset to a python offset, or None if the offsets are identical.
+        This gets created each time it is accessed, use `convert_to_python` to convert offsets instead.
+        """
+        if self.bijective is not None:
+            return None
+        return self.convert_to_python(range(self.text_length + len(self._astral_python) + 1))
+
+    @staticmethod
+    def _convert_from(offsets, positions, sign):
+        """
+        Convert the offset or offsets by adding (sign=1) or subtracting (sign=-1) the number of
+        astral characters with a position before the offset.
 
         Args:
-          offsets:
-          from_table:  (Default value = None)
+          offsets: a single offset or an iterable of offsets
+          positions: the sorted positions of the astral characters or None if the offsets are identical
+          sign: 1 or -1
 
         Returns:
-
+            the converted offset or a list of converted offsets
         """
-        if from_table is None:
+        if positions is None:
             return offsets
         if isinstance(offsets, numbers.Integral):
-            return int(from_table[offsets])
-        ret = []
-        for offset in offsets:
-            ret.append(int(from_table[offset]))
-        return ret
+            return int(offsets) + sign * bisect_left(positions, offsets)
+        if np is not None:
+            offsets = np.fromiter(offsets, dtype=np.int64)
+            if len(offsets) > 1:
+                positions = np.frombuffer(positions, dtype=np.int64)
+                return (offsets + sign * np.searchsorted(positions, offsets, "left")).tolist()
+            offsets = offsets.tolist()
+        return [int(offset) + sign * bisect_left(positions, offset) for offset in offsets]
 
     def convert_to_python(self, offsets):
         """
@@ -83,7 +109,7 @@ class OffsetMapper:
             the converted offset or offsets
 
         """
-        return self._convert_from(offsets, from_table=self.java2python)
+        return self._convert_from(offsets, self._astral_java, -1)
 
     def convert_to_java(self, offsets):
         """Convert one python offset or an iterable of python offsets to java offset/s
@@ -95,4 +121,4 @@ class OffsetMapper:
             the converted offset or offsets
 
         """
-        return self._convert_from(offsets, from_table=self.python2java)
+        return self._convert_from(offsets, self._astral_python, 1)
@@ -4,12 +4,19 @@ Any callable that can be called by passing a document can be used as an annotato
 but the base class "Annotator" defined in here is designed to allow for a more
 flexible approach to do things.
 """
+import weakref
+import threading
 from abc import ABC, abstractmethod
 
 __pdoc__ = {"Annotator.__call__": True}
 
 
 class Annotator(ABC):
+    # The maximum number of documents an instance may process at the same time when it gets called
+    # from several threads, e.g. by the ThreadedCorpusExecutor, None for no limit. Annotators which are not
+    # thread-safe or which use a resource that can only process one document at a time should set this to 1.
+    max_concurrency = None
+
     @abstractmethod
     def __call__(self, doc, **kwargs):
         """
@@ -39,7 +46,26 @@ class Annotator(ABC):
         """
         raise Exception("This method must be implemented!")
 
-    def pipe(self, documents, **kwargs):
+    def process_batch(self, docs, **kwargs):
+        """
+        Processes a batch of documents and returns a list with the result for each of the documents, in the same
+        order. Each result is what `__call__` would return for the document: a document, None or a list of
+        documents.
+
+        The default implementation invokes `__call__` for each document. Annotators which can process
+        several documents more efficiently at once, e.g. by sending them to a model or service together,
+        should override this method. If processing fails, the method should raise an exception for the whole batch.
+
+        Args:
+            docs: a list of documents
+            **kwargs: any arguments to pass to the annotator
+
+        Returns:
+            a list with as many elements as there are documents
+        """
+        return [self.__call__(doc, **kwargs) for doc in docs]
+
+    def pipe(self, documents, batch_size=None, **kwargs):
         """
         If this method gets overridden, it should take an iterable of documents and yield processed documents.
         This allows for batching, caching, and other optimizations over streams of documents.
@@ -47,11 +73,17 @@ class Annotator(ABC):
 
         Args:
             documents: an iterable over documents or (document, context) tuples if with_context=True
+            batch_size: if not None, the documents are processed in batches of that size with `process_batch`
             **kwargs: arbitrary other keyword arguments must be accepted
 
         Yields:
             processed documents
         """
+        if batch_size is not None:
+            for batch in iter_batches(documents, batch_size):
+                for ret in self.process_batch(batch, **kwargs):
+                    yield from result_docs(ret)
+            return
         for el in documents:
             if el is not None:
                 docordocs = self.__call__(el, **kwargs)
@@ -115,3 +147,98 @@ class AnnotatorFunction(Annotator):
 
     def __call__(self, doc, **kwargs):
         return self.funct(doc, **kwargs)
+
+
+# the semaphore used to limit the concurrent calls for each annotator with a max_concurrency
+_semaphores = weakref.WeakKeyDictionary()
+_semaphores_lock = threading.Lock()
+
+
+def _concurrency_semaphore(annotator):
+    """
+    Returns the semaphore which limits the number of concurrent calls of the annotator or None if
+    the annotator does not have a max_concurrency.
+    """
+    limit = getattr(annotator, "max_concurrency", None)
+    if limit is None:
+        return None
+    with _semaphores_lock:
+        limit_sem = _semaphores.get(annotator)
+        if limit_sem is None or limit_sem[0] != limit:
+            limit_sem = (limit, threading.BoundedSemaphore(limit))
+            _semaphores[annotator] = limit_sem
+    return limit_sem[1]
+
+
+def call_annotator(annotator, doc, **kwargs):
+    """
+    Calls the annotator on the document, but waits if the annotator has a max_concurrency and
+    that many calls from other threads are already running.
+
+    Args:
+        annotator: the annotator or callable
+        doc: the document
+        **kwargs: passed on to the annotator
+
+    Returns:
+        whatever the annotator returns
+    """
+    sem = _concurrency_semaphore(annotator)
+    if sem is None:
+        return annotator(doc, **kwargs)
+    with sem:
+        return annotator(doc, **kwargs)
+
+
+def call_annotator_batch(annotator, docs, **kwargs):
+    """
+    Processes the list of documents with the `process_batch` method of the annotator or, if it
+    does not have one, by calling it for each document. Like `call_annotator`, this waits if the annotator
+    has a max_concurrency and that many calls are already running.
+
+    Args:
+        annotator: the annotator or callable
+        docs: the list of documents
+        **kwargs: passed on to the annotator
+
+    Returns:
+        a list with the result for each of the documents
+    """
+    process_batch = getattr(annotator, "process_batch", None)
+    if process_batch is None:
+        return [call_annotator(annotator, doc, **kwargs) for doc in docs]
+    sem = _concurrency_semaphore(annotator)
+    if sem is None:
+        return process_batch(docs, **kwargs)
+    with sem:
+        return process_batch(docs, **kwargs)
+
+
+def result_docs(ret):
+    """
+    Returns the list of documents in the result returned by an annotator for a document: a list with
+    the document, the non-None documents of the list or an empty list for None.
+    """
+    if ret is None:
+        return []
+    if isinstance(ret, list):
+        return [d for d in ret if d is not None]
+    return [ret]
+
+
+def iter_batches(documents, batch_size):
+    """
+    Yields lists of up to batch_size documents from the iterable, None items are skipped.
+    """
+    if batch_size < 1:
+        raise Exception(f"batch_size must be at least 1, not {batch_size}")
+    batch = []
+    for doc in documents:
+        if doc is None:
+            continue
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -9,7 +9,6 @@ import requests
 from requests.auth import HTTPBasicAuth
 from gatenlp.utils import init_logger
 import time
-from gatenlp.offsetmapper import OffsetMapper
 
 # TODO:
 # * support compression send/receive
@@ -234,7 +233,7 @@ class TagMeAnnotator(Annotator):
         # self.logger.debug(f"Response JSON: {json}")
         ents = json.get("annotations", {})
         annset = doc.annset(self.out_annset)
-        om = OffsetMapper(text)
+        om = doc.offset_mapper
         for ent in ents:
             start = ent["start"]
             end = ent["end"]
@@ -522,7 +521,7 @@ class ElgTextAnnotator(Annotator):
         delay = time.time() - self._last_call_time
         if delay < self.min_delay_s:
             time.sleep(self.min_delay_s - delay)
-        om = OffsetMapper(doc.text)
+        om = doc.offset_mapper
         request_json = json.dumps(
             {"type": "text", "content": doc.text, "mimeType": "text/plain"}
         )
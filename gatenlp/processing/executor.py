@@ -1,10 +1,152 @@
+import os
+import queue
+import pickle
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import traceback
+import multiprocessing
 from gatenlp.processing.pipeline import _has_method
+from gatenlp.processing.annotator import call_annotator, call_annotator_batch
+from gatenlp.processing.instrumentation import Instrumentation
 from gatenlp.utils import init_logger
 
 __pdoc__ = {"Annotator.__call__": True}
 
 
-class SerialCorpusExecutor:
+# used instead of the results for documents which could not be processed
+_FAILED = object()
+
+
+def _reduce_results(annotator, results):
+    """
+    Combines the results returned by finish() for the instances of the annotator run in different processes
+    or threads: returns None if there are no results, otherwise whatever reduce returns, or the list of results
+    if the annotator does not have a reduce method.
+    """
+    if all(r is None for r in results):
+        return None
+    if _has_method(annotator, "reduce"):
+        return annotator.reduce(results)
+    return results
+
+
+def _process_docs(annotator, docs, batch_size, kwargs):
+    """
+    Returns the list of results of running the annotator on the documents, using the process_batch method
+    of the annotator if batch_size is not None.
+    """
+    if batch_size is None:
+        return [call_annotator(annotator, doc, **kwargs) for doc in docs]
+    return call_annotator_batch(annotator, docs, **kwargs)
+
+
+def _batch_desc(batch):
+    """
+    Returns a description of the batch of (index, document name) tuples for error messages.
+    """
+    if len(batch) == 1:
+        return f"document {batch[0][0]}/{batch[0][1]}"
+    return f"documents {batch[0][0]}/{batch[0][1]} to {batch[-1][0]}/{batch[-1][1]}"
+
+
+class _CorpusExecutor:
+    """
+    Common base of the executors: keeps the settings and counts, reads the documents in batches and
+    stores the results back into the corpus or appends them to the destination.
+    """
+
+    def __init__(
+        self,
+        annotator,
+        corpus=None,
+        source=None,
+        destination=None,
+        readonly=False,
+        exit_on_error=False,
+        logger=None,
+        batch_size=None,
+    ):
+        if (corpus is None and source is None) or (
+            corpus is not None and source is not None
+        ):
+            raise Exception("Exactly one of corpus or source must be specified")
+        if batch_size is not None and batch_size < 1:
+            raise Exception(f"batch_size must be at least 1, not {batch_size}")
+        self.corpus = corpus
+        self.source = source
+        self.destination = destination
+        self.annotator = annotator
+        self.readonly = readonly
+        self.exit_on_error = exit_on_error
+        self.batch_size = batch_size
+        self.n_in = 0
+        self.n_none = 0  # number of None items from the corpus/source, ignored
+        self.n_out = 0
+        self.n_err = 0
+        if logger:
+            self.logger = logger
+        else:
+            self.logger = init_logger(__name__)
+
+    def _batches(self):
+        """
+        Yields the documents from the corpus or source as lists of (index, document) tuples, with batch_size
+        documents or single documents if batch_size is None. None items are counted and skipped, documents
+        for which `_skip` returns True are skipped without counting them (and without reading them from a corpus).
+        """
+        if self.corpus is not None:
+            docs = ((idx, self.corpus[idx]) for idx in range(len(self.corpus)) if not self._skip(idx))
+        else:
+            docs = ((idx, doc) for idx, doc in enumerate(self.source) if not self._skip(idx))
+        size = self.batch_size or 1
+        batch = []
+        for idx, doc in docs:
+            self.n_in += 1
+            if doc is None:
+                self.n_none += 1
+                continue
+            batch.append((idx, doc))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _skip(self, idx):
+        """
+        Returns True if the document with index idx should not be processed.
+        """
+        return False
+
+    def _store(self, idx, ret):
+        """
+        Stores the result of processing the document with index idx back into the corpus, or appends
+        the result documents to the destination.
+        """
+        if ret is _FAILED:
+            return
+        if self.destination is None:
+            if self.corpus is None:
+                return
+            if ret is None:
+                self.n_out += 1
+                return
+            if isinstance(ret, list):
+                if len(ret) != 1:
+                    raise Exception("Cannot update corpus if Annotator returns not exactly one document")
+                ret = ret[0]
+            if not self.readonly:
+                self.corpus[idx] = ret
+            self.n_out += 1
+        elif ret is not None:
+            for d in ret if isinstance(ret, list) else [ret]:
+                if not self.readonly:
+                    self.destination.append(d)
+                self.n_out += 1
+
+
+class SerialCorpusExecutor(_CorpusExecutor):
     """
     Runs a pipeline on either a corpus, where each document gets in the corpus gets processed and stored back
     in turn, or on a source and destination, where each document from the source gets processed and all documents
@@ -20,6 +162,12 @@ class SerialCorpusExecutor:
         readonly=False,
         exit_on_error=False,
         logger=None,
+        batch_size=None,
+        instrument=False,
+        trace_memory=False,
+        checkpoint=None,
+        checkpoint_every=1000,
+        is_done=None,
     ):
         """
         Creates an Executor to run an annotator on either a corpus or a document source. If a corpus is specified,
@@ -46,100 +194,455 @@ class SerialCorpusExecutor:
             readonly: if True, nothing is saved back to the corpus or appended to the destination.
             exit_on_error: if True pass on exception, otherwise just log, use None and continue
             logger: logger to use, if None, uses a default logger
+            batch_size: if not None, documents are passed to the `process_batch` method of the annotator in
+              batches of that size, if processing a batch fails, all its documents are counted as errors
+            instrument: if True, collect the time used, documents processed and annotations added by the
+              annotator in the `instrumentation` attribute, see `gatenlp.processing.instrumentation`. To get these
+              statistics for each annotator of a pipeline, create the pipeline with `instrument=True`.
+            trace_memory: if True and instrument is True, also trace the peak memory allocated by the annotator
+            checkpoint: if not None, the path of a file where the state of processing gets saved every
+              checkpoint_every documents, so that processing can get resumed after the documents processed
+              so far when the executor is run again with the same checkpoint file. The file gets removed when
+              processing finishes. The corpus or source must contain the same documents in the same order when
+              resuming. If the destination supports `tell` and `truncate`, like the JSON lines file destinations
+              opened with `append=True`, the documents appended after the saved state are removed when resuming,
+              otherwise these documents get appended again.
+            checkpoint_every: the number of documents to process between saving the state
+            is_done: if not None, a function which gets the index of a document and returns True if that
+              document has already been processed and should be skipped, e.g. the `is_cached` method of a
+              `CachedCorpus` or the `exists` method of a `NumberedDirFilesCorpus` used as the destination of results
 
         Returns:
             if annotator has a finish() method calls it and returns whatever it returns, otherwise None
         """
-        if (corpus is None and source is None) or (
-            corpus is not None and source is not None
-        ):
-            raise Exception("Exactly one of corpus or source must be specified")
-        self.corpus = corpus
-        self.source = source
-        self.destination = destination
-        self.annotator = annotator
-        self.readonly = readonly
-        self.exit_on_error = exit_on_error
-        self.n_in = 0
-        self.n_none = 0  # number of None items from the corpus/source, ignored
-        self.n_out = 0
-        self.n_err = 0
-        if logger:
-            self.logger = logger
-        else:
-            self.logger = init_logger(__name__)
+        super().__init__(
+            annotator, corpus=corpus, source=source, destination=destination, readonly=readonly,
+            exit_on_error=exit_on_error, logger=logger, batch_size=batch_size,
+        )
+        self.instrumentation = None
+        if instrument:
+            name = getattr(annotator, "__name__", None) or annotator.__class__.__name__
+            self.instrumentation = Instrumentation([name], trace_memory=trace_memory)
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.is_done = is_done
+        self.n_skipped = 0  # number of documents skipped because is_done returned True
+        # all documents up to this index have been processed
+        self._watermark = -1
+        # the results returned by finish() whenever the state was saved
+        self._partials = []
+
+    def _skip(self, idx):
+        if idx <= self._watermark:
+            return True
+        if self.is_done is not None and self.is_done(idx):
+            self.n_skipped += 1
+            return True
+        return False
+
+    def _load_checkpoint(self):
+        """
+        Restores the state saved in the checkpoint file, if it exists.
+        """
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return
+        with open(self.checkpoint, "rb") as infp:
+            state = pickle.load(infp)
+        for key in ["n_in", "n_none", "n_out", "n_err", "n_skipped"]:
+            setattr(self, key, state[key])
+        self._watermark = state["watermark"]
+        self._partials = state["partials"]
+        position = state["destination_position"]
+        if position is not None and not self.readonly and _has_method(self.destination, "truncate"):
+            # remove the documents appended after the state was saved, so they do not get appended twice
+            self.destination.truncate(position)
+        self.logger.info(f"Resuming processing after document {self._watermark} from {self.checkpoint}")
+
+    def _save_checkpoint(self):
+        """
+        Saves the state after the documents processed so far to the checkpoint file. This ends processing
+        the documents so far by calling finish() of the annotator, keeps the result and calls start() again,
+        so that the partial results get combined with reduce() at the end.
+        """
+        if _has_method(self.annotator, "finish"):
+            self._partials.append(self.annotator.finish())
+        if _has_method(self.annotator, "start"):
+            self.annotator.start()
+        if self.destination is not None and _has_method(self.destination, "flush"):
+            self.destination.flush()
+        position = None
+        if self.destination is not None and _has_method(self.destination, "tell"):
+            position = self.destination.tell()
+        state = dict(
+            watermark=self._watermark, partials=self._partials, n_in=self.n_in, n_none=self.n_none,
+            n_out=self.n_out, n_err=self.n_err, n_skipped=self.n_skipped, destination_position=position,
+        )
+        # write to a temporary file first, so that a crash while saving does not destroy the previous state
+        tmpfile = self.checkpoint + ".tmp"
+        with open(tmpfile, "wb") as outfp:
+            pickle.dump(state, outfp)
+        os.replace(tmpfile, self.checkpoint)
+
+    def _run(self, docs, kwargs):
+        if self.instrumentation is None:
+            return _process_docs(self.annotator, docs, self.batch_size, kwargs)
+        name = self.instrumentation.names[0]
+        if self.batch_size is None:
+            return [self.instrumentation.call(name, self.annotator, doc, **kwargs) for doc in docs]
+        return self.instrumentation.call_batch(name, self.annotator, docs, **kwargs)
 
     def __call__(self, **kwargs):
+        self._load_checkpoint()
+        if self.instrumentation is not None:
+            self.instrumentation.start()
         if _has_method(self.annotator, "start"):
             self.annotator.start()
-        if self.corpus:
-            for idx, doc in enumerate(self.corpus):
-                self.n_in += 1
-                if doc is None:
-                    self.n_none += 1
-                    continue
+        ndocs = 0  # the documents processed since the state was saved
+        try:
+            for batch in self._batches():
                 try:
-                    ret = self.annotator(doc, **kwargs)
+                    rets = self._run([doc for _, doc in batch], kwargs)
                 except Exception as ex:
-                    self.n_err += 1
+                    self.n_err += len(batch)
                     if self.exit_on_error:
                         raise ex
                     else:
-                        docname = doc.name
-                        self.logger.error(f"Error processing document {idx}/{docname}",
-                                          exc_info=ex, stack_info=True)
-                        continue
-                if self.destination is None:
-                    if ret is None:
-                        self.n_out += 1
+                        desc = _batch_desc([(idx, doc.name) for idx, doc in batch])
+                        self.logger.error(f"Error processing {desc}", exc_info=ex, stack_info=True)
                         continue
-                    if isinstance(ret, list):
-                        if len(ret) != 1:
-                            raise Exception(
-                                "Cannot update corpus if Annotator returns not exactly one document"
-                            )
-                        else:
-                            ret = ret[0]
-                    self.corpus[idx] = ret
-                else:
-                    if ret is not None:
-                        if isinstance(ret, list):
-                            for d in ret:
-                                self.destination.append(d)
-                                self.n_out += 1
-                        else:
-                            self.destination.append(ret)
-                            self.n_out += 1
+                for (idx, _), ret in zip(batch, rets):
+                    self._store(idx, ret)
+                if self.checkpoint is not None:
+                    self._watermark = batch[-1][0]
+                    ndocs += len(batch)
+                    if ndocs >= self.checkpoint_every:
+                        self._save_checkpoint()
+                        ndocs = 0
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.stop()
+        if _has_method(self.annotator, "finish"):
+            rets = self.annotator.finish()
         else:
-            idx = -1
-            for doc in self.source:
-                idx += 1
-                self.n_in += 1
-                if doc is None:
-                    self.n_none += 1
-                    continue
+            rets = None
+        if self.checkpoint is not None and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        # NOTE: since this is single-threaded, no reduce call is necessary, unless the results were split up
+        # by saving the state
+        if self._partials:
+            return _reduce_results(self.annotator, self._partials + [rets])
+        return rets
+
+
+def _mp_worker(annotator, inqueue, outqueue, batch_size, kwargs):
+    """
+    Runs in each worker process of the MultiprocessingCorpusExecutor: calls start, processes the
+    batches of documents from the input queue until it gets None, then calls finish.
+
+    Everything gets sent back on the output queue as tuples (what, seq, value, error) where what is
+    "result" for the list of results of processing the batch with the sequence number seq or "finish" for the
+    value returned by finish(). The value is pickled here, so that a result which cannot be pickled
+    is reported as an error instead of failing in the feeder thread of the queue.
+    If there was an error, value is None and error the error message and formatted traceback.
+    """
+    if _has_method(annotator, "start"):
+        annotator.start()
+    while True:
+        item = inqueue.get()
+        if item is None:
+            break
+        seq, docs = item
+        try:
+            data = pickle.dumps(_process_docs(annotator, docs, batch_size, kwargs))
+            outqueue.put(("result", seq, data, None))
+        except Exception as ex:
+            outqueue.put(("result", seq, None, f"{ex!r}\n{traceback.format_exc()}"))
+    try:
+        ret = annotator.finish() if _has_method(annotator, "finish") else None
+        outqueue.put(("finish", None, pickle.dumps(ret), None))
+    except Exception as ex:
+        outqueue.put(("finish", None, None, f"{ex!r}\n{traceback.format_exc()}"))
+
+
+class MultiprocessingCorpusExecutor(_CorpusExecutor):
+    """
+    Runs an annotator on a corpus or document source like the SerialCorpusExecutor, but in several worker
+    processes. Each worker process gets its own copy of the annotator, calls start(), processes the documents
+    it gets sent and calls finish(), the results of finish() from all the workers are then combined by
+    calling reduce() of the annotator.
+
+    The documents are read from the corpus or source in this process and sent to the workers, and the
+    processed documents are sent back and stored into the corpus or appended to the destination in this
+    process, so any corpus, source and destination can be used. Documents are appended to the destination
+    in the order of the source, unless `ordered=False`.
+    """
+
+    def __init__(
+        self,
+        annotator,
+        corpus=None,
+        source=None,
+        destination=None,
+        readonly=False,
+        exit_on_error=False,
+        logger=None,
+        nworkers=None,
+        ordered=True,
+        queue_size=None,
+        mp_context=None,
+        batch_size=None,
+    ):
+        """
+        Creates an executor which runs the annotator in several processes. The annotator and the documents
+        must be picklable.
+
+        Args:
+            annotator: the callable to run on each document. If this is an instance of Annotator, the additional
+              methods start, finish, and reduce are called as appropriate
+            corpus: the corpus to process.
+            source: a document source to process. Corpus and source are mutually exclusive.
+            destination: if specified, the result documents are appended to the destination unless
+              readonly is True.
+            readonly: if True, nothing is saved back to the corpus or appended to the destination.
+            exit_on_error: if True, stop all processing and raise an exception if processing a document
+              fails, otherwise just log, and continue
+            logger: logger to use, if None, uses a default logger
+            nworkers: the number of worker processes, if None, the number of CPUs
+            ordered: if True, documents are appended to the destination in the order of the corpus or source,
+              otherwise in the order in which they are finished.
+            queue_size: the maximum number of documents (or batches) waiting to get processed, if None,
+              4 times nworkers
+            mp_context: the multiprocessing context or start method name to use, if None, the default
+            batch_size: if not None, documents are sent to the workers and passed to the `process_batch` method
+              of the annotator in batches of that size, if processing a batch fails, all its documents are
+              counted as errors
+        """
+        super().__init__(
+            annotator, corpus=corpus, source=source, destination=destination, readonly=readonly,
+            exit_on_error=exit_on_error, logger=logger, batch_size=batch_size,
+        )
+        self.ordered = ordered
+        self.nworkers = nworkers if nworkers is not None else multiprocessing.cpu_count()
+        self.queue_size = queue_size if queue_size is not None else 4 * self.nworkers
+        if mp_context is None or isinstance(mp_context, str):
+            mp_context = multiprocessing.get_context(mp_context)
+        self.mp_context = mp_context
+
+    def _feed(self, inqueue, sent, stop, errors):
+        """
+        Sends the batches of documents to the workers, followed by one None for each worker. Runs in a thread.
+        Records the indices in the corpus (or source) and names of the documents of each batch sent in sent.
+        If reading the documents fails, the exception is added to errors and the workers still get
+        their None, so that they finish.
+        """
+        try:
+            for batch in self._batches():
+                if stop.is_set():
+                    break
+                sent.append([(idx, doc.name) for idx, doc in batch])
+                inqueue.put((len(sent) - 1, [doc for _, doc in batch]))
+        except Exception as ex:
+            errors.append(ex)
+        finally:
+            for _ in range(self.nworkers):
+                inqueue.put(None)
+
+    def _store_batch(self, batch, rets):
+        """
+        Stores the list of results for the batch of (index, document name) tuples.
+        """
+        if rets is _FAILED:
+            return
+        for (idx, _), ret in zip(batch, rets):
+            self._store(idx, ret)
+
+    def __call__(self, **kwargs):
+        """
+        Runs the annotator over all documents in the worker processes.
+
+        Args:
+            **kwargs: passed on to each invocation of the annotator
+
+        Returns:
+            None if no worker returned a result from finish, otherwise the result of reduce, or the list of
+            results if the annotator does not have a reduce method
+        """
+        ctx = self.mp_context
+        inqueue = ctx.Queue(maxsize=self.queue_size)
+        outqueue = ctx.Queue()
+        workers = [
+            ctx.Process(
+                target=_mp_worker, args=(self.annotator, inqueue, outqueue, self.batch_size, kwargs), daemon=True
+            )
+            for _ in range(self.nworkers)
+        ]
+        for worker in workers:
+            worker.start()
+        sent = []
+        stop = threading.Event()
+        feed_errors = []
+        feeder = threading.Thread(target=self._feed, args=(inqueue, sent, stop, feed_errors), daemon=True)
+        feeder.start()
+        finished = []
+        pending = {}
+        nextseq = 0
+        try:
+            while len(finished) < self.nworkers:
                 try:
-                    ret = self.annotator(doc, **kwargs)
-                except Exception as ex:
-                    self.n_err += 1
+                    what, seq, value, error = outqueue.get(timeout=1)
+                except queue.Empty:
+                    if any(worker.exitcode not in (None, 0) for worker in workers):
+                        raise Exception("A worker process terminated unexpectedly")
+                    continue
+                if what == "finish":
+                    if error is not None:
+                        raise Exception(f"Error in finish() of a worker: {error}")
+                    finished.append(pickle.loads(value))
+                    continue
+                if error is not None:
+                    self.n_err += len(sent[seq])
                     if self.exit_on_error:
-                        raise ex
-                    else:
-                        docname = doc.name
-                        self.logger.error(f"Error processing document {idx}/{docname}",
-                                          exc_info=ex, stack_info=True)
-                        continue
-                if ret is not None and self.destination:
-                    if isinstance(ret, list):
-                        for d in ret:
-                            self.destination.append(d)
-                            self.n_out += 1
-                    else:
-                        self.destination.append(ret)
-                        self.n_out += 1
+                        raise Exception(f"Error processing {_batch_desc(sent[seq])}: {error}")
+                    self.logger.error(f"Error processing {_batch_desc(sent[seq])}: {error}")
+                    value = _FAILED
+                else:
+                    value = pickle.loads(value)
+                if not self.ordered or self.destination is None:
+                    self._store_batch(sent[seq], value)
+                    continue
+                # keep results which are ahead of the next batch to append
+                pending[seq] = value
+                while nextseq in pending:
+                    self._store_batch(sent[nextseq], pending.pop(nextseq))
+                    nextseq += 1
+            if feed_errors:
+                raise Exception("Error reading the documents to process") from feed_errors[0]
+        except BaseException:
+            stop.set()
+            for worker in workers:
+                worker.terminate()
+            inqueue.cancel_join_thread()
+            raise
+        finally:
+            feeder.join(timeout=1)
+            for worker in workers:
+                worker.join()
+        return _reduce_results(self.annotator, finished)
+
+
+class ThreadedCorpusExecutor(_CorpusExecutor):
+    """
+    Runs an annotator on a corpus or document source like the SerialCorpusExecutor, but keeps several
+    documents in flight on a pool of threads. This is useful for annotators which spend most of their time
+    waiting, e.g. for a remote service or the Java GATE process.
+
+    A single instance of the annotator is used by all threads, so start() and finish() get called once.
+    The annotator, and each annotator in a pipeline, must be thread-safe or limit how many documents it
+    processes at the same time with its `max_concurrency` attribute. At most `queue_size` documents are read
+    from the corpus or source ahead of the documents which have been stored. Documents are appended to the
+    destination in the order of the source, unless `ordered=False`.
+    """
+
+    def __init__(
+        self,
+        annotator,
+        corpus=None,
+        source=None,
+        destination=None,
+        readonly=False,
+        exit_on_error=False,
+        logger=None,
+        nthreads=4,
+        ordered=True,
+        queue_size=None,
+        batch_size=None,
+    ):
+        """
+        Creates an executor which runs the annotator on several documents at the same time in a thread pool.
+
+        Args:
+            annotator: the callable to run on each document. If this is an instance of Annotator, the additional
+              methods start and finish are called as appropriate
+            corpus: the corpus to process.
+            source: a document source to process. Corpus and source are mutually exclusive.
+            destination: if specified, the result documents are appended to the destination unless
+              readonly is True.
+            readonly: if True, nothing is saved back to the corpus or appended to the destination.
+            exit_on_error: if True, stop processing and raise the exception if processing a document
+              fails, otherwise just log, and continue
+            logger: logger to use, if None, uses a default logger
+            nthreads: the number of threads, i.e. the number of documents processed at the same time
+            ordered: if True, documents are appended to the destination in the order of the corpus or source,
+              otherwise in the order in which they are finished.
+            queue_size: the maximum number of documents (or batches) read ahead which have not been stored yet,
+              if None, 2 times nthreads
+            batch_size: if not None, each thread passes batches of that size to the `process_batch` method
+              of the annotator, if processing a batch fails, all its documents are counted as errors
+        """
+        super().__init__(
+            annotator, corpus=corpus, source=source, destination=destination, readonly=readonly,
+            exit_on_error=exit_on_error, logger=logger, batch_size=batch_size,
+        )
+        self.ordered = ordered
+        self.nthreads = nthreads
+        self.queue_size = max(queue_size if queue_size is not None else 2 * nthreads, 1)
+
+    def _handle(self, batch, future):
+        """
+        Stores the results of the future for the batch of (index, document name) tuples or handles its error.
+        """
+        try:
+            rets = future.result()
+        except Exception as ex:
+            self.n_err += len(batch)
+            if self.exit_on_error:
+                raise ex
+            self.logger.error(f"Error processing {_batch_desc(batch)}", exc_info=ex)
+            return
+        for (idx, _), ret in zip(batch, rets):
+            self._store(idx, ret)
+
+    def __call__(self, **kwargs):
+        """
+        Runs the annotator over all documents.
+
+        Args:
+            **kwargs: passed on to each invocation of the annotator
+
+        Returns:
+            if annotator has a finish() method calls it and returns whatever it returns, otherwise None
+        """
+        if _has_method(self.annotator, "start"):
+            self.annotator.start()
+        # the batches in flight as (list of (index, name), future), in the order they were read
+        inflight = deque()
+        with ThreadPoolExecutor(max_workers=self.nthreads) as pool:
+            try:
+                for batch in self._batches():
+                    future = pool.submit(
+                        _process_docs, self.annotator, [doc for _, doc in batch], self.batch_size, kwargs
+                    )
+                    inflight.append(([(idx, doc.name) for idx, doc in batch], future))
+                    while len(inflight) >= self.queue_size:
+                        self._handle_next(inflight)
+                while inflight:
+                    self._handle_next(inflight)
+            except BaseException:
+                for _, future in inflight:
+                    future.cancel()
+                raise
         if _has_method(self.annotator, "finish"):
-            rets = self.annotator.finish()
-            return rets
-        else:
-            return None
-        # NOTE: since this is single-threaded, no reduce call is necessary!
+            return self.annotator.finish()
+        return None
+
+    def _handle_next(self, inflight):
+        """
+        Waits for and handles the oldest batch in flight or, if not ordered, the first one which finishes.
+        """
+        if self.ordered:
+            self._handle(*inflight.popleft())
+            return
+        wait([future for _, future in inflight], return_when=FIRST_COMPLETED)
+        for item in [item for item in inflight if item[1].done()]:
+            inflight.remove(item)
+            self._handle(*item)
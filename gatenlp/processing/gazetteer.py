@@ -689,33 +689,35 @@ class TokenGazetteer:
         anns = doc.annset(annset).with_type(anntypes)
         # now do the annotation process for each segment
         outset = doc.annset(self.outset)
-        for segment_start, segment_end in segment_offs:
-            tokens = list(anns.within(segment_start, segment_end))
-            for matches in self.find_all(tokens, doc=doc):
-                for match in matches:
-                    starttoken = tokens[match.start]
-                    endtoken = tokens[
-                        match.end - 1
-                    ]  # end is the index after the last match!!
-                    startoffset = starttoken.start
-                    endoffset = endtoken.end
-                    if (
-                        match.data
-                    ):  # TODO: for now data and listidx are either both None or lists with same len
-                        for data, listidx in zip(match.data, match.listidx):
-                            outtype = self.outtype
-                            feats = {}
-                            if listidx is not None:
-                                feats.update(self.listfeatures[listidx])
-                                outtype = self.listtypes[listidx]
-                            if "_gatenlp.gazetteer.outtype" in feats:
-                                outtype = feats["_gatenlp.gazetteer.outtype"]
-                                del feats["_gatenlp.gazetteer.outtype"]
-                            if data is not None:
-                                feats.update(data)
-                            outset.add(startoffset, endoffset, outtype, features=feats)
-                    else:
-                        outset.add(startoffset, endoffset, self.outtype)
+        # we may add a lot of annotations, update the offset index in bulk once we are done
+        with outset.deferred_indexing():
+            for segment_start, segment_end in segment_offs:
+                tokens = list(anns.within(segment_start, segment_end))
+                for matches in self.find_all(tokens, doc=doc):
+                    for match in matches:
+                        starttoken = tokens[match.start]
+                        endtoken = tokens[
+                            match.end - 1
+                        ]  # end is the index after the last match!!
+                        startoffset = starttoken.start
+                        endoffset = endtoken.end
+                        if (
+                            match.data
+                        ):  # TODO: for now data and listidx are either both None or lists with same len
+                            for data, listidx in zip(match.data, match.listidx):
+                                outtype = self.outtype
+                                feats = {}
+                                if listidx is not None:
+                                    feats.update(self.listfeatures[listidx])
+                                    outtype = self.listtypes[listidx]
+                                if "_gatenlp.gazetteer.outtype" in feats:
+                                    outtype = feats["_gatenlp.gazetteer.outtype"]
+                                    del feats["_gatenlp.gazetteer.outtype"]
+                                if data is not None:
+                                    feats.update(data)
+                                outset.add(startoffset, endoffset, outtype, features=feats)
+                        else:
+                            outset.add(startoffset, endoffset, self.outtype)
         return doc
 
 
@@ -0,0 +1,284 @@
+"""
+Module for collecting statistics about running annotators: the wall and CPU time used, the number of calls,
+the number of documents passed in and returned, the number of annotations added for each annotation set
+and type and optionally the peak of memory allocated while running the annotator (using tracemalloc).
+
+This is used by `Pipeline` and `SerialCorpusExecutor` if they are created with `instrument=True`.
+"""
+
+import time
+import threading
+import tracemalloc
+from gatenlp.processing.annotator import call_annotator, call_annotator_batch, result_docs
+
+
+class AnnotatorStats:
+    """
+    The statistics collected for running one annotator.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.docs_in = 0
+        self.docs_out = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        # the maximum increase of allocated memory during a call in bytes, None if not traced
+        self.mem_peak = None
+        # map from annotation set name to a map from annotation type to the number of annotations added
+        self.anns_added = {}
+
+    def add_anns(self, setname, anntype, n):
+        types = self.anns_added.get(setname)
+        if types is None:
+            types = self.anns_added[setname] = {}
+        types[anntype] = types.get(anntype, 0) + n
+
+    def merge(self, other):
+        """
+        Adds the statistics of the other AnnotatorStats for the same annotator to this one.
+        """
+        self.calls += other.calls
+        self.errors += other.errors
+        self.docs_in += other.docs_in
+        self.docs_out += other.docs_out
+        self.wall_time += other.wall_time
+        self.cpu_time += other.cpu_time
+        if other.mem_peak is not None:
+            self.mem_peak = other.mem_peak if self.mem_peak is None else max(self.mem_peak, other.mem_peak)
+        for setname, types in other.anns_added.items():
+            for anntype, n in types.items():
+                self.add_anns(setname, anntype, n)
+
+    def to_dict(self):
+        return dict(
+            name=self.name,
+            calls=self.calls,
+            errors=self.errors,
+            docs_in=self.docs_in,
+            docs_out=self.docs_out,
+            wall_time=self.wall_time,
+            cpu_time=self.cpu_time,
+            mem_peak=self.mem_peak,
+            anns_added={setname: dict(types) for setname, types in self.anns_added.items()},
+        )
+
+    @staticmethod
+    def from_dict(dictrepr):
+        stats = AnnotatorStats(dictrepr["name"])
+        for key in ["calls", "errors", "docs_in", "docs_out", "wall_time", "cpu_time", "mem_peak"]:
+            setattr(stats, key, dictrepr[key])
+        stats.anns_added = {setname: dict(types) for setname, types in dictrepr["anns_added"].items()}
+        return stats
+
+
+def _ann_marks(docs):
+    """
+    Returns a map from the id of each document to a map from set name to the next annotation id and the
+    version of each set, so that the annotations added to the document can be found after running an annotator.
+    """
+    return {
+        id(doc): {
+            name: (annset._next_annid, annset._version)
+            for name, annset in getattr(doc, "_annotation_sets", {}).items()
+        }
+        for doc in docs
+    }
+
+
+def _count_added(stats, marks, docs):
+    """
+    Counts the annotations added to the documents since the marks were taken. For documents which were not
+    marked, i.e. documents created by the annotator, all annotations are counted. Sets which are still loaded
+    lazily are skipped, as are annotations which were added with an explicitly specified annotation id.
+    """
+    for doc in docs:
+        setmarks = marks.get(id(doc), {})
+        for name, annset in getattr(doc, "_annotation_sets", {}).items():
+            if annset._is_lazy():
+                continue
+            nextid, version = setmarks.get(name, (0, None))
+            if annset._version == version:
+                continue
+            if nextid == 0:
+                anns = annset._annotations.values()
+            else:
+                anns = [annset._annotations.get(annid) for annid in range(nextid, annset._next_annid)]
+            for ann in anns:
+                if ann is not None:
+                    stats.add_anns(name, ann.type, 1)
+
+
+class Instrumentation:
+    """
+    Collects the statistics for running several named annotators. Annotators get run with the `call` and
+    `call_batch` methods, which can be used from several threads. Statistics for names which were not
+    specified when creating the instrumentation are added when the name is used first.
+
+    Note that the CPU time is the CPU time of the whole process, so if several annotators run at the same time,
+    it also includes the time used by the others.
+    """
+
+    def __init__(self, names, trace_memory=False):
+        """
+        Creates the instrumentation for the annotators with the given names.
+
+        Args:
+            names: the names of the annotators, in the order to use for the statistics
+            trace_memory: if True, the peak of memory allocated during each call is traced with tracemalloc,
+                which slows down processing considerably
+        """
+        self.names = list(names)
+        self.trace_memory = trace_memory
+        self.stats = {name: AnnotatorStats(name) for name in self.names}
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def start(self):
+        """
+        Resets the statistics and starts tracing memory allocations if necessary.
+        """
+        self.stats = {name: AnnotatorStats(name) for name in self.names}
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        """
+        Stops tracing memory allocations, if it was started by `start`.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _get_stats(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stats.get(name)
+                if stats is None:
+                    stats = self.stats[name] = AnnotatorStats(name)
+                    self.names.append(name)
+        return stats
+
+    def _run(self, name, docs, func, *args, **kwargs):
+        stats = self._get_stats(name)
+        marks = _ann_marks(docs)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # without reset_peak (Python < 3.9) the peak since tracing started is used
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            ret = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                stats.calls += 1
+                stats.errors += 1
+                stats.docs_in += len(docs)
+                stats.wall_time += time.perf_counter() - wall_start
+                stats.cpu_time += time.process_time() - cpu_start
+            raise
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        mem_peak = tracemalloc.get_traced_memory()[1] - mem_before if tracing else None
+        return ret, stats, marks, wall_time, cpu_time, mem_peak
+
+    def _update(self, stats, docs, outdocs, marks, wall_time, cpu_time, mem_peak):
+        with self._lock:
+            stats.calls += 1
+            stats.docs_in += len(docs)
+            stats.docs_out += len(outdocs)
+            stats.wall_time += wall_time
+            stats.cpu_time += cpu_time
+            if mem_peak is not None:
+                stats.mem_peak = mem_peak if stats.mem_peak is None else max(stats.mem_peak, mem_peak)
+            _count_added(stats, marks, outdocs)
+
+    def call(self, name, annotator, doc, **kwargs):
+        """
+        Runs the annotator with the given name on the document and records the statistics.
+
+        Returns:
+            what the annotator returns
+        """
+        ret, *measured = self._run(name, [doc], call_annotator, annotator, doc, **kwargs)
+        stats, marks, wall_time, cpu_time, mem_peak = measured
+        self._update(stats, [doc], result_docs(ret), marks, wall_time, cpu_time, mem_peak)
+        return ret
+
+    def call_batch(self, name, annotator, docs, **kwargs):
+        """
+        Runs the annotator with the given name on the list of documents, using its `process_batch` method if it
+        has one, and records the statistics.
+
+        Returns:
+            the list of results for the documents
+        """
+        rets, *measured = self._run(name, docs, call_annotator_batch, annotator, docs, **kwargs)
+        stats, marks, wall_time, cpu_time, mem_peak = measured
+        self._update(stats, docs, [d for ret in rets for d in result_docs(ret)], marks, wall_time, cpu_time, mem_peak)
+        return rets
+
+    def to_dict(self):
+        """
+        Returns the statistics as a dictionary with the key "annotators" and a list with the statistics
+        dictionary for each annotator as value.
+        """
+        return dict(annotators=[self.stats[name].to_dict() for name in self.names])
+
+    def report(self):
+        """
+        Returns the compact text report of the statistics, see `format_stats`.
+        """
+        return format_stats(self.to_dict())
+
+
+def reduce_stats(dicts):
+    """
+    Combines the statistics dictionaries returned by `Instrumentation.to_dict()` for several runs, e.g.
+    in different processes, into one.
+
+    Args:
+        dicts: an iterable of statistics dictionaries for the same annotators
+
+    Returns:
+        the combined statistics dictionary
+    """
+    merged = {}
+    names = []
+    for dictrepr in dicts:
+        for statsdict in dictrepr["annotators"]:
+            stats = AnnotatorStats.from_dict(statsdict)
+            if stats.name in merged:
+                merged[stats.name].merge(stats)
+            else:
+                merged[stats.name] = stats
+                names.append(stats.name)
+    return dict(annotators=[merged[name].to_dict() for name in names])
+
+
+def format_stats(dictrepr):
+    """
+    Returns a compact text report for the statistics dictionary returned by `Instrumentation.to_dict()`:
+    one line for each annotator followed by the annotations it added.
+    """
+    lines = [
+        f"{'annotator':<20} {'calls':>8} {'errors':>6} {'docs in':>8} {'docs out':>8} "
+        f"{'wall s':>9} {'cpu s':>9} {'mem peak':>10}"
+    ]
+    for stats in dictrepr["annotators"]:
+        mem = "-" if stats["mem_peak"] is None else f"{stats['mem_peak'] / 1024 / 1024:.1f}M"
+        lines.append(
+            f"{stats['name'][:20]:<20} {stats['calls']:>8} {stats['errors']:>6} {stats['docs_in']:>8} "
+            f"{stats['docs_out']:>8} {stats['wall_time']:>9.3f} {stats['cpu_time']:>9.3f} {mem:>10}"
+        )
+        for setname, types in stats["anns_added"].items():
+            added = ", ".join(f"{anntype}:{n}" for anntype, n in types.items())
+            lines.append(f"    added to set '{setname}': {added}")
+    return "\n".join(lines)
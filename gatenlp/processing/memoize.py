@@ -0,0 +1,360 @@
+"""
+Module that provides an annotator wrapper which caches the results of running an expensive annotator on
+a document, keyed by a hash of the document text, the input annotation sets and the annotator configuration.
+When the annotator gets run on a document with the same key again, the stored result is applied to the
+document instead of running the annotator.
+
+The results are stored in a `DiskCache`, a directory with one file per entry, which removes the least
+recently used entries when it gets larger than the configured maximum number of entries or total size.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from gatenlp.annotation_set import AnnotationSet
+from gatenlp.changelog import ChangeLog
+from gatenlp.changelog_consts import ACTION_ADD_ANN
+from gatenlp.processing.annotator import Annotator, call_annotator, call_annotator_batch
+from gatenlp.processing.pipeline import _has_method
+from gatenlp.serialization.jsonbackend import get_json_backend
+from gatenlp.utils import init_logger, parse_annsets_spec
+
+
+class DiskCache:
+    """
+    A cache which stores byte strings in files in a directory, with a least recently used eviction policy.
+    The entries which already exist in the directory are used, so the cache persists across runs.
+    The cache can be used from several threads, but not from several processes at the same time.
+    """
+
+    def __init__(self, dirpath, max_entries=None, max_size=None):
+        """
+        Creates or opens the cache in the directory.
+
+        Args:
+            dirpath: the directory for the cache files, gets created if it does not exist
+            max_entries: if not None, the maximum number of entries to keep
+            max_size: if not None, the maximum total size of all entries in bytes
+        """
+        self.dirpath = dirpath
+        self.max_entries = max_entries
+        self.max_size = max_size
+        os.makedirs(dirpath, exist_ok=True)
+        self._lock = threading.Lock()
+        # map from key to entry size, from the least to the most recently used entry
+        self._entries = OrderedDict()
+        self._size = 0
+        found = []
+        for subdir in os.listdir(dirpath):
+            subpath = os.path.join(dirpath, subdir)
+            if not os.path.isdir(subpath):
+                continue
+            for fname in os.listdir(subpath):
+                if fname.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(subpath, fname))
+                found.append((stat.st_mtime, fname, stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        # the limits may be lower than when the entries were stored
+        with self._lock:
+            self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.dirpath, key[:2], key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def size(self):
+        """
+        Returns the total size of all entries in bytes.
+        """
+        return self._size
+
+    def get(self, key):
+        """
+        Returns the bytes stored for the key or None if there is no entry for the key.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as infp:
+                data = infp.read()
+            # the modification time records the last use for when the cache gets opened again
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._size -= size
+            return None
+        return data
+
+    def put(self, key, data):
+        """
+        Stores the bytes for the key and removes the least recently used entries if the cache
+        gets too big.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmppath = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmppath, "wb") as outfp:
+            outfp.write(data)
+        os.replace(tmppath, path)
+        with self._lock:
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_size is not None and self._size > self.max_size)
+        ):
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            for key in self._entries:
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._size = 0
+
+
+class MemoizingAnnotator(Annotator):
+    """
+    An annotator which wraps another annotator and caches its results for each document in a `DiskCache`.
+
+    The key for a document is a hash of the document text, the annotations in the input annotation sets and
+    the configuration of the annotator. If a document with the same key has been processed before, the
+    stored result is applied to the document instead of running the annotator. The result can be stored
+    in one of two ways:
+
+    * "changelog": all changes the annotator makes to the document (annotations, document and annotation
+      features) are recorded in a `ChangeLog` which gets replayed on a hit
+    * "sets": the output annotation sets are stored as they are after running the annotator, on a hit
+      they replace the sets in the document
+
+    Only results of annotators which modify the document they get and return it get cached, if the annotator
+    returns None, a different document or a list of documents, the result is returned but not cached.
+    """
+
+    def __init__(
+        self,
+        annotator,
+        cache,
+        input_annsets=None,
+        output_annsets=None,
+        config=None,
+        mode="changelog",
+    ):
+        """
+        Creates the memoizing annotator.
+
+        Args:
+            annotator: the annotator whose results to cache
+            cache: a `DiskCache` or the directory path for a `DiskCache` without limits
+            input_annsets: the annotation sets the annotator uses, as a list of set names or (setname, types)
+                tuples, the annotations in these sets are part of the key. If None, no annotations are used
+                for the key.
+            output_annsets: for mode "sets", the list of the names of the sets the annotator creates
+            config: a JSON-serializable value which identifies the configuration of the annotator, e.g. a dict
+                of its parameters and the version of the model it uses. This must change whenever the
+                annotator would create different results. The class name of the annotator is always used.
+            mode: "changelog" to record and replay all changes made by the annotator, or "sets" to store
+                and restore the output annotation sets
+        """
+        if mode not in ["changelog", "sets"]:
+            raise Exception(f"Mode must be 'changelog' or 'sets', not {mode}")
+        if mode == "sets" and not output_annsets:
+            raise Exception("Mode 'sets' needs the list of output_annsets")
+        if isinstance(cache, str):
+            cache = DiskCache(cache)
+        self.annotator = annotator
+        self.cache = cache
+        self.input_annsets = parse_annsets_spec(input_annsets)
+        self.output_annsets = output_annsets
+        self.mode = mode
+        self.max_concurrency = getattr(annotator, "max_concurrency", None)
+        self.n_hits = 0
+        self.n_misses = 0
+        # the counts get updated from several threads if the annotator runs concurrently
+        self._lock = threading.Lock()
+        self.logger = init_logger(__name__)
+        clazz = type(annotator)
+        self._config = json.dumps(
+            [f"{clazz.__module__}.{clazz.__qualname__}", mode, config], sort_keys=True, default=str
+        ).encode("utf-8")
+
+    def key(self, doc):
+        """
+        Returns the cache key for the document.
+        """
+        hasher = hashlib.sha256(self._config)
+        text = doc.text if doc.text is not None else ""
+        hasher.update(b"\0" + text.encode("utf-8", "surrogatepass"))
+        for name, anntypes in sorted((self.input_annsets or {}).items()):
+            anns = []
+            if name in doc._annotation_sets:
+                anns = doc.annset(name).to_dict(anntypes=anntypes)["annotations"]
+                anns.sort(key=lambda ann: (ann["start"], ann["end"], ann["type"], ann["id"]))
+            hasher.update(b"\0" + json.dumps([name, anns], sort_keys=True, default=str).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _replay(self, doc, data):
+        if self.mode == "changelog":
+            self._replay_changes(doc, ChangeLog.load_mem(data.decode("utf-8"), fmt="json"))
+        else:
+            for name, setdict in get_json_backend().loads(data).items():
+                doc._annotation_sets[name] = AnnotationSet.from_dict(setdict, owner_doc=doc)
+        return doc
+
+    @staticmethod
+    def _replay_changes(doc, chlog):
+        """
+        Applies the changes to the document. Annotations which were added with an id that is already used in
+        the set of the document get a new id and the later changes for these annotations use the new id.
+        """
+        # map from set name to a map from the recorded annotation id to the id in the document
+        idmaps = {}
+        for change in chlog.changes:
+            annid = change.get("id")
+            if annid is None:
+                doc.apply_changes(change)
+                continue
+            idmap = idmaps.setdefault(change["set"], {})
+            if change["command"] == ACTION_ADD_ANN:
+                annset = doc.annset(change["set"])
+                if annid in annset:
+                    ann = annset.add(change["start"], change["end"], change["type"], features=change.get("features"))
+                    idmap[annid] = ann.id
+                    continue
+            elif annid in idmap:
+                change = dict(change, id=idmap[annid])
+            doc.apply_changes(change)
+
+    def _before(self, doc):
+        """
+        Prepares recording the changes of the document, returns the changelog used before.
+        """
+        if self.mode != "changelog":
+            return None
+        oldchlog = doc.changelog
+        doc.changelog = ChangeLog()
+        return oldchlog
+
+    def _after(self, key, doc, ret, oldchlog):
+        """
+        Stores the result of processing the document, if it can be cached, and restores the changelog
+        used before.
+        """
+        if self.mode == "changelog":
+            chlog = doc.changelog
+            doc.changelog = oldchlog
+            if oldchlog is not None:
+                for change in chlog.changes:
+                    oldchlog.append(change)
+        if ret is not doc:
+            self.logger.debug(f"Not caching the result for document {doc.name}, not the same document")
+            return
+        if self.mode == "changelog":
+            data = chlog.save_mem(fmt="json").encode("utf-8")
+        else:
+            data = get_json_backend().dumps(
+                {name: doc._annotation_sets[name].to_dict() for name in self.output_annsets
+                 if name in doc._annotation_sets}
+            ).encode("utf-8")
+        self.cache.put(key, data)
+
+    def __call__(self, doc, **kwargs):
+        key = self.key(doc)
+        data = self.cache.get(key)
+        with self._lock:
+            if data is not None:
+                self.n_hits += 1
+            else:
+                self.n_misses += 1
+        if data is not None:
+            return self._replay(doc, data)
+        oldchlog = self._before(doc)
+        try:
+            ret = call_annotator(self.annotator, doc, **kwargs)
+        except Exception:
+            if self.mode == "changelog":
+                doc.changelog = oldchlog
+            raise
+        self._after(key, doc, ret, oldchlog)
+        return ret
+
+    def process_batch(self, docs, **kwargs):
+        """
+        Applies the cached results to the documents which have them and passes all the other documents to
+        the wrapped annotator in one batch.
+        """
+        rets = [None] * len(docs)
+        misses = []
+        for i, doc in enumerate(docs):
+            key = self.key(doc)
+            data = self.cache.get(key)
+            if data is not None:
+                rets[i] = self._replay(doc, data)
+            else:
+                misses.append((i, key))
+        with self._lock:
+            self.n_hits += len(docs) - len(misses)
+            self.n_misses += len(misses)
+        if not misses:
+            return rets
+        missdocs = [docs[i] for i, _ in misses]
+        oldchlogs = [self._before(doc) for doc in missdocs]
+        try:
+            missrets = call_annotator_batch(self.annotator, missdocs, **kwargs)
+        except Exception:
+            if self.mode == "changelog":
+                for doc, oldchlog in zip(missdocs, oldchlogs):
+                    doc.changelog = oldchlog
+            raise
+        for (i, key), doc, ret, oldchlog in zip(misses, missdocs, missrets, oldchlogs):
+            self._after(key, doc, ret, oldchlog)
+            rets[i] = ret
+        return rets
+
+    def start(self):
+        with self._lock:
+            self.n_hits = 0
+            self.n_misses = 0
+        if _has_method(self.annotator, "start"):
+            self.annotator.start()
+
+    def finish(self):
+        self.logger.info(f"Cache hits: {self.n_hits}, misses: {self.n_misses}")
+        if _has_method(self.annotator, "finish"):
+            return self.annotator.finish()
+        return None
+
+    def reduce(self, results):
+        if _has_method(self.annotator, "reduce"):
+            return self.annotator.reduce(results)
+        return results
@@ -11,7 +11,8 @@ the only element.
 
 from collections.abc import Iterable
 import inspect
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.annotator import Annotator, call_annotator, call_annotator_batch, result_docs
+from gatenlp.processing.instrumentation import Instrumentation, reduce_stats
 from gatenlp.utils import init_logger
 
 
@@ -69,9 +70,17 @@ class Pipeline(Annotator):
 
     The reduce method expects a list with as many return value lists as there are annotators and returns
     the overall result for each annotator (again, including None if there is none).
+
+    If an annotator returns several documents, each of them is passed on to the next annotator. With
+    `batch_fanout=True`, all the documents returned by an annotator are instead passed on to the
+    `process_batch` method of the next annotator in a single call.
+
+    With `instrument=True`, the pipeline collects statistics for each annotator (see
+    `gatenlp.processing.instrumentation`) and the finish method returns a dictionary with the list of
+    annotator results under the key "results" and the statistics under the key "instrumentation".
     """
 
-    def __init__(self, *annotators, **kwargs):
+    def __init__(self, *annotators, batch_fanout=False, instrument=False, trace_memory=False, **kwargs):
         """
         Creates a pipeline annotator. Individual annotators can be added at a later time to the front or back
         using the add method.
@@ -85,15 +94,21 @@ class Pipeline(Annotator):
                 An annotator can be given as an instance or class, if it is a class, the kwargs are used
                 to construct an instance. If no annotators are specified at construction, they can still
                 be added later and incrementally using the `add` method.
+            batch_fanout: if True, when an annotator returns several documents for a document, they are passed
+                on to the next annotator with one call of its `process_batch` method
+            instrument: if True, collect the time used, documents processed and annotations added for
+                each annotator
+            trace_memory: if True and instrument is True, also trace the peak memory allocated by each
+                annotator with tracemalloc, which slows down processing considerably
             **kwargs: these arguments are passed to the constructor of any class in the annotators list
         """
         self.annotators = []
         self.names = []
         self.names2annotators = dict()
+        self.batch_fanout = batch_fanout
         self.logger = init_logger("Pipeline")
         for ann in annotators:
-            if not isinstance(ann, list):
-                anns = [ann]
+            anns = ann if isinstance(ann, list) else [ann]
             for a in anns:
                 if isinstance(a, tuple) and len(a) == 2:
                     a, name = a
@@ -105,6 +120,7 @@ class Pipeline(Annotator):
                 self.names2annotators[name] = a
                 self.annotators.append(a)
                 self.names.append(name)
+        self.instrumentation = Instrumentation(self.names, trace_memory=trace_memory) if instrument else None
         # if len(self.annotators) == 0:
         #     self.logger.warn("Pipeline is a do-nothing pipeline: no annotators")
 
@@ -116,7 +132,12 @@ class Pipeline(Annotator):
         Returns:
             a shallow copy of this pipeline
         """
-        new = Pipeline([(name, ann) for name, ann in self.names2annotators.items()])
+        new = Pipeline(
+            [(ann, name) for name, ann in zip(self.names, self.annotators)],
+            batch_fanout=self.batch_fanout,
+            instrument=self.instrumentation is not None,
+            trace_memory=self.instrumentation is not None and self.instrumentation.trace_memory,
+        )
         return new
 
     def add(self, annotator, name=None, tofront=False):
@@ -160,37 +181,83 @@ class Pipeline(Annotator):
         Returns:
             a document or a list of documents
         """
+        if self.batch_fanout:
+            return self.process_batch([doc], **kwargs)[0]
         toprocess = [doc]
         results = []
-        for annotator in self.annotators:
+        for name, annotator in zip(self.names, self.annotators):
             results = []
             for d in toprocess:
-                ret = annotator(doc, **kwargs)
-                if isinstance(ret, list):
-                    results.extend(ret)
+                if self.instrumentation is None:
+                    ret = call_annotator(annotator, d, **kwargs)
                 else:
-                    if ret is not None:
-                        results.append(ret)
+                    ret = self.instrumentation.call(name, annotator, d, **kwargs)
+                results.extend(result_docs(ret))
             toprocess = results
+            if not toprocess:
+                break
         if len(results) == 1:
             return results[0]
         else:
             return results
 
-    def pipe(self, documents, **kwargs):
+    def process_batch(self, docs, **kwargs):
+        """
+        Processes a batch of documents by passing all the documents to each annotator in one call of its
+        `process_batch` method (annotators which do not have one get called for each document). All the documents
+        returned by an annotator for the batch form the batch for the next annotator.
+
+        Args:
+            docs: a list of documents
+            **kwargs: any kwargs will be passed to all annotators
+
+        Returns:
+            a list with the result of the pipeline for each of the documents, a document or a list of documents
+        """
+        toprocess = list(docs)
+        # for each document to process, the index of the document in docs it was created from
+        origins = list(range(len(toprocess)))
+        for name, annotator in zip(self.names, self.annotators):
+            if not toprocess:
+                break
+            if self.instrumentation is None:
+                rets = call_annotator_batch(annotator, toprocess, **kwargs)
+            else:
+                rets = self.instrumentation.call_batch(name, annotator, toprocess, **kwargs)
+            if len(rets) != len(toprocess):
+                raise Exception(f"Annotator {annotator} returned {len(rets)} results for {len(toprocess)} documents")
+            toprocess, neworigins = [], []
+            for origin, ret in zip(origins, rets):
+                for d in result_docs(ret):
+                    toprocess.append(d)
+                    neworigins.append(origin)
+            origins = neworigins
+        results = [[] for _ in docs]
+        for origin, d in zip(origins, toprocess):
+            results[origin].append(d)
+        return [res[0] if len(res) == 1 else res for res in results]
+
+    def pipe(self, documents, batch_size=None, **kwargs):
         """
         Iterate over each of the documents process them by all the annotators in the pipeline
         and yield all the final  non-None result documents. Documents are processed by in turn
         invoking their `pipe` method on the generator created by the previous step.
 
+        If batch_size is specified, the documents are instead processed in batches of that size with
+        `process_batch`, so that each annotator gets all the documents of a batch in one call. If the pipeline
+        is instrumented and batch_size is not specified, each document is processed by calling the pipeline.
+
         Args:
             documents: an iterable of documents or None (None values are ignored)
+            batch_size: if not None, the number of documents to process together
             **kwargs: arguments to be passed to each of the annotators
 
         Yields:
             documents for which processing did not return None
 
         """
+        if batch_size is not None or self.instrumentation is not None:
+            return super().pipe(documents, batch_size=batch_size, **kwargs)
         gen = documents
         for antr in self.annotators:
             gen = antr.pipe(gen, **kwargs)
@@ -200,6 +267,8 @@ class Pipeline(Annotator):
         """
         Invokes start on all annotators.
         """
+        if self.instrumentation is not None:
+            self.instrumentation.start()
         for annotator in self.annotators:
             if _has_method(annotator, "start"):
                 annotator.start()
@@ -209,8 +278,11 @@ class Pipeline(Annotator):
         Invokes finish on all annotators and return their results as a list with as many
         elements as there are annotators (annotators which did not return anything have None).
 
+        If the pipeline is instrumented, returns a dictionary with that list under the key "results" and
+        the dictionary of statistics under the key "instrumentation" instead.
+
         Returns:
-            list of annotator results
+            list of annotator results or the dictionary with results and statistics
         """
         results = []
         for annotator in self.annotators:
@@ -218,15 +290,22 @@ class Pipeline(Annotator):
                 results.append(annotator.finish())
             else:
                 results.append(None)
+        if self.instrumentation is not None:
+            self.instrumentation.stop()
+            return dict(results=results, instrumentation=self.instrumentation.to_dict())
         return results
 
     def reduce(self, results):
         """
-        Invokes reduce on all annotators using the list of result lists. `results` is a list with
-        as many elements as there are annotators. Each element is a list of results from different
-        processes or different batches.
+        Invokes reduce on all annotators. `results` is a list of the results returned by the finish
+        method of several instances of this pipeline, e.g. run in different processes: each element is a list
+        with as many elements as there are annotators.
+
+        Returns a list with as many elements as there are annotators, each element the combined result
+        for that annotator, or the list of results for that annotator if it does not have a reduce method.
 
-        Returns a list with as many elements as there are annotators, each element the combined result.
+        If the pipeline is instrumented, `results` is a list of the dictionaries returned by finish and
+        a dictionary with the combined results and the combined statistics is returned.
 
         Args:
             results: a list of result lists
@@ -234,14 +313,22 @@ class Pipeline(Annotator):
         Returns:
             a list of combined results
         """
-        results = []
-        assert len(results) == len(self.annotators)
-        for reslist, annotator in zip(results, self.annotators):
+        if self.instrumentation is not None:
+            return dict(
+                results=self._reduce_results([res["results"] for res in results]),
+                instrumentation=reduce_stats(res["instrumentation"] for res in results),
+            )
+        return self._reduce_results(results)
+
+    def _reduce_results(self, results):
+        combined = []
+        for i, annotator in enumerate(self.annotators):
+            reslist = [res[i] for res in results]
             if _has_method(annotator, "reduce"):
-                results.append(annotator.reduce(reslist))
+                combined.append(annotator.reduce(reslist))
             else:
-                results.append(reslist)
-        return results
+                combined.append(reslist)
+        return combined
 
     def __repr__(self):
         reprs = []
@@ -0,0 +1,223 @@
+"""
+Module that provides the compression codecs used for saving and loading compressed documents.
+
+The codec "gzip" uses the standard library, "zstd" needs the package zstandard and "lz4" needs the
+package lz4 to be installed. The compression level can be passed to the save methods with the
+`compresslevel` parameter or configured for each codec with `gatenlpconfig.compression_levels`.
+
+When a compressed file gets written, the data gets compressed and written to the file in a background
+thread, so that creating the serialization and compressing it overlap (all codecs release the GIL while
+compressing).
+"""
+
+import gzip
+import queue
+import importlib
+import threading
+from gatenlp.gatenlpconfig import gatenlpconfig
+
+CODECS = ["gzip", "zstd", "lz4"]
+
+# the modules which implement the codecs
+CODEC_MODULES = {"gzip": "gzip", "zstd": "zstandard", "lz4": "lz4.frame"}
+
+# the data written to a compressed file gets collected into chunks of at least this size, which then get
+# compressed in the background thread
+WRITE_CHUNKSIZE = 1 << 20
+# the maximum number of chunks waiting to get compressed
+WRITE_QUEUESIZE = 4
+
+
+def _get_module(codec):
+    """
+    Returns the module which implements the codec, raises an exception if it is not installed.
+    """
+    modname = CODEC_MODULES.get(codec)
+    if modname is None:
+        raise Exception(f"Unknown compression codec {codec}, must be one of {CODECS}")
+    try:
+        return importlib.import_module(modname)
+    except ImportError:
+        raise Exception(f"Compression codec {codec} needs package {modname.split('.')[0]} to be installed")
+
+
+def get_compresslevel(codec, compresslevel=None):
+    """
+    Returns the compression level to use for the codec: compresslevel if it is not None, otherwise
+    the level configured in `gatenlpconfig.compression_levels` or None to use the default of the codec.
+    """
+    if compresslevel is None:
+        compresslevel = gatenlpconfig.compression_levels.get(codec)
+    return compresslevel
+
+
+def compress(data: bytes, codec: str = "gzip", compresslevel=None) -> bytes:
+    """
+    Compresses the data with the codec.
+
+    Args:
+        data: the bytes to compress
+        codec: the name of the codec
+        compresslevel: the compression level, if None, the configured or default level of the codec
+
+    Returns:
+        the compressed bytes
+    """
+    module = _get_module(codec)
+    compresslevel = get_compresslevel(codec, compresslevel)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=9 if compresslevel is None else compresslevel)
+    elif codec == "zstd":
+        return module.ZstdCompressor(level=3 if compresslevel is None else compresslevel).compress(data)
+    else:
+        return module.compress(data, compression_level=0 if compresslevel is None else compresslevel)
+
+
+def decompress(data: bytes, codec: str = "gzip") -> bytes:
+    """
+    Decompresses the data which was compressed with the codec.
+
+    Args:
+        data: the compressed bytes
+        codec: the name of the codec
+
+    Returns:
+        the decompressed bytes
+    """
+    module = _get_module(codec)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    elif codec == "zstd":
+        # a decompressobj also works for frames which do not contain the size of the content
+        return module.ZstdDecompressor().decompressobj().decompress(data)
+    else:
+        return module.decompress(data)
+
+
+def read_compressed(path, codec: str = "gzip") -> bytes:
+    """
+    Returns the decompressed content of the file compressed with the codec.
+    """
+    with open(path, "rb") as infp:
+        return decompress(infp.read(), codec)
+
+
+def _compressing_stream(fileobj, codec, compresslevel):
+    """
+    Returns a binary stream which compresses what gets written to it into fileobj, closing it does
+    not close fileobj.
+    """
+    module = _get_module(codec)
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=9 if compresslevel is None else compresslevel)
+    elif codec == "zstd":
+        compressor = module.ZstdCompressor(level=3 if compresslevel is None else compresslevel)
+        return compressor.stream_writer(fileobj, closefd=False)
+    else:
+        return module.LZ4FrameFile(fileobj, mode="wb", compression_level=0 if compresslevel is None else compresslevel)
+
+
+class CompressedWriter:
+    """
+    A file-like object for writing a compressed file. The data written gets collected into chunks which get
+    compressed and written to the file in a background thread. Errors from the background thread get
+    raised with the next write or when closing.
+    """
+
+    def __init__(self, path, codec: str = "gzip", compresslevel=None, encoding=None, threaded=True):
+        """
+        Opens the file for writing.
+
+        Args:
+            path: the file path
+            codec: the name of the compression codec
+            compresslevel: the compression level, if None, the configured or default level of the codec
+            encoding: if not None, strings get written and encoded with this encoding, otherwise bytes get written
+            threaded: if False, compress in the thread which writes
+        """
+        self._file = open(path, "wb")
+        try:
+            self._stream = _compressing_stream(self._file, codec, get_compresslevel(codec, compresslevel))
+        except Exception:
+            self._file.close()
+            raise
+        self._encoding = encoding
+        self._chunk = []
+        self._chunklen = 0
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if threaded:
+            self._queue = queue.Queue(maxsize=WRITE_QUEUESIZE)
+            self._thread = threading.Thread(target=self._compress_chunks, daemon=True)
+            self._thread.start()
+
+    def _compress_chunks(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            # after an error, keep taking chunks so that the writer does not block
+            if self._error is None:
+                try:
+                    self._stream.write(chunk)
+                except Exception as ex:
+                    self._error = ex
+
+    def _flush_chunk(self):
+        if self._error is not None:
+            raise self._error
+        chunk = b"".join(self._chunk)
+        self._chunk = []
+        self._chunklen = 0
+        if chunk:
+            if self._queue is not None:
+                self._queue.put(chunk)
+            else:
+                self._stream.write(chunk)
+
+    def write(self, data):
+        """
+        Writes the string or bytes.
+        """
+        if self._encoding is not None:
+            data = data.encode(self._encoding)
+        self._chunk.append(data)
+        self._chunklen += len(data)
+        if self._chunklen >= WRITE_CHUNKSIZE:
+            self._flush_chunk()
+        return len(data)
+
+    def writelines(self, lines):
+        """
+        Writes all the strings or bytes.
+        """
+        for line in lines:
+            self.write(line)
+
+    def close(self):
+        """
+        Writes the remaining data, waits for the background thread to finish and closes the file.
+        """
+        if self._file is None:
+            return
+        try:
+            self._flush_chunk()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+            try:
+                if self._error is None:
+                    self._stream.close()
+            finally:
+                self._file.close()
+                self._file = None
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -4,6 +4,9 @@ Module that implements the various ways of how to save and load documents and ch
 import io
 import os
 import sys
+import mmap
+import struct
+from array import array
 import yaml
 
 # import ruyaml as yaml
@@ -14,15 +17,17 @@ except ImportError:
 yaml_loader = yaml.Loader
 yaml_dumper = yaml.Dumper
 from random import choice
+from functools import partial
 from string import ascii_uppercase
-from msgpack import pack, Unpacker
+from msgpack import pack, packb, unpackb, Unpacker
 from gatenlp.document import Document
+from gatenlp.offsetmapper import OFFSET_TYPE_JAVA, OFFSET_TYPE_PYTHON
 from gatenlp.annotation_set import AnnotationSet
 from gatenlp.annotation import Annotation
 from gatenlp.changelog import ChangeLog
 from gatenlp.features import Features
-from gatenlp.utils import get_nested
-from gzip import open as gopen, compress, decompress
+from gatenlp.utils import get_nested, parse_annsets_spec
+from gatenlp.serialization.compression import compress, decompress, read_compressed, CompressedWriter
 from pathlib import Path
 from urllib.parse import ParseResult
 from urllib.request import urlopen
@@ -41,48 +46,12 @@ except Exception as ex:
     pass
 
 
-# import orjson as usejson
-# import json as usejson
-# import rapidjson as usejson
-# import ujson as usejson
-# import hyperjson as usejson
 import json
+from gatenlp.serialization.jsonbackend import get_json_backend
 
 JSON_WRITE = "wt"
 JSON_READ = "rt"
 
-# # for replacing json by orjson
-# class json:
-#     @staticmethod
-#     def load(fp):
-#         data = fp.read()
-#         return usejson.loads(data)
-#     @staticmethod
-#     def loads(data):
-#         return usejson.loads(data)
-#     @staticmethod
-#     def dump(obj, fp):
-#         buf = usejson.dumps(obj)
-#         fp.write(buf)
-#     @staticmethod
-#     def dumps(obj):
-#         return usejson.dumps(obj)
-
-# # for replacing json with one of the other implementations
-# class json:
-#     @staticmethod
-#     def load(fp):
-#         return usejson.load(fp)
-#     @staticmethod
-#     def loads(data):
-#         return usejson.loads(data)
-#     @staticmethod
-#     def dump(obj, fp):
-#         buf = usejson.dump(obj, fp)
-#     @staticmethod
-#     def dumps(obj):
-#         return usejson.dumps(obj)
-
 
 # TODO: for ALL save options, allow to filter the annotations that get saved!
 # TODO: then use this show only limited set of annotations in the viewer
@@ -190,10 +159,177 @@ def read_lines_from(url_or_file, encoding="utf-8"):
                 yield line
 
 
+# number of annotations to convert to JSON at once when writing a document incrementally
+JSON_WRITE_CHUNKSIZE = 10000
+
+
+def _iter_document_json(doc, offset_type=None, annsets=None, offset_mapper=None):
+    """
+    Yields the BDOC JSON representation of the document in pieces, without creating the dictionary
+    representation of the whole document first. With the standard library JSON backend, the concatenated
+    pieces are identical to `json.dumps(doc.to_dict(offset_type=offset_type, annsets=annsets))`.
+
+    Args:
+        doc: the document
+        offset_type: the offset type to use, if None, the offset type of the document
+        annsets: which annotation sets and types to include, list of set names or (setname, types) tuples
+        offset_mapper: the offset mapper to use if the offsets need to get converted, if None, the offset
+            mapper of the document
+
+    Yields:
+        strings of JSON
+    """
+    dumps = get_json_backend().dumps
+    convert = None
+    if offset_type is not None:
+        assert offset_type == OFFSET_TYPE_JAVA or offset_type == OFFSET_TYPE_PYTHON
+        if offset_type != doc.offset_type and (offset_mapper is not None or doc._text is not None):
+            om = offset_mapper if offset_mapper is not None else doc.offset_mapper
+            convert = om.convert_to_java if offset_type == OFFSET_TYPE_JAVA else om.convert_to_python
+    else:
+        offset_type = doc.offset_type
+    if annsets is not None:
+        specs = []
+        for spec in annsets:
+            if isinstance(spec, str):
+                setname, types = spec, None
+            else:
+                setname, types = spec
+                if isinstance(types, str):
+                    types = [types]
+            annset = doc._annotation_sets.get(setname)
+            if annset is not None:
+                specs.append((setname, annset, types))
+    else:
+        specs = [(setname, annset, None) for setname, annset in doc._annotation_sets.items()]
+    # the JSON of the few different annotation types is only created once
+    typejson = {}
+    yield '{"annotation_sets": {'
+    for i, (setname, annset, types) in enumerate(specs):
+        rawdict = annset._lazy_data("dict", offset_type) if types is None else None
+        if rawdict is not None:
+            # a lazily loaded set which has not been used, write what we loaded
+            yield "{}{}: {}".format(", " if i else "", dumps(setname), dumps(rawdict))
+            continue
+        yield '{}{}: {{"name": {}, "annotations": ['.format(", " if i else "", dumps(setname), dumps(annset.name))
+        anns = annset._annotations.values()
+        if types is not None:
+            types = set(types)
+            anns = [ann for ann in anns if ann._type in types]
+        else:
+            anns = list(anns)
+        for first in range(0, len(anns), JSON_WRITE_CHUNKSIZE):
+            chunk = anns[first:first + JSON_WRITE_CHUNKSIZE]
+            if convert is not None:
+                offsets = convert([off for ann in chunk for off in (ann._start, ann._end)])
+            else:
+                offsets = [off for ann in chunk for off in (ann._start, ann._end)]
+            yield ("" if first == 0 else ", ") + ", ".join(
+                '{{"type": {}, "start": {}, "end": {}, "id": {}, "features": {}}}'.format(
+                    typejson.get(ann._type) or typejson.setdefault(ann._type, dumps(ann._type)),
+                    offsets[2 * j],
+                    offsets[2 * j + 1],
+                    ann._id,
+                    dumps(ann._features.to_dict()) if ann._features else "{}",
+                )
+                for j, ann in enumerate(chunk)
+            )
+        yield '], "next_annid": {}}}'.format(annset._next_annid)
+    yield '}}, "text": {}, "features": {}, "offset_type": {}, "name": {}}}'.format(
+        dumps(doc._text), dumps(doc._features.to_dict()), dumps(offset_type), dumps(doc.name)
+    )
+
+
+_json_decoder = json.JSONDecoder()
+_JSON_WS = json.decoder.WHITESPACE
+# returned by the value parser for keys which should not get included
+_JSON_SKIPPED = object()
+
+
+def _skip_json_ws(data, idx):
+    return _JSON_WS.match(data, idx).end()
+
+
+def _parse_json_object(data, idx, parse_value):
+    """
+    Parses the JSON object which starts at position idx of the JSON string, parse_value(key, data, idx)
+    gets called to parse the value of each key and must return the value and the position after it,
+    keys for which the value is _JSON_SKIPPED are not included in the result.
+
+    Args:
+        data: the JSON string
+        idx: the position where the object starts, whitespace before the object is skipped
+        parse_value: the function to parse the value for a key
+
+    Returns:
+        a tuple with the dictionary and the position after the object
+    """
+    idx = _skip_json_ws(data, idx)
+    if data[idx:idx + 1] != "{":
+        raise Exception(f"Invalid JSON, expected an object at position {idx}")
+    result = {}
+    idx = _skip_json_ws(data, idx + 1)
+    if data[idx:idx + 1] == "}":
+        return result, idx + 1
+    while True:
+        if data[idx:idx + 1] != '"':
+            raise Exception(f"Invalid JSON, expected a key at position {idx}")
+        key, idx = json.decoder.scanstring(data, idx + 1)
+        idx = _skip_json_ws(data, idx)
+        if data[idx:idx + 1] != ":":
+            raise Exception(f"Invalid JSON, expected ':' at position {idx}")
+        value, idx = parse_value(key, data, _skip_json_ws(data, idx + 1))
+        if value is not _JSON_SKIPPED:
+            result[key] = value
+        idx = _skip_json_ws(data, idx)
+        nextchar = data[idx:idx + 1]
+        if nextchar == "}":
+            return result, idx + 1
+        if nextchar != ",":
+            raise Exception(f"Invalid JSON, expected ',' or '}}' at position {idx}")
+        idx = _skip_json_ws(data, idx + 1)
+
+
+def _parse_document_json(data, annsets):
+    """
+    Parses the BDOC JSON string of a document into its dictionary representation, but only includes
+    the annotation sets in annsets: the JSON of each other set is parsed and dropped immediately, so the
+    representation of the whole document never gets created.
+
+    Args:
+        data: the JSON string
+        annsets: list of annotation set names or (setname, types) tuples
+
+    Returns:
+        the dictionary representation with only the annotation sets to include
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    specs = parse_annsets_spec(annsets)
+
+    def parse_set(name, data, idx):
+        value, idx = _json_decoder.raw_decode(data, idx)
+        return (value if name in specs else _JSON_SKIPPED), idx
+
+    def parse_doc(key, data, idx):
+        if key == "annotation_sets":
+            return _parse_json_object(data, idx, parse_set)
+        return _json_decoder.raw_decode(data, idx)
+
+    d, idx = _parse_json_object(data, 0, parse_doc)
+    if _skip_json_ws(data, idx) != len(data):
+        raise Exception(f"Invalid JSON, extra data at position {idx}")
+    return d
+
+
 class JsonSerializer:
     """
     This class performs the saving and load of Documents and ChangeLog instances to and from the
     BDOC JSON format files, optionally with gzip compression.
+
+    Documents get written incrementally, without creating their dictionary representation first.
+    When only some annotation sets of a document are loaded with the standard library JSON backend, the
+    JSON of the other sets is skipped while parsing.
     """
 
     @staticmethod
@@ -206,6 +342,8 @@ class JsonSerializer:
         offset_mapper=None,
         gzip=False,
         annsets=None,
+        compression=None,
+        compresslevel=None,
         **kwargs,
     ):
         """
@@ -214,37 +352,60 @@ class JsonSerializer:
           clazz: the class of the object that gets saved
           inst: the object to get saved
           to_ext: where to save to, this should be a file path, only one of to_ext and to_mem should be specified
-          to_mem: if True, return a String serialization
+          to_mem: if True, return a String serialization, or the compressed bytes if compressed
           offset_type: the offset type to use for saving, if None (default) use "p" (Python)
           offset_mapper: the offset mapper to use, only needed if the type needs to get converted
-          gzip: if True, the JSON gets gzip compressed
+          gzip: if True, the JSON gets gzip compressed, same as compression="gzip"
           annsets: which annotation sets and types to include, list of set names or (setanmes, types) tuples
+          compression: if not None, the compression codec to use, one of "gzip", "zstd", "lz4"
+          compresslevel: the compression level, if None, the configured or default level of the codec
           **kwargs:
         """
-        d = inst.to_dict(offset_type=offset_type, offset_mapper=offset_mapper, annsets=annsets, **kwargs)
+        if gzip:
+            compression = "gzip"
+        # only plain documents get streamed, subclasses like MultiDocument add to the dict representation
+        if type(inst) is Document and not kwargs:
+            pieces = _iter_document_json(inst, offset_type=offset_type, annsets=annsets, offset_mapper=offset_mapper)
+        else:
+            d = inst.to_dict(offset_type=offset_type, offset_mapper=offset_mapper, annsets=annsets, **kwargs)
+            pieces = [get_json_backend().dumps(d)]
         if to_mem:
-            if gzip:
-                compress(json.dumps(d).encode("UTF-8"))
+            if compression:
+                return compress("".join(pieces).encode("UTF-8"), compression, compresslevel)
             else:
-                return json.dumps(d)
+                return "".join(pieces)
         else:
-            if gzip:
-                with gopen(to_ext, JSON_WRITE) as outfp:
-                    json.dump(d, outfp)
+            if compression:
+                with CompressedWriter(to_ext, compression, compresslevel, encoding="UTF-8") as outfp:
+                    outfp.writelines(pieces)
             else:
                 with open(to_ext, JSON_WRITE) as outfp:
-                    json.dump(d, outfp)
+                    outfp.writelines(pieces)
 
     @staticmethod
     def save_gzip(clazz, inst, **kwargs):
         """
         Invokes the save method with gzip=True
         """
-        JsonSerializer.save(clazz, inst, gzip=True, **kwargs)
+        return JsonSerializer.save(clazz, inst, gzip=True, **kwargs)
+
+    @staticmethod
+    def save_zstd(clazz, inst, **kwargs):
+        """
+        Invokes the save method with compression="zstd"
+        """
+        return JsonSerializer.save(clazz, inst, compression="zstd", **kwargs)
+
+    @staticmethod
+    def save_lz4(clazz, inst, **kwargs):
+        """
+        Invokes the save method with compression="lz4"
+        """
+        return JsonSerializer.save(clazz, inst, compression="lz4", **kwargs)
 
     @staticmethod
     def load(
-        clazz, from_ext=None, from_mem=None, offset_mapper=None, gzip=False, **kwargs
+        clazz, from_ext=None, from_mem=None, offset_mapper=None, gzip=False, compression=None, **kwargs
     ):
         """
 
@@ -253,8 +414,10 @@ class JsonSerializer:
           from_ext: (Default value = None)
           from_mem: (Default value = None)
           offset_mapper: (Default value = None)
-          gzip: (Default value = False)
-          **kwargs:
+          gzip: (Default value = False) same as compression="gzip"
+          compression: if not None, the compression codec used, one of "gzip", "zstd", "lz4"
+          **kwargs: passed on to from_dict, for documents this can include annsets, a list of set names or
+              (setname, types) tuples to load, and features=False to not load the annotation features
 
         Returns:
 
@@ -266,30 +429,38 @@ class JsonSerializer:
         if from_ext is None and from_mem is None:
             raise Exception("Exactly one of from_ext and from_mem must be specified ")
 
+        if gzip:
+            compression = "gzip"
         isurl, extstr = is_url(from_ext)
         if from_ext is not None:
             if isurl:
                 # print("DEBUG: we got a URL")
-                if gzip:
+                if compression:
                     from_mem = get_bytes_from_url(extstr)
                 else:
                     from_mem = get_str_from_url(extstr, encoding="utf-8")
             else:
                 # print("DEBUG: not a URL !!!")
                 pass
+        backend = get_json_backend()
+        annsets = kwargs.get("annsets")
+        if annsets is not None and backend.name == "json" and issubclass(clazz, Document):
+            # parse the JSON ourselves so that the annotation sets not needed get dropped right away
+            loads = partial(_parse_document_json, annsets=annsets)
+        else:
+            loads = backend.loads
         if from_mem is not None:
-            if gzip:
-                d = json.loads(decompress(from_mem).decode("UTF-8"))
+            if compression:
+                d = loads(decompress(from_mem, compression).decode("UTF-8"))
             else:
-                d = json.loads(from_mem)
+                d = loads(from_mem)
             doc = clazz.from_dict(d, offset_mapper=offset_mapper, **kwargs)
         else:  # from_ext must have been not None and a path
-            if gzip:
-                with gopen(extstr, JSON_READ) as infp:
-                    d = json.load(infp)
+            if compression:
+                d = loads(read_compressed(extstr, compression).decode("UTF-8"))
             else:
                 with open(extstr, JSON_READ) as infp:
-                    d = json.load(infp)
+                    d = loads(infp.read())
             doc = clazz.from_dict(d, offset_mapper=offset_mapper, **kwargs)
         return doc
 
@@ -306,6 +477,20 @@ class JsonSerializer:
         """
         return JsonSerializer.load(clazz, gzip=True, **kwargs)
 
+    @staticmethod
+    def load_zstd(clazz, **kwargs):
+        """
+        Invokes the load method with compression="zstd"
+        """
+        return JsonSerializer.load(clazz, compression="zstd", **kwargs)
+
+    @staticmethod
+    def load_lz4(clazz, **kwargs):
+        """
+        Invokes the load method with compression="lz4"
+        """
+        return JsonSerializer.load(clazz, compression="lz4", **kwargs)
+
 
 class PickleSerializer:
     """
@@ -395,6 +580,7 @@ class PlainTextSerializer:
         offset_mapper=None,
         encoding="UTF-8",
         gzip=False,
+        compresslevel=None,
         **kwargs,
     ):
         """
@@ -408,6 +594,7 @@ class PlainTextSerializer:
           offset_mapper: (Default value = None)
           encoding: (Default value = "UTF-8")
           gzip: (Default value = False)
+          compresslevel: the gzip compression level, if None, the configured or default level
           **kwargs:
 
         Returns:
@@ -418,12 +605,12 @@ class PlainTextSerializer:
             txt = ""
         if to_mem:
             if gzip:
-                compress(txt.encode(encoding))
+                return compress(txt.encode(encoding), "gzip", compresslevel)
             else:
                 return txt
         else:
             if gzip:
-                with gopen(to_ext, "wt", encoding=encoding) as outfp:
+                with CompressedWriter(to_ext, "gzip", compresslevel, encoding=encoding) as outfp:
                     outfp.write(txt)
             else:
                 with open(to_ext, "wt", encoding=encoding) as outfp:
@@ -441,7 +628,7 @@ class PlainTextSerializer:
         Returns:
 
         """
-        PlainTextSerializer.save(clazz, inst, gzip=True, **kwargs)
+        return PlainTextSerializer.save(clazz, inst, gzip=True, **kwargs)
 
     @staticmethod
     def load(
@@ -476,14 +663,13 @@ class PlainTextSerializer:
                     from_mem = get_str_from_url(extstr, encoding=encoding)
         if from_mem is not None:
             if gzip:
-                txt = decompress(from_mem).decode(encoding)
+                txt = decompress(from_mem, "gzip").decode(encoding)
             else:
                 txt = from_mem
             doc = Document(txt)
         else:
             if gzip:
-                with gopen(extstr, "rt", encoding=encoding) as infp:
-                    txt = infp.read()
+                txt = read_compressed(extstr, "gzip").decode(encoding)
             else:
                 with open(extstr, "rt", encoding=encoding) as infp:
                     txt = infp.read()
@@ -517,6 +703,7 @@ class YamlSerializer:
         offset_mapper=None,
         gzip=False,
         annsets=None,
+        compresslevel=None,
         **kwargs,
     ):
         """
@@ -530,17 +717,18 @@ class YamlSerializer:
             offset_mapper: (Default value = None)
             gzip: (Default value = False)
             annsets: which annotation sets and types to include, list of set names or (setanmes, types) tuples
+            compresslevel: the gzip compression level, if None, the configured or default level
             **kwargs:
         """
         d = inst.to_dict(offset_type=offset_type, offset_mapper=offset_mapper, annsets=annsets, **kwargs)
         if to_mem:
             if gzip:
-                compress(yaml.dump(d, Dumper=yaml_dumper).encode("UTF-8"))
+                return compress(yaml.dump(d, Dumper=yaml_dumper).encode("UTF-8"), "gzip", compresslevel)
             else:
                 return yaml.dump(d, Dumper=yaml_dumper)
         else:
             if gzip:
-                with gopen(to_ext, "wt") as outfp:
+                with CompressedWriter(to_ext, "gzip", compresslevel, encoding="UTF-8") as outfp:
                     yaml.dump(d, outfp, Dumper=yaml_dumper)
             else:
                 with open(to_ext, "wt") as outfp:
@@ -558,7 +746,7 @@ class YamlSerializer:
         Returns:
 
         """
-        YamlSerializer.save(clazz, inst, gzip=True, **kwargs)
+        return YamlSerializer.save(clazz, inst, gzip=True, **kwargs)
 
     @staticmethod
     def load(
@@ -586,14 +774,13 @@ class YamlSerializer:
                     from_mem = get_str_from_url(extstr, encoding="utf-8")
         if from_mem is not None:
             if gzip:
-                d = yaml.load(decompress(from_mem).decode("UTF-8"), Loader=yaml_loader)
+                d = yaml.load(decompress(from_mem, "gzip").decode("UTF-8"), Loader=yaml_loader)
             else:
                 d = yaml.load(from_mem, Loader=yaml_loader)
             doc = clazz.from_dict(d, offset_mapper=offset_mapper, **kwargs)
         else:
             if gzip:
-                with gopen(extstr, "rt") as infp:
-                    d = yaml.load(infp, Loader=yaml_loader)
+                d = yaml.load(read_compressed(extstr, "gzip").decode("UTF-8"), Loader=yaml_loader)
             else:
                 with open(extstr, "rt") as infp:
                     d = yaml.load(infp, Loader=yaml_loader)
@@ -614,7 +801,37 @@ class YamlSerializer:
         return YamlSerializer.load(clazz, gzip=True, **kwargs)
 
 
-MSGPACK_VERSION_HDR = "sm2"
+# the header for the current layout where each annotation set is stored as a table of types, arrays of
+# offsets, ids and type codes and a list of features
+MSGPACK_VERSION_HDR = "sm3"
+# the header for the previous layout where each field of each annotation is stored separately
+MSGPACK_VERSION_HDR_SM2 = "sm2"
+
+
+def _ints2bytes(values):
+    """
+    Returns the little endian bytes of the int32 (or int64 if necessary) array for the values and
+    the array typecode used.
+    """
+    arr = array("i")
+    try:
+        arr.extend(values)
+    except OverflowError:
+        arr = array("q", values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.typecode, arr.tobytes()
+
+
+def _bytes2ints(typecode, data):
+    """
+    Returns the array of ints from the little endian bytes.
+    """
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
 
 
 class MsgPackSerializer:
@@ -640,52 +857,142 @@ class MsgPackSerializer:
         pack(len(doc._annotation_sets), stream)
         for name, annset in doc._annotation_sets.items():
             pack(name, stream)
+            rawdata = annset._lazy_data(MSGPACK_VERSION_HDR, doc.offset_type)
+            if rawdata is not None:
+                # a lazily loaded set which has not been used, write what we loaded
+                stream.write(rawdata)
+                continue
             pack(annset._next_annid, stream)
-            pack(len(annset), stream)
-            for ann in annset.fast_iter():
-                pack(ann.type, stream)
-                pack(ann.start, stream)
-                pack(ann.end, stream)
-                pack(ann.id, stream)
-                pack(ann.features.to_dict(), stream)
+            anns = list(annset._annotations.values())
+            pack(len(anns), stream)
+            typecodes = {}
+            for ann in anns:
+                if ann._type not in typecodes:
+                    typecodes[ann._type] = len(typecodes)
+            pack(list(typecodes.keys()), stream)
+            for values in [
+                [ann._start for ann in anns],
+                [ann._end for ann in anns],
+                [ann._id for ann in anns],
+                [typecodes[ann._type] for ann in anns],
+            ]:
+                typecode, data = _ints2bytes(values)
+                pack(typecode, stream)
+                pack(data, stream)
+            pack([ann._features.to_dict() for ann in anns], stream)
 
     @staticmethod
-    def stream2document(stream):
+    def _unpack_annotations(u, annset, wanted=None, features=True):
         """
+        Unpacks the columns of the annotations of a set in the current format and adds the annotations
+        to the set.
 
         Args:
-          stream:
+            u: the unpacker, positioned after the number of annotations
+            annset: the set to add the annotations to
+            wanted: if not None, a list of the types to add
+            features: if False, skip the features
+        """
+        types = u.unpack()
+        starts, ends, ids, tcodes = [_bytes2ints(u.unpack(), u.unpack()) for _ in range(4)]
+        if features:
+            feats = u.unpack()
+        else:
+            u.skip()
+            feats = None
+        anntypes = [types[code] for code in tcodes]
+        if wanted is not None:
+            keep = [i for i, anntype in enumerate(anntypes) if anntype in wanted]
+            starts, ends, ids, anntypes = [[col[i] for i in keep] for col in (starts, ends, ids, anntypes)]
+            if feats is not None:
+                feats = [feats[i] for i in keep]
+        annset._load_columns(starts, ends, anntypes, ids, feats)
 
-        Returns:
+    @staticmethod
+    def _load_lazy(annset, data):
+        """
+        Adds the annotations from the packed data of a lazily loaded set.
+        """
+        u = Unpacker(io.BytesIO(data))
+        u.skip()  # next_annid
+        u.skip()  # number of annotations
+        MsgPackSerializer._unpack_annotations(u, annset)
 
+    @staticmethod
+    def stream2document(stream, annsets=None, features=True, lazy=False):
         """
+        Reads the document from the stream, the annotation sets and types not in annsets and, if features
+        is False, the annotation features are skipped while unpacking.
+
+        Args:
+          stream: the binary stream to read from
+          annsets: which annotation sets and types to load, list of set names or (setname, types) tuples,
+              if None, all
+          features: if False, do not load the annotation features
+          lazy: if True, sets which get loaded completely keep their packed data and only create their
+              annotations when they get used first
+
+        Returns:
+            the document
+        """
+        if lazy:
+            # we need the data of the whole stream to keep the packed data of each set
+            data = stream.read()
+            stream = io.BytesIO(data)
         u = Unpacker(stream)
         version = u.unpack()
-        if version != MSGPACK_VERSION_HDR:
+        if version != MSGPACK_VERSION_HDR and version != MSGPACK_VERSION_HDR_SM2:
             raise Exception("MsgPack data starts with wrong version")
         doc = Document()
         doc.offset_type = u.unpack()
         doc._text = u.unpack()
         doc.name = u.unpack()
         doc._features = Features(u.unpack())
+        specs = parse_annsets_spec(annsets)
         nsets = u.unpack()
         setsdict = dict()
-        doc.annotation_sets = setsdict
         for iset in range(nsets):
             sname = u.unpack()
             if sname is None:
                 sname = ""
+            if specs is not None and sname not in specs:
+                u.skip()
+                nanns = u.unpack()
+                # sm2 stores 5 objects per annotation, sm3 the types list, 4 typecodes/blobs and the features
+                for _ in range(5 * nanns if version == MSGPACK_VERSION_HDR_SM2 else 10):
+                    u.skip()
+                continue
+            wanted = specs[sname] if specs is not None else None
+            if lazy and wanted is None and features and version == MSGPACK_VERSION_HDR:
+                start = u.tell()
+                next_annid = u.unpack()
+                nanns = u.unpack()
+                for _ in range(10):
+                    u.skip()
+                setsdict[sname] = AnnotationSet._from_lazy(
+                    sname, doc, next_annid, nanns, MSGPACK_VERSION_HDR, data[start:u.tell()],
+                    MsgPackSerializer._load_lazy, doc.offset_type,
+                )
+                continue
             annset = AnnotationSet(name=sname, owner_doc=doc)
             annset._next_annid = u.unpack()
             nanns = u.unpack()
-            for iann in range(nanns):
-                atype = u.unpack()
-                astart = u.unpack()
-                aend = u.unpack()
-                aid = u.unpack()
-                afeatures = u.unpack()
-                ann = Annotation(astart, aend, atype, annid=aid, features=afeatures)
-                annset._annotations[aid] = ann
+            if version == MSGPACK_VERSION_HDR_SM2:
+                for iann in range(nanns):
+                    atype = u.unpack()
+                    astart = u.unpack()
+                    aend = u.unpack()
+                    aid = u.unpack()
+                    if features:
+                        afeatures = u.unpack()
+                    else:
+                        u.skip()
+                        afeatures = None
+                    if wanted is None or atype in wanted:
+                        ann = Annotation(astart, aend, atype, annid=aid, features=afeatures)
+                        annset._annotations[aid] = ann
+            else:
+                MsgPackSerializer._unpack_annotations(u, annset, wanted=wanted, features=features)
             setsdict[sname] = annset
         doc._annotation_sets = setsdict
         return doc
@@ -698,6 +1005,8 @@ class MsgPackSerializer:
         to_mem=None,
         offset_type=None,
         offset_mapper=None,
+        compression=None,
+        compresslevel=None,
         **kwargs,
     ):
         """
@@ -709,6 +1018,8 @@ class MsgPackSerializer:
           to_mem: (Default value = None)
           offset_type: (Default value = None)
           offset_mapper: (Default value = None)
+          compression: if not None, the compression codec to use, one of "gzip", "zstd", "lz4"
+          compresslevel: the compression level, if None, the configured or default level of the codec
           **kwargs:
 
         Returns:
@@ -722,16 +1033,44 @@ class MsgPackSerializer:
             raise Exception("Object not supported")
         if to_mem:
             f = io.BytesIO()
+        elif compression:
+            f = CompressedWriter(to_ext, compression, compresslevel)
         else:
             f = open(to_ext, "wb")
         writer(inst, f)
         if to_mem:
+            if compression:
+                return compress(f.getvalue(), compression, compresslevel)
             return f.getvalue()
         else:
             f.close()
 
     @staticmethod
-    def load(clazz, from_ext=None, from_mem=None, offset_mapper=None, **kwargs):
+    def save_gzip(clazz, inst, **kwargs):
+        """
+        Invokes the save method with compression="gzip"
+        """
+        return MsgPackSerializer.save(clazz, inst, compression="gzip", **kwargs)
+
+    @staticmethod
+    def save_zstd(clazz, inst, **kwargs):
+        """
+        Invokes the save method with compression="zstd"
+        """
+        return MsgPackSerializer.save(clazz, inst, compression="zstd", **kwargs)
+
+    @staticmethod
+    def save_lz4(clazz, inst, **kwargs):
+        """
+        Invokes the save method with compression="lz4"
+        """
+        return MsgPackSerializer.save(clazz, inst, compression="lz4", **kwargs)
+
+    @staticmethod
+    def load(
+        clazz, from_ext=None, from_mem=None, offset_mapper=None, annsets=None, features=True, lazy=False,
+        gzip=False, compression=None, **kwargs
+    ):
         """
 
         Args:
@@ -739,6 +1078,12 @@ class MsgPackSerializer:
           from_ext: (Default value = None)
           from_mem: (Default value = None)
           offset_mapper: (Default value = None)
+          annsets: which annotation sets and types to load, list of set names or (setname, types) tuples,
+              if None, all
+          features: if False, do not load the annotation features
+          lazy: if True, the annotations of a set only get created when the set gets used first
+          gzip: same as compression="gzip"
+          compression: if not None, the compression codec used, one of "gzip", "zstd", "lz4"
           **kwargs:
 
         Returns:
@@ -755,13 +1100,241 @@ class MsgPackSerializer:
         if from_ext is not None:
             if isurl:
                 from_mem = get_bytes_from_url(extstr)
+        if gzip:
+            compression = "gzip"
+        if compression:
+            if not from_mem:
+                from_mem = read_compressed(extstr, compression)
+            else:
+                from_mem = decompress(from_mem, compression)
         if from_mem:
             f = io.BytesIO(from_mem)
         else:
             f = open(extstr, "rb")
-        doc = reader(f)
+        with f:
+            doc = reader(f, annsets=annsets, features=features, lazy=lazy)
         return doc
 
+    @staticmethod
+    def load_gzip(clazz, **kwargs):
+        """
+        Invokes the load method with compression="gzip"
+        """
+        return MsgPackSerializer.load(clazz, compression="gzip", **kwargs)
+
+    @staticmethod
+    def load_zstd(clazz, **kwargs):
+        """
+        Invokes the load method with compression="zstd"
+        """
+        return MsgPackSerializer.load(clazz, compression="zstd", **kwargs)
+
+    @staticmethod
+    def load_lz4(clazz, **kwargs):
+        """
+        Invokes the load method with compression="lz4"
+        """
+        return MsgPackSerializer.load(clazz, compression="lz4", **kwargs)
+
+
+# the magic bytes at the start of a memory mapped binary document file, followed by the version, the offset
+# and the length of the index
+MMAP_MAGIC = b"GNLPBDMM"
+MMAP_VERSION = 1
+MMAP_HEADER = struct.Struct("<8sIQQ")
+
+
+class MmapSerializer:
+    """
+    This class saves documents to and loads documents from a binary format which can be memory mapped.
+
+    The file starts with a small header which contains the position of an index. The index is a msgpack
+    map which contains the document name, offset type and for the text, the document features
+    and, for each annotation set and type, the arrays of start offsets, end offsets and annotation ids and
+    the list of feature dictionaries, the position and length of the section of the file where it is stored.
+
+    When loading, only the sections needed for the annotation sets and types specified with the
+    `annsets` parameter are read from the memory mapped file, so loading just a few annotation types
+    from a document with many annotations is fast.
+    """
+
+    @staticmethod
+    def document2stream(doc: Document, stream, offset_type=None, annsets=None):
+        """
+        Writes the document to the stream, which must be seekable.
+
+        Args:
+            doc: the document
+            stream: a binary stream
+            offset_type: the offset type to use, if None, the offset type of the document
+            annsets: which annotation sets and types to include, list of set names or (setname, types) tuples
+        """
+        convert = None
+        if offset_type is not None and offset_type != doc.offset_type and doc._text is not None:
+            om = doc.offset_mapper
+            convert = om.convert_to_java if offset_type == OFFSET_TYPE_JAVA else om.convert_to_python
+        else:
+            offset_type = doc.offset_type
+        start = stream.tell()
+        stream.write(MMAP_HEADER.pack(MMAP_MAGIC, MMAP_VERSION, 0, 0))
+
+        def section(data):
+            pos = stream.tell() - start
+            stream.write(data)
+            return [pos, len(data)]
+
+        index = dict(name=doc.name, offset_type=offset_type)
+        index["text"] = None if doc._text is None else section(doc._text.encode("utf-8"))
+        index["features"] = section(packb(doc._features.to_dict()))
+        specs = parse_annsets_spec(annsets)
+        sets = {}
+        for setname, annset in doc._annotation_sets.items():
+            if specs is not None and setname not in specs:
+                continue
+            alltypes = specs[setname] if specs is not None else None
+            bytype = {}
+            for ann in annset._annotations.values():
+                if alltypes is None or ann._type in alltypes:
+                    bytype.setdefault(ann._type, []).append(ann)
+            types = {}
+            for anntype, anns in bytype.items():
+                typeinfo = dict(n=len(anns))
+                offsets = [off for ann in anns for off in (ann._start, ann._end)]
+                if convert is not None:
+                    offsets = convert(offsets)
+                for key, values in [("starts", offsets[0::2]), ("ends", offsets[1::2]),
+                                    ("ids", [ann._id for ann in anns])]:
+                    typecode, data = _ints2bytes(values)
+                    typeinfo[key] = section(data)
+                    typeinfo[key + "_typecode"] = typecode
+                typeinfo["features"] = section(packb([ann._features.to_dict() for ann in anns]))
+                types[anntype] = typeinfo
+            sets[setname] = dict(next_annid=annset._next_annid, types=types)
+        index["sets"] = sets
+        index_pos, index_len = section(packb(index))
+        end = stream.tell()
+        stream.seek(start)
+        stream.write(MMAP_HEADER.pack(MMAP_MAGIC, MMAP_VERSION, index_pos, index_len))
+        stream.seek(end)
+
+    @staticmethod
+    def buffer2document(buf, annsets=None, features=True):
+        """
+        Creates a document from the bytes, mmap or memoryview buffer, only the annotation sets and
+        types specified in annsets are read from the buffer.
+
+        Args:
+            buf: the buffer
+            annsets: which annotation sets and types to load, list of set names or (setname, types) tuples,
+                if None, all
+            features: if False, the annotation features are not read
+
+        Returns:
+            the document
+        """
+        magic, version, index_pos, index_len = MMAP_HEADER.unpack_from(buf, 0)
+        if magic != MMAP_MAGIC:
+            raise Exception("Not a memory mapped binary document")
+        if version != MMAP_VERSION:
+            raise Exception(f"Unsupported memory mapped binary document version {version}")
+        index = unpackb(buf[index_pos:index_pos + index_len])
+        doc = Document()
+        doc.offset_type = index["offset_type"]
+        if index["text"] is not None:
+            pos, length = index["text"]
+            doc._text = bytes(buf[pos:pos + length]).decode("utf-8")
+        doc.name = index["name"]
+        pos, length = index["features"]
+        doc._features = Features(unpackb(buf[pos:pos + length]))
+        specs = parse_annsets_spec(annsets)
+        for setname, setinfo in index["sets"].items():
+            if specs is not None and setname not in specs:
+                continue
+            annset = AnnotationSet(name=setname, owner_doc=doc)
+            annset._next_annid = setinfo["next_annid"]
+            wanted = specs[setname] if specs is not None else None
+            columns = []
+            for anntype, typeinfo in setinfo["types"].items():
+                if wanted is not None and anntype not in wanted:
+                    continue
+                arrays = []
+                for key in ["starts", "ends", "ids"]:
+                    pos, length = typeinfo[key]
+                    arrays.append(_bytes2ints(typeinfo[key + "_typecode"], buf[pos:pos + length]))
+                if features:
+                    pos, length = typeinfo["features"]
+                    arrays.append(unpackb(buf[pos:pos + length]))
+                columns.extend(zip(arrays[0], arrays[1], [anntype] * typeinfo["n"], arrays[2], *arrays[3:]))
+            # the annotations are stored by type, add them in the order of their ids
+            columns.sort(key=lambda column: column[3])
+            if columns:
+                annset._load_columns(*zip(*columns))
+            doc._annotation_sets[setname] = annset
+        return doc
+
+    @staticmethod
+    def save(
+        clazz,
+        inst,
+        to_ext=None,
+        to_mem=None,
+        offset_type=None,
+        offset_mapper=None,
+        annsets=None,
+        **kwargs,
+    ):
+        """
+        Saves the document to a file or returns the bytes.
+
+        Args:
+          clazz: the class of the object that gets saved
+          inst: the document
+          to_ext: the file path to save to
+          to_mem: if True, return the bytes
+          offset_type: the offset type to use for saving, if None, use the offset type of the document
+          offset_mapper: ignored, the offset mapper of the document is used
+          annsets: which annotation sets and types to include, list of set names or (setname, types) tuples
+          **kwargs: ignored
+        """
+        if not isinstance(inst, Document):
+            raise Exception("Object not supported")
+        if to_mem:
+            f = io.BytesIO()
+            MmapSerializer.document2stream(inst, f, offset_type=offset_type, annsets=annsets)
+            return f.getvalue()
+        with open(to_ext, "wb") as f:
+            MmapSerializer.document2stream(inst, f, offset_type=offset_type, annsets=annsets)
+
+    @staticmethod
+    def load(clazz, from_ext=None, from_mem=None, offset_mapper=None, annsets=None, features=True, **kwargs):
+        """
+        Loads the document, or only some of its annotations, from a file or bytes. A file gets
+        memory mapped and only the sections needed for the requested annotations are read.
+
+        Args:
+          clazz: the class of the object to load, must be Document
+          from_ext: the file path or URL to load from
+          from_mem: the bytes to load from
+          offset_mapper: ignored
+          annsets: which annotation sets and types to load, list of set names or (setname, types) tuples,
+              if None, all
+          features: if False, do not load the annotation features
+          **kwargs: ignored
+
+        Returns:
+            the document
+        """
+        if clazz != Document:
+            raise Exception("Object not supported")
+        isurl, extstr = is_url(from_ext)
+        if from_ext is not None and isurl:
+            from_mem = get_bytes_from_url(extstr)
+        if from_mem is not None:
+            return MmapSerializer.buffer2document(memoryview(from_mem), annsets=annsets, features=features)
+        with open(extstr, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return MmapSerializer.buffer2document(buf, annsets=annsets, features=features)
+
 
 JS_JQUERY = '<script src="https://ajax.googleapis.com/ajax/libs/jquery/3.5.1/jquery.min.js"></script>'
 JS_GATENLP = '<script src="https://unpkg.com/gatenlp-ann-viewer@1.0.11/gatenlp-ann-viewer.js"></script>'
@@ -849,6 +1422,8 @@ class HtmlAnnViewerSerializer:
             raise Exception("Not a document!")
         # TODO: why are we doing a deepcopy here?
         doccopy = inst.deepcopy(annsets=annsets)
+        # convert with the cached offset mapper of the original document
+        doccopy._offset_mapper = inst.offset_mapper
         doccopy.to_offset_type("j")
         json = doccopy.save_mem(fmt="json", **kwargs)
         htmlloc = os.path.join(
@@ -1440,15 +2015,27 @@ DOCUMENT_SAVERS = {
     "bdocjsgz": JsonSerializer.save_gzip,
     "text/bdocjs": JsonSerializer.save,
     "text/bdocjs+gzip": JsonSerializer.save_gzip,
+    "bdocjszst": JsonSerializer.save_zstd,
+    "text/bdocjs+zstd": JsonSerializer.save_zstd,
+    "bdocjslz4": JsonSerializer.save_lz4,
+    "text/bdocjs+lz4": JsonSerializer.save_lz4,
     "yaml": YamlSerializer.save,
     "bdocym": YamlSerializer.save,
     "yamlgz": YamlSerializer.save_gzip,
     "text/bdocym": YamlSerializer.save,
-    "text/bdocym+gzip+": YamlSerializer.save_gzip,
+    "text/bdocym+gzip": YamlSerializer.save_gzip,
     "msgpack": MsgPackSerializer.save,
     "bdocmp": MsgPackSerializer.save,
     "text/bdocmp": MsgPackSerializer.save,
     "application/msgpack": MsgPackSerializer.save,
+    "bdocmpgz": MsgPackSerializer.save_gzip,
+    "application/msgpack+gzip": MsgPackSerializer.save_gzip,
+    "bdocmpzst": MsgPackSerializer.save_zstd,
+    "application/msgpack+zstd": MsgPackSerializer.save_zstd,
+    "bdocmplz4": MsgPackSerializer.save_lz4,
+    "application/msgpack+lz4": MsgPackSerializer.save_lz4,
+    "bdocmm": MmapSerializer.save,
+    "application/bdocmm": MmapSerializer.save,
     "html-ann-viewer": HtmlAnnViewerSerializer.save,
 }
 DOCUMENT_LOADERS = {
@@ -1458,6 +2045,10 @@ DOCUMENT_LOADERS = {
     "bdocjsgz": JsonSerializer.load_gzip,
     "text/bdocjs": JsonSerializer.load,
     "text/bdocjs+gzip": JsonSerializer.load_gzip,
+    "bdocjszst": JsonSerializer.load_zstd,
+    "text/bdocjs+zstd": JsonSerializer.load_zstd,
+    "bdocjslz4": JsonSerializer.load_lz4,
+    "text/bdocjs+lz4": JsonSerializer.load_lz4,
     "yaml": YamlSerializer.load,
     "yamlgz": YamlSerializer.load_gzip,
     "bdocym": YamlSerializer.load,
@@ -1468,6 +2059,14 @@ DOCUMENT_LOADERS = {
     "bdocmp": MsgPackSerializer.load,
     "application/msgpack": MsgPackSerializer.load,
     "text/bdocmp": MsgPackSerializer.load,
+    "bdocmpgz": MsgPackSerializer.load_gzip,
+    "application/msgpack+gzip": MsgPackSerializer.load_gzip,
+    "bdocmpzst": MsgPackSerializer.load_zstd,
+    "application/msgpack+zstd": MsgPackSerializer.load_zstd,
+    "bdocmplz4": MsgPackSerializer.load_lz4,
+    "application/msgpack+lz4": MsgPackSerializer.load_lz4,
+    "bdocmm": MmapSerializer.load,
+    "application/bdocmm": MmapSerializer.load,
     "jsonormsgpack": determine_loader,
     "text/plain": PlainTextSerializer.load,
     "text/plain+gzip": PlainTextSerializer.load_gzip,
@@ -1498,8 +2097,14 @@ EXTENSIONS = {
     "bdoc.gz": "text/bdocjs+gzip",  # lets assume it is compressed json
     "bdoc": "jsonormsgpack",
     "bdocjs.gz": "text/bdocjs+gzip",
+    "bdocjs.zst": "text/bdocjs+zstd",
+    "bdocjs.lz4": "text/bdocjs+lz4",
     "bdocjson": "json",
     "bdocmp": "msgpack",
+    "bdocmp.gz": "application/msgpack+gzip",
+    "bdocmp.zst": "application/msgpack+zstd",
+    "bdocmp.lz4": "application/msgpack+lz4",
+    "bdocmm": "bdocmm",
     "txt": "text/plain",
     "txt.gz": "text/plain+gzip",
     "html": "text/html",
@@ -1507,6 +2112,9 @@ EXTENSIONS = {
     "pickle": "pickle",
 }
 
+# extensions of compressed files, the format is determined by the extension before and this extension
+COMPRESSION_EXTENSIONS = [".gz", ".zst", ".lz4"]
+
 
 def get_handler(filespec, fmt, handlers, saveload, what):
     """
@@ -1537,7 +2145,7 @@ def get_handler(filespec, fmt, handlers, saveload, what):
         else:
             raise Exception(msg)
         name, ext = os.path.splitext(wf)
-        if ext == ".gz":
+        if ext in COMPRESSION_EXTENSIONS:
             ext2 = os.path.splitext(name)[1]
             if ext2:
                 ext2 = ext2[1:]
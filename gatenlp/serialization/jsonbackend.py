@@ -0,0 +1,156 @@
+"""
+Module that provides the JSON implementation used for reading and writing the BDOC JSON format and
+other JSON files.
+
+By default, the standard library json module is used, but one of the faster implementations orjson, ujson or
+rapidjson can be used instead, if it is installed. The backend to use can be set with
+`gatenlpconfig.json_backend` or, if that is not set, with the environment variable GATENLP_JSON_BACKEND.
+The value is the name of the backend or "auto" to use the first of orjson, ujson, rapidjson which is
+installed. If the backend is not installed, the standard library json module is used.
+
+Note that the fast backends may not produce exactly the same JSON as the standard library, e.g. orjson
+does not add any whitespace and does not escape non-ASCII characters, but the JSON represents the same data.
+"""
+
+import os
+import json
+import logging
+import importlib
+from gatenlp.gatenlpconfig import gatenlpconfig
+
+logger = logging.getLogger(__name__)
+
+ENV_JSON_BACKEND = "GATENLP_JSON_BACKEND"
+
+# the backends in the order they are tried for "auto"
+JSON_BACKENDS = ["orjson", "ujson", "rapidjson", "json"]
+
+
+class JsonBackend:
+    """
+    The standard library JSON backend, subclasses for other backends override loads and dumps.
+    """
+
+    name = "json"
+
+    def __init__(self, module=json):
+        self.module = module
+
+    def loads(self, data):
+        """
+        Converts a JSON string or bytes to the corresponding Python object.
+        """
+        return self.module.loads(data)
+
+    def dumps(self, obj) -> str:
+        """
+        Converts the Python object to a JSON string.
+        """
+        return self.module.dumps(obj)
+
+    def load(self, fp):
+        """
+        Reads the JSON from the file handle and returns the Python object.
+        """
+        return self.loads(fp.read())
+
+    def dump(self, obj, fp) -> None:
+        """
+        Writes the JSON for the Python object to the file handle.
+        """
+        fp.write(self.dumps(obj))
+
+
+class OrjsonBackend(JsonBackend):
+    """
+    JSON backend which uses orjson.
+    """
+
+    name = "orjson"
+
+    def __init__(self, module):
+        super().__init__(module)
+        self.options = module.OPT_NON_STR_KEYS | module.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj) -> str:
+        try:
+            return self.module.dumps(obj, option=self.options).decode("utf-8")
+        except TypeError:
+            # e.g. an integer which is too big for orjson, the standard library can handle more
+            return json.dumps(obj)
+
+
+class UjsonBackend(JsonBackend):
+    """
+    JSON backend which uses ujson.
+    """
+
+    name = "ujson"
+
+    def dumps(self, obj) -> str:
+        return self.module.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+
+class RapidjsonBackend(JsonBackend):
+    """
+    JSON backend which uses rapidjson.
+    """
+
+    name = "rapidjson"
+
+
+BACKEND_CLASSES = {
+    "orjson": OrjsonBackend,
+    "ujson": UjsonBackend,
+    "rapidjson": RapidjsonBackend,
+    "json": JsonBackend,
+}
+
+# the backends we have already loaded and the names of those we could not import
+_backends = {"json": JsonBackend()}
+_unavailable = set()
+
+
+def _load_backend(name):
+    """
+    Returns the backend with the given name or None if the package for it is not installed.
+    """
+    backend = _backends.get(name)
+    if backend is None and name not in _unavailable:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            _unavailable.add(name)
+            return None
+        backend = BACKEND_CLASSES[name](module)
+        _backends[name] = backend
+    return backend
+
+
+def get_json_backend(name: str = None) -> JsonBackend:
+    """
+    Returns the JSON backend to use.
+
+    Args:
+        name: the name of the backend or "auto", if None, the name configured in `gatenlpconfig.json_backend`
+            or the environment variable GATENLP_JSON_BACKEND is used, if both are not set, "json".
+
+    Returns:
+        the backend, the standard library backend if the backend is not installed
+    """
+    if name is None:
+        name = gatenlpconfig.json_backend or os.environ.get(ENV_JSON_BACKEND) or "json"
+    if name == "auto":
+        for bname in JSON_BACKENDS:
+            backend = _load_backend(bname)
+            if backend is not None:
+                return backend
+    if name not in BACKEND_CLASSES:
+        raise Exception(f"Unknown JSON backend {name}, must be one of {JSON_BACKENDS} or 'auto'")
+    backend = _load_backend(name)
+    if backend is None:
+        if name not in _backends:
+            logger.warning(f"JSON backend {name} is not installed, using json instead")
+            _backends[name] = _backends["json"]
+        backend = _backends["json"]
+    return backend
@@ -240,8 +240,10 @@ def support_annotation_or_set(method):
             assert len(args) == 2
             left, right = args
         # if the called method/function does have an annid keyword, pass it, otherwise omit
+        # (an annid passed on explicitly takes precedence)
         if "annid" in method.__code__.co_varnames:
-            return method(self, left, right, annid=annid, **kwargs)
+            kwargs.setdefault("annid", annid)
+            return method(self, left, right, **kwargs)
         else:
             return method(self, left, right, **kwargs)
 
@@ -337,3 +339,28 @@ def get_nested(adict, name, default=None, silent=False):
         return default
     else:
         return ret
+
+
+def parse_annsets_spec(annsets):
+    """
+    Converts an annsets specification (list of set names or (setname, types) tuples) to a dictionary
+    mapping set names to a list of types or None for all types, or returns None if annsets is None.
+
+    Args:
+        annsets: the annsets specification or None
+
+    Returns:
+        a dictionary mapping set names to a list of types or None
+    """
+    if annsets is None:
+        return None
+    specs = {}
+    for spec in annsets:
+        if isinstance(spec, str):
+            specs[spec] = None
+        else:
+            setname, types = spec
+            if isinstance(types, str):
+                types = [types]
+            specs[setname] = list(types)
+    return specs
@@ -38,7 +38,7 @@ version = versionfromfile("gatenlp/version.py")
 
 def get_install_extras_require():
     extras_require = {
-        "formats": ["msgpack", "pyyaml", "beautifulsoup4>=4.9.3", "requests"],
+        "formats": ["msgpack", "pyyaml", "beautifulsoup4>=4.9.3", "requests", "zstandard", "lz4"],
         "java": ["py4j"],
         "stanza": ["stanza>=1.2"],
         "spacy": ["spacy>=2.3"],
@@ -53,6 +53,8 @@ def get_install_extras_require():
             "ipywidgets",
         ],
         "gazetteers": ["matchtext", "recordclass"],
+        # speeds up frozen annotation sets, bulk loading of annotations and converting many offsets
+        "numpy": ["numpy"],
         # the following are not included in all but in alldev
         "dev": [
             "pytest",
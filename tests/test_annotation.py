@@ -2,7 +2,7 @@
 Module for testing the Annotation API.
 """
 
-from gatenlp import Document, Annotation, Span
+from gatenlp import Document, Annotation, Span, ChangeLog
 
 
 def make_doc():
@@ -163,3 +163,38 @@ class TestAnnotationRels:
         assert ann2.features == {"a": 1}
 
         assert str(ann2) == "Annotation(1,2,x,features=Features({'a': 1}),id=3)"
+
+    def test_annotation_features01(self):
+        import copy
+        import pickle
+        import pytest
+        from gatenlp.features import EMPTY_FEATURES
+
+        doc = Document("some text")
+        annset = doc.annset()
+        ann1 = annset.add(0, 4, "Token")
+        ann2 = annset.add(5, 9, "Token", {})
+        # annotations without features share the empty features until they get accessed
+        assert ann1._features is EMPTY_FEATURES
+        assert ann2._features is EMPTY_FEATURES
+        assert not hasattr(ann1, "__dict__")
+        assert ann1 == Annotation(0, 4, "Token", annid=ann1.id)
+        assert ann1.to_dict()["features"] == {}
+        assert str(ann1) == "Annotation(0,4,Token,features=Features({}),id=0)"
+        with pytest.raises(Exception):
+            EMPTY_FEATURES["a"] = 1
+        assert len(EMPTY_FEATURES) == 0
+        assert copy.deepcopy(EMPTY_FEATURES) is EMPTY_FEATURES
+        assert pickle.loads(pickle.dumps(EMPTY_FEATURES)) is EMPTY_FEATURES
+        ann3 = pickle.loads(pickle.dumps(Annotation(1, 2, "X")))
+        assert ann3._features is EMPTY_FEATURES
+        assert ann3 == Annotation(1, 2, "X")
+        # accessing the features creates a features instance which logs changes
+        chlog = doc.changelog = ChangeLog()
+        ann1.features["a"] = 1
+        assert ann1._features is not EMPTY_FEATURES
+        assert ann2._features is EMPTY_FEATURES
+        assert ann1.features == {"a": 1}
+        assert len(chlog) == 1
+        assert ann2.copy()._features is EMPTY_FEATURES
+        assert ann1.deepcopy().features == {"a": 1}
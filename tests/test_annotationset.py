@@ -212,3 +212,350 @@ class TestAnnotationSetRels:
     def test_annotationset_misc01(self):
         # TODO: set1.add_ann(ann, annid=None)
         pass
+
+
+class TestAnnotationSetIndexClass:
+
+    def test_annotationset_index_class01(self):
+        from gatenlp.impl import ArrayIntvls
+
+        doc1 = make_doc()
+        doc2 = make_doc()
+        set1 = doc1.annset("set1")
+        set2 = doc2.annset("set1")
+        set2.index_class = ArrayIntvls
+        set2.add(5, 8, "Ann13")
+        set1.add(5, 8, "Ann13")
+        assert isinstance(set2.with_type("Ann1")._index_class(), ArrayIntvls)
+        for ann in set1:
+            for meth in ["within", "covering", "overlapping", "startingat", "before", "after"]:
+                ids1 = [a.id for a in getattr(set1, meth)(ann)]
+                ids2 = [a.id for a in getattr(set2, meth)(ann)]
+                assert ids1 == ids2
+        assert isinstance(set2._index_by_offset, ArrayIntvls)
+        assert set1.span == set2.span
+
+    def test_annotationset_deferred_index01(self):
+        import pytest
+        from gatenlp.impl import ArrayIntvls
+
+        for index_class in [None, ArrayIntvls]:
+            doc1 = make_doc()
+            doc2 = make_doc()
+            set1 = doc1.annset("set1")
+            set2 = doc2.annset("set1")
+            if index_class is not None:
+                set2.index_class = index_class
+            # make sure both offset indices exist before we start deferring
+            set2.first()
+            list(set2.iter_ol())
+            set2.deferred_index = True
+            for setx in [set1, set2]:
+                setx.add(5, 8, "Ann13")
+                setx.add(0, 2, "Ann14")
+            # queries while deferred see the pending annotations
+            assert [a.id for a in set2.covering(5, 7)] == [a.id for a in set1.covering(5, 7)]
+            for setx in [set1, set2]:
+                setx.add(1, 9, "Ann15")
+                setx.remove(setx.with_type("Ann14").first())
+            assert set2._index_pending == []
+            set2.add(3, 4, "Ann16")
+            set1.add(3, 4, "Ann16")
+            set2.deferred_index = False
+            assert not set2.deferred_index
+            assert set2._index_pending == []
+            for ann in set1:
+                for meth in ["within", "covering", "overlapping", "startingat", "before", "after"]:
+                    ids1 = [a.id for a in getattr(set1, meth)(ann)]
+                    ids2 = [a.id for a in getattr(set2, meth)(ann)]
+                    assert ids1 == ids2
+            assert [a.id for a in set1.iter_ol()] == [a.id for a in set2.iter_ol()]
+            assert len(set2._index_by_ol) == len(set2)
+            assert len(set2._index_by_offset) == len(set2)
+            # the context manager restores the previous setting, also after an exception
+            with pytest.raises(Exception):
+                with set2.deferred_indexing():
+                    assert set2.deferred_index
+                    set2.add(6, 7, "Ann17")
+                    set2.add(7, 6, "Ann17")
+            assert not set2.deferred_index
+            assert set2._index_pending == []
+            assert len(set2._index_by_offset) == len(set2)
+
+
+class TestAnnotationSetView:
+
+    def test_annotationset_view01(self):
+        from gatenlp.annotation_set import AnnotationSetView
+        from gatenlp.impl import ArrayIntvls, TreeIntvls
+
+        for index_class in [None, ArrayIntvls, TreeIntvls]:
+            doc = make_doc()
+            set1 = doc.annset("set1")
+            if index_class is not None:
+                set1.index_class = index_class
+            for ann in list(set1):
+                for meth in ["within", "covering", "overlapping", "startingat", "coextensive",
+                             "before", "after", "start_ge", "start_lt"]:
+                    view = getattr(set1, meth)(ann)
+                    assert isinstance(view, AnnotationSetView)
+                    assert view.immutable
+                    expected = set1.detach(restrict_to=[a.id for a in view.fast_iter()])
+                    # the view does not get materialized for these
+                    assert len(view) == len(expected)
+                    assert [a.id for a in view] == [a.id for a in expected]
+                    assert [a.id for a in view.iter(reverse=True)] == [a.id for a in expected.iter(reverse=True)]
+                    assert all(a in view for a in expected.fast_iter())
+                    if len(view) > 0:
+                        assert view.first().id == expected.first().id
+                        assert view.last().id == expected.last().id
+                    assert view._anns_dict is None
+                    # chained queries
+                    for meth2 in ["within", "covering", "overlapping", "startingat", "coextensive"]:
+                        ids1 = [a.id for a in getattr(view, meth2)(ann)]
+                        ids2 = [a.id for a in getattr(expected, meth2)(ann)]
+                        assert ids1 == ids2
+                    assert view._anns_dict is None
+                    ids1 = sorted(a.id for a in view.with_type("Ann1", "Ann2"))
+                    ids2 = sorted(a.id for a in expected.with_type("Ann1", "Ann2"))
+                    assert ids1 == ids2
+                    # everything else works as for a detached set
+                    assert view.span == expected.span
+                    assert sorted(view.to_dict()["annotations"], key=lambda a: a["id"]) == \
+                        sorted(expected.to_dict()["annotations"], key=lambda a: a["id"])
+
+    def test_annotationset_view02(self):
+        doc = make_doc()
+        set1 = doc.annset("set1")
+        tokens = set1.with_type("Ann1", "Ann2", "Ann3")
+        within = tokens.within(0, 10)
+        ids = [a.id for a in within]
+        # modifying the parent set does not change the view, but the view stops using the parent indices
+        set1.add(1, 3, "Ann1")
+        assert [a.id for a in tokens.within(0, 10)] == ids
+        for ann in list(within):
+            set1.remove(ann)
+        assert [a.id for a in within] == ids
+        assert len(tokens.within(0, 10)) == len(ids)
+        # a view can be made mutable and then behaves like a detached set
+        within.immutable = False
+        within.add(2, 4, "NewAnn")
+        assert len(within) == len(ids) + 1
+        assert len(within.with_type("NewAnn")) == 1
+
+
+class TestAnnotationSetTypeIndex:
+
+    def test_annotationset_type_index01(self):
+        import random
+        from gatenlp.impl import ArrayIntvls, TreeIntvls
+
+        rnd = random.Random(1)
+        for index_class, type_offset_index in [(None, False), (None, True), (ArrayIntvls, True), (TreeIntvls, True)]:
+            doc = Document("x" * 200)
+            set1 = doc.annset()
+            if index_class is not None:
+                set1.index_class = index_class
+            set1.type_offset_index = type_offset_index
+            for i in range(150):
+                start = rnd.randint(0, 190)
+                set1.add(start, start + rnd.randint(0, 10), rnd.choice(["Token", "Sentence", "Other"]))
+            tokens = set1.with_type("Token")
+            assert len(tokens) == len([a for a in set1.fast_iter() if a.type == "Token"])
+            # if enabled, typed queries create the per-type index which then gets updated incrementally
+            for i in range(60):
+                if i % 3 == 0:
+                    set1.remove(rnd.choice(list(set1.fast_iter())))
+                elif i % 3 == 1:
+                    start = rnd.randint(0, 190)
+                    set1.add(start, start + rnd.randint(0, 10), rnd.choice(["Token", "Sentence"]))
+                if i == 30:
+                    set1.deferred_index = True
+                types = rnd.choice([["Token"], ["Token", "Sentence"]])
+                start_ge = rnd.randint(0, 100)
+                start_lt = start_ge + rnd.randint(1, 100)
+                expected = [
+                    a.id for a in set1.iter(start_ge=start_ge, start_lt=start_lt) if a.type in types
+                ]
+                assert expected == [
+                    a.id for a in set1.iter(start_ge=start_ge, start_lt=start_lt, with_type=types)
+                ]
+                assert expected[::-1] == [
+                    a.id for a in set1.iter(start_ge=start_ge, start_lt=start_lt, with_type=types, reverse=True)
+                ]
+                view = set1.with_type(*types)
+                for meth in ["within", "covering", "overlapping", "startingat", "coextensive"]:
+                    expected = [a.id for a in getattr(set1, meth)(start_ge, start_lt) if a.type in types]
+                    assert [a.id for a in getattr(view, meth)(start_ge, start_lt)] == expected
+            # the view from before the changes still has the tokens from back then
+            assert all(a.type == "Token" for a in tokens)
+            assert len(tokens) == len(list(tokens))
+
+    def test_annotationset_type_index02(self):
+        doc = make_doc()
+        set1 = doc.annset("set1")
+        view = set1.with_type("Ann3", "Ann9")
+        # per-type offset indices are only created if they are enabled
+        assert not set1.type_offset_index
+        assert [a.type for a in view.within(0, 30)] == ["Ann3", "Ann9"]
+        assert [a.type for a in set1.iter(with_type="Ann3")] == ["Ann3"]
+        assert set1._index_by_type_offset is None
+        set1.type_offset_index = True
+        view = set1.with_type("Ann3", "Ann9")
+        assert len(view) == 2
+        assert view.first().type == "Ann3"
+        assert "Ann3" in set1._index_by_type_offset
+        ann3 = view.first()
+        assert [a.type for a in view.within(0, 30)] == ["Ann3", "Ann9"]
+        assert [a.type for a in view.covering(ann3)] == ["Ann9"]
+        assert [a.type for a in view.covering(ann3, include_self=True)] == ["Ann3", "Ann9"]
+        assert [a.type for a in set1.iter(with_type="Ann3")] == ["Ann3"]
+        # start_lt excludes annotations which start at that offset
+        assert [a.type for a in set1.iter(start_ge=12, start_lt=18)] == ["Ann5"]
+        set1.add(18, 20, "Ann3")
+        assert len(view) == 2
+        assert len(set1.with_type("Ann3", "Ann9")) == 3
+        set1.remove(ann3)
+        assert [a.type for a in set1.with_type("Ann3", "Ann9").within(0, 30)] == ["Ann9", "Ann3"]
+        assert [a.id for a in view] == [2, 8]
+        set1.type_offset_index = False
+        assert set1._index_by_type_offset is None
+
+
+class TestAnnotationSetMany:
+
+    def test_annotationset_many01(self):
+        import random
+        from gatenlp.impl import ArrayIntvls, TreeIntvls
+
+        rnd = random.Random(2)
+        for index_class in [None, ArrayIntvls, TreeIntvls]:
+            doc = Document("x" * 300)
+            set1 = doc.annset()
+            if index_class is not None:
+                set1.index_class = index_class
+            for i in range(200):
+                start = rnd.randint(0, 280)
+                set1.add(start, start + rnd.randint(0, 15), rnd.choice(["Token", "Sentence", "Other"]))
+            spans = [a for a in set1.fast_iter() if a.type == "Sentence"]
+            spans += [(s, s + rnd.randint(0, 20)) for s in [rnd.randint(0, 280) for _ in range(50)]]
+            spans.append(Span(10, 10))
+            for include_self in [False, True]:
+                for setx in [set1, set1.with_type("Token"), set1.with_type("Token", "Other"), set1.within(50, 250)]:
+                    for meth in ["within", "covering"]:
+                        results = getattr(setx, meth + "_many")(spans, include_self=include_self)
+                        assert len(results) == len(spans)
+                        for span, result in zip(spans, results):
+                            if isinstance(span, tuple):
+                                expected = getattr(setx, meth)(*span, include_self=include_self)
+                            else:
+                                expected = getattr(setx, meth)(span, include_self=include_self)
+                            assert [a.id for a in result] == [a.id for a in expected]
+        assert set1.within_many([]) == []
+
+
+class TestFrozenAnnotationSet:
+
+    def test_frozen_annotationset01(self):
+        import random
+        import pickle
+        import pytest
+
+        rnd = random.Random(3)
+        doc = Document("x" * 400)
+        set1 = doc.annset()
+        for i in range(300):
+            start = rnd.randint(0, 290)
+            end = start + rnd.choice([0, 0, 1, 2, 5, 20])
+            set1.add(start, end, rnd.choice(["A", "B", "C"]), {"i": i} if i % 3 else None)
+        frozen = set1.freeze()
+        assert frozen.immutable
+        assert frozen.isdetached()
+        assert len(frozen) == len(set1)
+        assert [a.id for a in frozen] == [a.id for a in set1]
+        assert frozen.span == set1.span
+        assert set(frozen.type_names) == set(set1.type_names)
+        assert frozen.freeze() is frozen
+        for meth in ["within", "covering", "overlapping", "coextensive", "before", "after",
+                     "start_ge", "startingat", "start_min_ge", "start_lt"]:
+            for _ in range(100):
+                start = rnd.randint(0, 300)
+                end = start + rnd.choice([0, 1, 3, 10, 50])
+                if meth in ["start_ge", "startingat", "start_min_ge", "start_lt"]:
+                    expected, result = getattr(set1, meth)(start), getattr(frozen, meth)(start)
+                else:
+                    expected, result = getattr(set1, meth)(start, end), getattr(frozen, meth)(start, end)
+                assert sorted(a.id for a in result) == sorted(a.id for a in expected)
+            ann = rnd.choice(list(set1.fast_iter()))
+            assert sorted(a.id for a in getattr(frozen, meth)(ann)) == sorted(a.id for a in getattr(set1, meth)(ann))
+        for _ in range(50):
+            start = rnd.randint(0, 300)
+            end = start + rnd.randint(1, 40)
+            assert [a.id for a in frozen.with_type("A").within(start, end)] == \
+                   [a.id for a in set1.with_type("A").within(start, end)]
+            assert [a.id for a in frozen.iter(start_ge=start, start_lt=end, with_type="B")] == \
+                   [a.id for a in set1.iter(start_ge=start, start_lt=end, with_type="B")]
+        assert [a.id for a in frozen.with_type(["A", "C"])] == [a.id for a in set1.with_type("A", "C")]
+        assert frozen.with_type("X").size == 0
+        # annotations get created once and share the features with the original annotations
+        ann = frozen.get(4)
+        assert ann is frozen[4]
+        assert ann in frozen.within(ann, include_self=True)
+        assert ann.features.to_dict() == set1.get(4).features.to_dict()
+        set1.get(4).features["x"] = 1
+        assert ann.features["x"] == 1
+        assert 4 in frozen and 1000 not in frozen
+        assert frozen.to_dict()["annotations"] == \
+               sorted(set1.to_dict()["annotations"], key=lambda d: (d["start"], d["id"]))
+        copy = pickle.loads(pickle.dumps(frozen))
+        assert [a.id for a in copy] == [a.id for a in frozen]
+        # the offset indices are not pickled but re-created
+        copy = pickle.loads(pickle.dumps(set1))
+        assert [a.id for a in copy.within(10, 60)] == [a.id for a in set1.within(10, 60)]
+        mutable = frozen.copy()
+        assert not mutable.immutable and mutable.size == frozen.size
+        with pytest.raises(Exception):
+            frozen.immutable = False
+        with pytest.raises(Exception):
+            frozen.add(1, 2, "A")
+
+
+class TestAnnotationSetPositional:
+
+    def test_annotationset_for_idx01(self):
+        doc = Document("x" * 100)
+        set1 = doc.annset()
+        for start in [50, 10, 30, 10, 70]:
+            set1.add(start, start + 5, "Token")
+        assert [set1.for_idx(i).start for i in range(len(set1))] == [50, 10, 30, 10, 70]
+        assert set1.for_idx(5) is None
+        assert set1.for_idx(5, default=1) == 1
+        assert set1.for_idx(-1).start == 70
+        assert [a.start for a in set1.for_idx(slice(1, 3))] == [10, 30]
+        assert [a.start for a in set1.for_idx(slice(None), ordered=True)] == [10, 10, 30, 50, 70]
+        assert set1.first().id == 1
+        assert set1.last().start == 70
+        # the cached sequences are discarded when the set changes
+        set1.add(0, 1, "Token")
+        set1.remove(set1.for_idx(0))
+        assert set1.for_idx(-1).start == 0
+        assert set1.first().start == 0
+        set1.add(90, 91, "Token")
+        assert set1.last().start == 90
+        view = set1.with_type("Token")
+        assert [a.start for a in view.for_idx(slice(None))] == [a.start for a in set1]
+        view = set1.within(20, 100)
+        assert view.for_idx(0).start == 30
+        # views index in document order, also once they have their own annotations
+        assert view.get(view.first().id) is not None
+        assert view._anns_dict is not None
+        assert [a.start for a in view.for_idx(slice(None))] == [30, 70, 90]
+        # first and last use the offset index, also with pending updates of the index
+        set1.deferred_index = True
+        set1.add(97, 98, "Token")
+        set1.add(95, 96, "Token")
+        assert set1.first().start == 0 and set1.last().start == 97
+        set1.deferred_index = False
+        frozen = set1.freeze()
+        assert [a.id for a in frozen.for_idx(slice(None))] == [a.id for a in set1]
+        assert frozen.for_idx(-1) is frozen.last()
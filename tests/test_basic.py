@@ -23,6 +23,47 @@ class TestOffsetMapper01:
             poff = om1.convert_to_python(joff)
             assert poff == i
 
+    def test_offsetmapper01m02(self):
+        from gatenlp.offsetmapper import OffsetMapper
+
+        c_poo = "\U0001F4A9"
+        om = OffsetMapper("abc\u00e9\u4e00")
+        assert om.bijective == 5
+        assert om.convert_to_java(3) == 3
+        om = OffsetMapper(c_poo + "a" + c_poo + c_poo)
+        assert om.bijective is None
+        assert om.python2java == [0, 2, 3, 5, 7]
+        assert om.java2python == [0, 0, 1, 2, 2, 3, 3, 4]
+        assert om.convert_to_java([0, 1, 2, 3, 4]) == om.python2java
+        assert om.convert_to_python(range(8)) == om.java2python
+        assert [om.convert_to_java(i) for i in range(5)] == om.python2java
+
+    def test_offsetmapper01m03(self):
+        from gatenlp.document import Document, OFFSET_TYPE_JAVA, OFFSET_TYPE_PYTHON
+        from gatenlp.changelog import ChangeLog
+
+        doc = Document()
+        assert doc.offset_mapper is None
+        doc.text = "a \U0001F4A9 b"
+        doc.annset().add(2, 3, "X")
+        doc.annset().add(4, 5, "Y")
+        d1 = doc.to_dict(offset_type=OFFSET_TYPE_JAVA)
+        d2 = doc.to_dict(offset_type=OFFSET_TYPE_JAVA)
+        assert d1 == d2
+        assert d1["annotation_sets"][""]["annotations"][1]["start"] == 5
+        om = doc.to_offset_type(OFFSET_TYPE_JAVA)
+        assert om is doc.offset_mapper
+        doc.to_offset_type(OFFSET_TYPE_PYTHON)
+        assert doc.offset_mapper_stats["misses"] == 1
+        assert doc.offset_mapper_stats["hits"] == 4
+        assert doc.copy().offset_mapper is om
+        assert doc.deepcopy().offset_mapper is om
+        ChangeLog.from_dict(
+            {"changes": [{"command": "annotation:add", "set": "", "start": 5, "end": 6, "type": "Y", "id": 1,
+                          "features": {}}], "offset_type": OFFSET_TYPE_JAVA},
+            document=doc)
+        assert doc.offset_mapper_stats == dict(hits=5, misses=1)
+
 
 class TestDocument01:
     def test_document01m01(self):
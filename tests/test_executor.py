@@ -0,0 +1,460 @@
+import os
+import time
+import random
+import threading
+import pytest
+from gatenlp.document import Document
+from gatenlp.corpora import (
+    ListCorpus, NumberedDirFilesCorpus, CachedCorpus, BdocjsLinesFileSource, BdocjsLinesFileDestination
+)
+from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.pipeline import Pipeline
+from gatenlp.processing.instrumentation import format_stats
+from gatenlp.processing.memoize import DiskCache, MemoizingAnnotator
+from gatenlp.processing.executor import (
+    SerialCorpusExecutor, MultiprocessingCorpusExecutor, ThreadedCorpusExecutor
+)
+
+TEXTS = [f"Document number {i}." for i in range(20)]
+
+
+class CountingAnnotator(Annotator):
+    """Adds an annotation, counts the documents and returns the count from finish."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.n = 0
+
+    def start(self):
+        self.n = 0
+
+    def __call__(self, doc, **kwargs):
+        if doc.text == self.fail_on:
+            raise Exception("Failing as requested")
+        doc.annset().add(0, 8, "Word")
+        self.n += 1
+        return doc
+
+    def finish(self):
+        return self.n
+
+    def reduce(self, results):
+        return sum(results)
+
+
+class SplittingAnnotator(Annotator):
+    """Returns two documents for each document."""
+
+    def __call__(self, doc, **kwargs):
+        return [Document(doc.text + " A"), Document(doc.text + " B")]
+
+
+class SleepingAnnotator(Annotator):
+    """Sleeps for a random time and records the maximum number of concurrent calls."""
+
+    def __init__(self, max_concurrency=None):
+        self.max_concurrency = max_concurrency
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self, doc, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(random.uniform(0.001, 0.01))
+        with self.lock:
+            self.running -= 1
+        return doc
+
+
+class UnpicklableAnnotator(Annotator):
+    """Uses the offset index of the set and adds an unpicklable feature to the document with the given text."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    def __call__(self, doc, **kwargs):
+        doc.annset().add(0, 8, "Word")
+        doc.annset().within(0, 10)
+        if doc.text == self.fail_on:
+            doc.features["lock"] = threading.Lock()
+        return doc
+
+
+class FailingSource:
+    """A document source which raises an exception after returning some documents."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def __iter__(self):
+        for t in TEXTS[:self.n]:
+            yield Document(t)
+        raise Exception("Source failing as requested")
+
+
+class FeaturingAnnotator(Annotator):
+    """Adds two annotations and changes their features after adding them."""
+
+    def __call__(self, doc, **kwargs):
+        for start in [0, 9]:
+            ann = doc.annset().add(start, start + 6, "Word", features={"start": start})
+            ann.features["checked"] = True
+        return doc
+
+
+class BatchingAnnotator(CountingAnnotator):
+    """Records the sizes of the batches it gets."""
+
+    def __init__(self, fail_on=None):
+        super().__init__(fail_on=fail_on)
+        self.batches = []
+
+    def process_batch(self, docs, **kwargs):
+        self.batches.append(len(docs))
+        return super().process_batch(docs, **kwargs)
+
+
+class TestBatching:
+    def test_batching01(self):
+        # each annotator of the pipeline gets the whole batch, results go back to the right input document
+        first = BatchingAnnotator()
+        last = BatchingAnnotator()
+        pipeline = Pipeline(first, SplittingAnnotator(), last)
+        rets = pipeline.process_batch([Document(t) for t in TEXTS[:3]])
+        assert [[d.text for d in ret] for ret in rets] == [[t + " A", t + " B"] for t in TEXTS[:3]]
+        assert first.batches == [3]
+        assert last.batches == [6]
+        docs = list(pipeline.pipe([Document(t) for t in TEXTS], batch_size=8))
+        assert [doc.text for doc in docs] == [t + s for t in TEXTS for s in [" A", " B"]]
+        assert first.batches == [3, 8, 8, 4]
+        # without batch_size the annotators get called for each document
+        docs = list(Pipeline(first, last).pipe([Document(t) for t in TEXTS[:3]]))
+        assert len(docs) == 3
+        assert first.batches == [3, 8, 8, 4]
+
+    def test_batching02(self):
+        annotator = BatchingAnnotator(fail_on=TEXTS[12])
+        corpus = ListCorpus([Document(t) for t in TEXTS])
+        executor = SerialCorpusExecutor(annotator, corpus=corpus, batch_size=5)
+        # the documents before the failing one in its batch got processed (in place) as well
+        assert executor() == 17
+        assert annotator.batches == [5, 5, 5, 5]
+        # the failing batch is counted as errors for all its documents
+        assert executor.n_err == 5
+        assert executor.n_out == 15
+        assert [len(doc.annset()) for doc in corpus] == [1] * 12 + [0] * 3 + [1] * 5
+        for executor in [
+            ThreadedCorpusExecutor(BatchingAnnotator(), source=[Document(t) for t in TEXTS], destination=[],
+                                   nthreads=2, batch_size=3),
+            MultiprocessingCorpusExecutor(BatchingAnnotator(), source=[Document(t) for t in TEXTS], destination=[],
+                                          nworkers=2, batch_size=3),
+        ]:
+            executor()
+            assert [doc.text for doc in executor.destination] == TEXTS
+            assert all(len(doc.annset()) == 1 for doc in executor.destination)
+
+
+class TestPipeline:
+    def test_pipeline01(self):
+        # each document returned by an annotator gets processed once by the next annotator
+        first = CountingAnnotator()
+        last = BatchingAnnotator()
+        pipeline = Pipeline(first, SplittingAnnotator(), SplittingAnnotator(), last)
+        rets = pipeline(Document("Some text"))
+        assert [d.text for d in rets] == ["Some text A A", "Some text A B", "Some text B A", "Some text B B"]
+        assert first.n == 1
+        assert last.n == 4
+        assert last.batches == []
+        assert all(len(d.annset()) == 1 for d in rets)
+        # with batch_fanout, the documents are passed on to the next annotator in one batch
+        pipeline = pipeline.copy()
+        pipeline.batch_fanout = True
+        rets = pipeline(Document("Some text"))
+        assert [d.text for d in rets] == ["Some text A A", "Some text A B", "Some text B A", "Some text B B"]
+        assert last.n == 8
+        assert last.batches == [4]
+        # a single result document is returned as the document, no result as an empty list
+        assert Pipeline(first, batch_fanout=True)(Document("Some text")).text == "Some text"
+        assert Pipeline(lambda doc: None, first)(Document("Some text")) == []
+        assert first.n == 3
+
+
+class TestInstrumentation:
+    def test_instrumentation01(self):
+        pipeline = Pipeline(
+            (CountingAnnotator(), "count"), (SplittingAnnotator(), "split"), (CountingAnnotator(), "count2"),
+            instrument=True, trace_memory=True,
+        )
+        executor = SerialCorpusExecutor(pipeline, source=[Document(t) for t in TEXTS], destination=[])
+        ret = executor()
+        assert ret["results"] == [len(TEXTS), None, 2 * len(TEXTS)]
+        stats = {s["name"]: s for s in ret["instrumentation"]["annotators"]}
+        assert list(stats) == ["count", "split", "count2"]
+        assert stats["count"]["calls"] == len(TEXTS)
+        assert stats["split"]["docs_in"] == len(TEXTS)
+        assert stats["split"]["docs_out"] == 2 * len(TEXTS)
+        assert stats["count2"]["calls"] == 2 * len(TEXTS)
+        # the split documents are new, so their annotations count as added
+        assert stats["count"]["anns_added"] == {"": {"Word": len(TEXTS)}}
+        assert stats["split"]["anns_added"] == {}
+        assert stats["count2"]["anns_added"] == {"": {"Word": 2 * len(TEXTS)}}
+        assert all(s["wall_time"] >= 0 and s["mem_peak"] is not None for s in stats.values())
+        report = format_stats(ret["instrumentation"])
+        assert "count2" in report and "Word:40" in report
+        # the statistics from several runs get merged by reduce
+        combined = pipeline.reduce([ret, ret])
+        assert combined["results"] == [2 * len(TEXTS), [None, None], 4 * len(TEXTS)]
+        stats = {s["name"]: s for s in combined["instrumentation"]["annotators"]}
+        assert stats["count2"]["calls"] == 4 * len(TEXTS)
+        assert stats["count2"]["anns_added"] == {"": {"Word": 4 * len(TEXTS)}}
+        # the executor can instrument the whole annotator, with batching and errors
+        executor = SerialCorpusExecutor(
+            CountingAnnotator(fail_on=TEXTS[0]), source=[Document(t) for t in TEXTS], destination=[],
+            instrument=True, batch_size=10,
+        )
+        executor()
+        stats = executor.instrumentation.to_dict()["annotators"][0]
+        assert stats["name"] == "CountingAnnotator"
+        assert stats["calls"] == 2
+        assert stats["errors"] == 1
+        assert stats["docs_in"] == len(TEXTS)
+        assert stats["docs_out"] == 10
+        assert stats["mem_peak"] is None
+        assert "CountingAnnotator" in executor.instrumentation.report()
+
+
+class TestCheckpoint:
+    def test_checkpoint01(self, tmp_path):
+        # processing fails after some documents, the state was saved every 4 documents
+        checkpoint = str(tmp_path / "state.pickle")
+        outfile = str(tmp_path / "out.bdocjs")
+        dest = BdocjsLinesFileDestination(outfile)
+        executor = SerialCorpusExecutor(
+            CountingAnnotator(fail_on=TEXTS[10]), source=[Document(t) for t in TEXTS], destination=dest,
+            exit_on_error=True, checkpoint=checkpoint, checkpoint_every=4,
+        )
+        with pytest.raises(Exception):
+            executor()
+        dest.close()
+        # documents 0 to 7 are saved as done, 8 and 9 got appended after that
+        assert len(list(BdocjsLinesFileSource(outfile))) == 10
+        annotator = CountingAnnotator()
+        with BdocjsLinesFileDestination(outfile, append=True) as dest:
+            executor = SerialCorpusExecutor(
+                annotator, source=[Document(t) for t in TEXTS], destination=dest, checkpoint=checkpoint,
+                checkpoint_every=4,
+            )
+            # the results of finish() from before the checkpoints and after resuming are combined with reduce
+            assert executor() == len(TEXTS)
+        # the state was also saved after the last document, so the annotator was started again
+        assert annotator.n == 0
+        # the documents appended after the saved state were removed when resuming
+        assert [doc.text for doc in BdocjsLinesFileSource(outfile)] == TEXTS
+        assert executor.n_in == len(TEXTS)
+        assert executor.n_out == len(TEXTS)
+        assert not os.path.exists(checkpoint)
+
+    def test_checkpoint02(self, tmp_path):
+        # documents which already exist in the cache corpus are skipped without processing them
+        cache = NumberedDirFilesCorpus(str(tmp_path), digits=3, levels=2, size=len(TEXTS))
+        corpus = CachedCorpus(ListCorpus([Document(t) for t in TEXTS]), cache)
+        for idx in [1, 5, 6]:
+            corpus[idx] = Document(TEXTS[idx])
+        assert cache.exists(5) and not cache.exists(4)
+        annotator = CountingAnnotator()
+        executor = SerialCorpusExecutor(annotator, corpus=corpus, is_done=corpus.is_cached)
+        assert executor() == len(TEXTS) - 3
+        assert executor.n_skipped == 3
+        assert all(cache.exists(idx) for idx in range(len(TEXTS)))
+        assert len(corpus[5].annset()) == 0
+        assert len(corpus[4].annset()) == 1
+
+
+class TestMemoizing:
+    def test_memoizing01(self, tmp_path):
+        annotator = BatchingAnnotator()
+        memo = MemoizingAnnotator(annotator, str(tmp_path), config={"version": 1})
+        doc = memo(Document(TEXTS[0]))
+        assert annotator.n == 1
+        assert memo.n_misses == 1
+        # the same text gets the annotations and features from the cache
+        doc2 = memo(Document(TEXTS[0]))
+        assert annotator.n == 1
+        assert memo.n_hits == 1
+        assert doc2.annset().to_dict() == doc.annset().to_dict()
+        # a cache opened again on the same directory still has the entry, batches only process the misses
+        annotator = BatchingAnnotator()
+        memo = MemoizingAnnotator(annotator, DiskCache(str(tmp_path)), config={"version": 1})
+        docs = memo.process_batch([Document(t) for t in TEXTS[:3]])
+        assert annotator.batches == [2]
+        assert all(len(d.annset()) == 1 for d in docs)
+        # a different configuration or different input annotations give a different key
+        memo2 = MemoizingAnnotator(annotator, str(tmp_path), config={"version": 2})
+        assert memo2.key(Document(TEXTS[0])) != memo.key(Document(TEXTS[0]))
+        memo3 = MemoizingAnnotator(annotator, str(tmp_path), input_annsets=["in"])
+        doc = Document(TEXTS[0])
+        key = memo3.key(doc)
+        doc.annset("in").add(0, 3, "X")
+        assert memo3.key(doc) != key
+
+    def test_memoizing02(self, tmp_path):
+        # mode "sets" stores the output sets, the cache evicts the least recently used entries
+        cache = DiskCache(str(tmp_path), max_entries=2)
+        annotator = CountingAnnotator()
+        memo = MemoizingAnnotator(annotator, cache, output_annsets=[""], mode="sets")
+        for t in TEXTS[:3]:
+            memo(Document(t))
+        assert len(cache) == 2
+        assert memo.key(Document(TEXTS[0])) not in cache
+        doc = memo(Document(TEXTS[2]))
+        assert annotator.n == 3
+        assert doc.annset().with_type("Word").size == 1
+        cache = DiskCache(str(tmp_path / "small"), max_size=10)
+        cache.put("a1", b"12345678")
+        cache.put("b1", b"12345678")
+        assert len(cache) == 1 and cache.get("b1") == b"12345678" and cache.get("a1") is None
+        # entries over the limits get evicted when the cache gets opened with lower limits
+        cache = DiskCache(str(tmp_path / "reopened"))
+        for key in ["a1", "b1", "c1"]:
+            cache.put(key, b"1234")
+        cache = DiskCache(str(tmp_path / "reopened"), max_entries=2, max_size=4)
+        assert len(cache) == 1 and cache.size == 4
+
+    def test_memoizing03(self, tmp_path):
+        # annotations replayed into a set which already has annotations with the same ids get new ids
+        memo = MemoizingAnnotator(FeaturingAnnotator(), str(tmp_path))
+        memo(Document(TEXTS[0]))
+        doc = Document(TEXTS[0])
+        doc.annset().add(0, 3, "Old", features={"old": True})
+        doc.annset().add(3, 5, "Old")
+        doc = memo(doc)
+        assert memo.n_hits == 1
+        assert doc.annset().with_type("Old").size == 2
+        assert doc.annset().get(0).features.to_dict() == {"old": True}
+        words = list(doc.annset().with_type("Word"))
+        assert [ann.features.to_dict() for ann in words] == [
+            {"start": 0, "checked": True}, {"start": 9, "checked": True}
+        ]
+        assert [ann.id for ann in words] == [2, 3]
+
+
+class TestMultiprocessingExecutor:
+    def test_mpexecutor01(self):
+        corpus = ListCorpus([Document(t) for t in TEXTS])
+        executor = MultiprocessingCorpusExecutor(CountingAnnotator(), corpus=corpus, nworkers=3)
+        assert executor() == len(TEXTS)
+        assert executor.n_in == len(TEXTS)
+        assert executor.n_out == len(TEXTS)
+        assert executor.n_err == 0
+        # the processed documents got stored back into the corpus
+        assert all(len(doc.annset()) == 1 for doc in corpus)
+        assert [doc.text for doc in corpus] == TEXTS
+
+    def test_mpexecutor02(self):
+        # the order of the source is kept in the destination
+        dest = []
+        executor = MultiprocessingCorpusExecutor(
+            SplittingAnnotator(), source=[Document(t) for t in TEXTS], destination=ListCorpus(dest),
+            nworkers=2, queue_size=2,
+        )
+        assert executor() is None
+        assert executor.n_out == 2 * len(TEXTS)
+        assert [doc.text for doc in dest] == [t + s for t in TEXTS for s in [" A", " B"]]
+        # errors get counted, the finish results of a pipeline get reduced for each annotator
+        dest = []
+        executor = MultiprocessingCorpusExecutor(
+            Pipeline(CountingAnnotator(), CountingAnnotator(fail_on=TEXTS[3])),
+            source=[Document(t) for t in TEXTS],
+            destination=dest,
+            nworkers=2,
+        )
+        assert executor() == [len(TEXTS), len(TEXTS) - 1]
+        assert executor.n_err == 1
+        assert executor.n_out == len(TEXTS) - 1
+        assert [doc.text for doc in dest] == [t for t in TEXTS if t != TEXTS[3]]
+        serial = SerialCorpusExecutor(CountingAnnotator(), source=[Document(t) for t in TEXTS])
+        assert serial() == len(TEXTS)
+
+    def test_mpexecutor03(self):
+        executor = MultiprocessingCorpusExecutor(
+            CountingAnnotator(fail_on=TEXTS[5]), source=[Document(t) for t in TEXTS],
+            destination=[], nworkers=2, exit_on_error=True,
+        )
+        with pytest.raises(Exception) as ex:
+            executor()
+        assert "Failing as requested" in str(ex.value)
+
+    def test_mpexecutor04(self):
+        # results which cannot be pickled are counted as errors, sets with offset indices can be pickled
+        dest = []
+        executor = MultiprocessingCorpusExecutor(
+            UnpicklableAnnotator(fail_on=TEXTS[2]), source=[Document(t) for t in TEXTS],
+            destination=dest, nworkers=2,
+        )
+        executor()
+        assert executor.n_err == 1
+        assert [doc.text for doc in dest] == [t for t in TEXTS if t != TEXTS[2]]
+        assert all(len(doc.annset().within(0, 10)) == 1 for doc in dest)
+
+    def test_mpexecutor05(self):
+        # an error reading the source gets raised after the documents read so far are processed
+        dest = []
+        executor = MultiprocessingCorpusExecutor(
+            CountingAnnotator(), source=FailingSource(5), destination=dest, nworkers=2,
+        )
+        with pytest.raises(Exception) as ex:
+            executor()
+        assert "Source failing as requested" in str(ex.value.__cause__)
+        assert [doc.text for doc in dest] == TEXTS[:5]
+
+
+class TestThreadedExecutor:
+    def test_threadedexecutor01(self):
+        corpus = ListCorpus([Document(t) for t in TEXTS])
+        executor = ThreadedCorpusExecutor(CountingAnnotator(), corpus=corpus, nthreads=3)
+        assert executor() == len(TEXTS)
+        assert executor.n_out == len(TEXTS)
+        assert all(len(doc.annset()) == 1 for doc in corpus)
+        # the order of the source is kept in the destination even if documents finish in a different order
+        annotator = SleepingAnnotator()
+        dest = []
+        executor = ThreadedCorpusExecutor(
+            annotator, source=[Document(t) for t in TEXTS], destination=dest, nthreads=4, queue_size=6,
+        )
+        executor()
+        assert [doc.text for doc in dest] == TEXTS
+        assert 1 < annotator.max_running <= 4
+        dest = []
+        executor = ThreadedCorpusExecutor(
+            SleepingAnnotator(), source=[Document(t) for t in TEXTS], destination=dest, nthreads=4, ordered=False,
+        )
+        executor()
+        assert sorted(doc.text for doc in dest) == sorted(TEXTS)
+
+    def test_threadedexecutor02(self):
+        # the concurrency limit of each annotator in a pipeline is respected
+        limited = SleepingAnnotator(max_concurrency=2)
+        unlimited = SleepingAnnotator()
+        executor = ThreadedCorpusExecutor(
+            Pipeline(unlimited, limited), source=[Document(t) for t in TEXTS], destination=[], nthreads=5,
+        )
+        executor()
+        assert executor.n_out == len(TEXTS)
+        assert 1 <= limited.max_running <= 2
+        # errors get counted or raised
+        dest = []
+        executor = ThreadedCorpusExecutor(
+            CountingAnnotator(fail_on=TEXTS[3]), source=[Document(t) for t in TEXTS], destination=dest, nthreads=2,
+        )
+        assert executor() == len(TEXTS) - 1
+        assert executor.n_err == 1
+        assert [doc.text for doc in dest] == [t for t in TEXTS if t != TEXTS[3]]
+        executor = ThreadedCorpusExecutor(
+            CountingAnnotator(fail_on=TEXTS[3]), source=[Document(t) for t in TEXTS], destination=[],
+            nthreads=2, exit_on_error=True,
+        )
+        with pytest.raises(Exception) as ex:
+            executor()
+        assert "Failing as requested" in str(ex.value)
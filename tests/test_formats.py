@@ -1,3 +1,4 @@
+import io
 import sys
 import os
 import pytest
@@ -198,6 +199,67 @@ class TestFormatJson:
         assert ann2.end == 8
         assert len(ann2.features) == 0
 
+    def test_formatjson03(self, tmpdir):
+        import json
+        import gzip
+        from gatenlp.document import Document
+
+        doc1 = makedoc1()
+        doc1.annset().add(3, 5, "Type\u00fc", {"__internal": 1, "x": [1, "\U0001F4A9"]})
+        doc1.features["__internal"] = 2
+        for offset_type in [None, "j"]:
+            for annsets in [None, ["Set2"], [("", ["Type1"])]]:
+                expected = json.dumps(doc1.to_dict(offset_type=offset_type, annsets=annsets))
+                assert doc1.save_mem(fmt="text/bdocjs", offset_type=offset_type, annsets=annsets) == expected
+        # write java offsets for a text with characters outside the BMP, gzip compressed
+        doc2 = Document("\U0001F4A9 x \U0001F4A9 y")
+        doc2.annset().add(2, 3, "X")
+        doc2.annset().add(4, 7, "Y", {"f": 1})
+        fname = os.path.join(str(tmpdir), "doc2.bdocjs.gz")
+        doc2.save(fname, offset_type="j")
+        with gzip.open(fname, "rt") as infp:
+            assert infp.read() == json.dumps(doc2.to_dict(offset_type="j"))
+        doc3 = Document.load(fname)
+        assert doc3.to_dict() == doc2.to_dict()
+        # subclasses with additional fields are saved from their dict representation
+        from gatenlp.document import MultiDocument
+        mdoc = MultiDocument(DOC1_TEXT)
+        mdoc.annset().add(0, 2, "Type1")
+        assert mdoc.save_mem(fmt="text/bdocjs") == json.dumps(mdoc.to_dict())
+
+
+    def test_formatjson04(self, tmpdir, monkeypatch):
+        from gatenlp.document import Document
+        from gatenlp.gatenlpconfig import gatenlpconfig
+        from gatenlp.corpora import JsonLinesFileSource, JsonLinesFileDestination
+        from gatenlp.serialization.jsonbackend import get_json_backend, JSON_BACKENDS
+
+        doc1 = makedoc1()
+        doc1.annset().add(3, 5, "Type\u00fc", {"x": [1, "\U0001F4A9", 2.5, None]})
+        expected = doc1.to_dict()
+        monkeypatch.setenv("GATENLP_JSON_BACKEND", "json")
+        assert get_json_backend().name == "json"
+        try:
+            for name in JSON_BACKENDS + ["auto"]:
+                gatenlpconfig.json_backend = name
+                backend = get_json_backend()
+                assert backend.name in JSON_BACKENDS
+                assert Document.load_mem(doc1.save_mem()).to_dict() == expected
+                fname = os.path.join(str(tmpdir), "doc1.bdocjs.gz")
+                doc1.save(fname)
+                assert Document.load(fname).to_dict() == expected
+                fname = os.path.join(str(tmpdir), "docs.jsonl")
+                with JsonLinesFileDestination(fname, data_fields=False) as dest:
+                    dest.append(doc1)
+                assert [doc.text for doc in JsonLinesFileSource(fname)] == [doc1.text]
+            gatenlpconfig.json_backend = None
+            monkeypatch.setenv("GATENLP_JSON_BACKEND", "auto")
+            assert get_json_backend().name == get_json_backend("auto").name
+            with pytest.raises(Exception):
+                get_json_backend("nosuchbackend")
+        finally:
+            gatenlpconfig.json_backend = None
+
 
 class TestFormatMsgPack:
     def test_formatmsgpack01(self):
@@ -271,3 +333,209 @@ class TestFormatMsgPack:
         assert ann2.start == 2
         assert ann2.end == 8
         assert len(ann2.features) == 0
+
+    def test_formatmsgpack03(self):
+        from gatenlp.document import Document
+        from gatenlp.changelog import ChangeLog
+        from gatenlp.serialization.default import MSGPACK_VERSION_HDR, _ints2bytes, _bytes2ints
+        import msgpack
+
+        doc1 = makedoc1()
+        doc1.annset().add(3, 5, "Type1", {"x": [1, 2]})
+        doc1.annset().add(1, 5, "Type3")
+        doc1.annset("Empty")
+        data = doc1.save_mem(fmt="text/bdocmp")
+        assert msgpack.Unpacker(io.BytesIO(data)).unpack() == MSGPACK_VERSION_HDR
+        doc2 = Document.load_mem(data, fmt="text/bdocmp")
+        assert doc2.to_dict() == doc1.to_dict()
+        assert [a.type for a in doc2.annset().within(0, 5)] == ["Type1", "Type3", "Type1"]
+        # the loaded annotations belong to their set and log feature changes
+        doc2.changelog = ChangeLog()
+        ann = doc2.annset().get(1)
+        assert ann.features["x"] == [1, 2]
+        ann.features["y"] = 1
+        assert len(doc2.changelog) == 1
+        doc2.annset().add(6, 7, "Type4")
+        assert doc2.annset().get(3).type == "Type4"
+        typecode, data = _ints2bytes([1, 2 ** 40])
+        assert typecode == "q"
+        assert list(_bytes2ints(typecode, data)) == [1, 2 ** 40]
+
+
+class TestFormatMmap:
+    def test_formatmmap01(self, tmpdir):
+        from gatenlp.document import Document
+
+        doc1 = makedoc1()
+        doc1.annset().add(3, 5, "Type3", {"x": [1, 2]})
+        doc1.annset().add(1, 5, "Type1")
+        doc1.annset("Set2").add(0, 1, "Type3")
+        fname = os.path.join(str(tmpdir), "doc1.bdocmm")
+        doc1.save(fname)
+        doc2 = Document.load(fname)
+        assert doc2.to_dict() == doc1.to_dict()
+        doc3 = Document.load(fname, annsets=[("", "Type1"), "Set2"])
+        assert doc3.text == DOC1_TEXT
+        assert doc3.features.to_dict() == doc1.features.to_dict()
+        assert [a.id for a in doc3.annset()] == [0, 2]
+        assert doc3.annset().get(0).features.to_dict() == doc1.annset().get(0).features.to_dict()
+        assert len(doc3.annset("Set2")) == 2
+        assert doc3.annset().add(6, 7, "Type4").id == 3
+        doc4 = Document.load_mem(doc1.save_mem(fmt="bdocmm", annsets=["Set2"]), fmt="bdocmm")
+        assert list(doc4.annset_names()) == ["Set2"]
+        assert doc4.annset("Set2").to_dict() == doc1.annset("Set2").to_dict()
+        # java offsets get converted back when loading
+        doc5 = Document("\U0001F4A9 x y")
+        doc5.annset().add(2, 3, "X")
+        doc5.save(fname, offset_type="j")
+        assert Document.load(fname).to_dict() == doc5.to_dict()
+        assert Document.load(fname, fmt="bdocmm", annsets=[("", ["X"])]).annset().first().start == 2
+
+
+class TestSelectiveLoading:
+    def test_selectiveloading01(self, tmpdir):
+        from gatenlp.document import Document
+        from gatenlp.gatenlpconfig import gatenlpconfig
+
+        doc1 = makedoc1()
+        doc1.annset().add(3, 5, "Type3", {"x": [1, 2]})
+        doc1.annset("Set2").add(0, 1, "Type3", {"y": 1})
+        doc1.annset("Set3").add(1, 2, "Type1")
+        spec = [("", "Type3"), "Set2"]
+        for ext in ["bdocjs", "bdocjs.gz", "bdocym", "bdocmp", "bdocmm"]:
+            fname = os.path.join(str(tmpdir), "doc1." + ext)
+            doc1.save(fname)
+            doc2 = Document.load(fname, annsets=spec)
+            assert doc2.text == DOC1_TEXT
+            assert doc2.features.to_dict() == doc1.features.to_dict()
+            assert set(doc2.annset_names()) == {"", "Set2"}
+            assert [a.id for a in doc2.annset()] == [1]
+            assert doc2.annset().get(1).features.to_dict() == {"x": [1, 2]}
+            assert doc2.annset("Set2").to_dict() == doc1.annset("Set2").to_dict()
+            assert doc2.annset().add(6, 7, "Type4").id == 2
+            doc3 = Document.load(fname, features=False)
+            assert set(doc3.annset_names()) == {"", "Set2", "Set3"}
+            assert len(doc3.annset()) == 2
+            assert all(len(a.features) == 0 for name in doc3.annset_names() for a in doc3.annset(name))
+        # the streaming parse for bdocjs from memory, and the same result with a different backend
+        json1 = doc1.save_mem(fmt="bdocjs")
+        doc4 = Document.load_mem(json1, fmt="bdocjs", annsets=["Set3"], features=False)
+        assert list(doc4.annset_names()) == ["Set3"]
+        assert doc4.annset("Set3").first().type == "Type1"
+        doc5 = Document.load_mem(json1.encode("utf-8"), fmt="bdocjs", annsets=[("Set2", ["Type2"])])
+        assert [a.type for a in doc5.annset("Set2")] == ["Type2"]
+        try:
+            gatenlpconfig.json_backend = "orjson"
+            doc6 = Document.load_mem(json1, fmt="bdocjs", annsets=[("Set2", ["Type2"])])
+        finally:
+            gatenlpconfig.json_backend = None
+        assert doc6.to_dict() == doc5.to_dict()
+        msgpack1 = doc1.save_mem(fmt="bdocmp")
+        doc7 = Document.load_mem(msgpack1, fmt="bdocmp", annsets=["Set3", ("Set2", "Type3")])
+        assert set(doc7.annset_names()) == {"Set2", "Set3"}
+        assert doc7.annset("Set2").first().features.to_dict() == {"y": 1}
+
+
+class TestLazyLoading:
+    def test_lazyloading01(self, tmpdir):
+        from gatenlp.document import Document
+
+        doc1 = makedoc1()
+        doc1.annset().add(3, 5, "Type3", {"x": [1, 2]})
+        doc1.annset("Set3").add(1, 2, "Type1")
+        for ext in ["bdocjs", "bdocym", "bdocmp"]:
+            fname = os.path.join(str(tmpdir), "doc1." + ext)
+            doc1.save(fname)
+            doc2 = Document.load(fname, lazy=True)
+            assert set(doc2.annset_names()) == {"", "Set2", "Set3"}
+            assert all(doc2._annotation_sets[name]._is_lazy() for name in doc2.annset_names())
+            assert len(doc2.annset()) == 2
+            assert doc2.annset("Set2").size == 1
+            assert doc2.annset()._is_lazy()
+            # modify one set, the others stay lazy and get saved from the loaded data
+            doc2.annset("Set3").add(0, 1, "Type5")
+            assert not doc2.annset("Set3")._is_lazy()
+            assert doc2.annset()._is_lazy()
+            fname2 = os.path.join(str(tmpdir), "doc2." + ext)
+            doc2.save(fname2)
+            # only bdocjs and bdocmp save unused sets without creating the annotations
+            assert doc2.annset()._is_lazy() == (ext != "bdocym")
+            doc3 = Document.load(fname2)
+            assert doc3.annset().to_dict() == doc1.annset().to_dict()
+            assert doc3.annset("Set2").to_dict() == doc1.annset("Set2").to_dict()
+            assert sorted(a.type for a in doc3.annset("Set3")) == ["Type1", "Type5"]
+            assert doc2.annset().to_dict() == doc1.annset().to_dict()
+            assert not doc2.annset()._is_lazy()
+        # java offsets of lazy sets get converted when the annotations get created
+        doc4 = Document("\U0001F4A9 x y")
+        doc4.annset().add(2, 3, "X")
+        doc4.annset("S").add(4, 5, "Y")
+        for fmt in ["bdocjs", "bdocmp"]:
+            doc5 = Document.load_mem(doc4.save_mem(fmt=fmt, offset_type="j"), fmt=fmt, lazy=True)
+            assert doc5.annset("S")._is_lazy()
+            assert doc5.annset().first().start == 2
+            assert doc5.to_dict() == doc4.to_dict()
+
+
+class TestCompression:
+    def test_compression01(self, tmpdir):
+        import gzip
+        import importlib.util
+        from gatenlp.document import Document
+        from gatenlp.gatenlpconfig import gatenlpconfig
+
+        doc1 = makedoc1()
+        for i in range(500):
+            doc1.annset("Set3").add(i % 10, i % 10 + 2, "Type" + str(i % 3), {"i": i})
+        for ext in ["bdocjs.gz", "bdocym.gz", "bdocmp.gz", "txt.gz"]:
+            fname = os.path.join(str(tmpdir), "doc1." + ext)
+            doc1.save(fname)
+            with gzip.open(fname, "rb") as infp:
+                assert len(infp.read()) > 0
+            doc2 = Document.load(fname)
+            if ext == "txt.gz":
+                assert doc2.text == DOC1_TEXT
+            else:
+                assert doc2.to_dict() == doc1.to_dict()
+        # saving compressed to memory returns the bytes
+        for fmt in ["text/bdocjs+gzip", "application/msgpack+gzip"]:
+            data = doc1.save_mem(fmt=fmt)
+            assert isinstance(data, bytes)
+            assert Document.load_mem(data, fmt=fmt).to_dict() == doc1.to_dict()
+        # the compression level can be configured
+        assert len(doc1.save_mem(fmt="text/bdocjs+gzip", compresslevel=1)) > \
+            len(doc1.save_mem(fmt="text/bdocjs+gzip"))
+        try:
+            gatenlpconfig.compression_levels["gzip"] = 1
+            assert doc1.save_mem(fmt="text/bdocjs+gzip") == doc1.save_mem(fmt="text/bdocjs+gzip", compresslevel=1)
+        finally:
+            gatenlpconfig.compression_levels.clear()
+        for codec, pkg in [("zst", "zstandard"), ("lz4", "lz4")]:
+            fname = os.path.join(str(tmpdir), "doc1.bdocjs." + codec)
+            if importlib.util.find_spec(pkg) is None:
+                with pytest.raises(Exception) as ex:
+                    doc1.save(fname)
+                assert pkg in str(ex.value)
+                continue
+            for ext in ["bdocjs", "bdocmp"]:
+                fname = os.path.join(str(tmpdir), "doc1." + ext + "." + codec)
+                doc1.save(fname)
+                assert Document.load(fname).to_dict() == doc1.to_dict()
+
+    def test_compression02(self, tmpdir):
+        from gatenlp.serialization.compression import CompressedWriter, read_compressed
+        import gatenlp.serialization.compression as compression
+
+        # write enough data for several chunks to get compressed in the background thread
+        fname = os.path.join(str(tmpdir), "data.gz")
+        chunksize = compression.WRITE_CHUNKSIZE
+        try:
+            compression.WRITE_CHUNKSIZE = 100
+            with CompressedWriter(fname, "gzip", encoding="utf-8") as outfp:
+                outfp.writelines(str(i) + "\n" for i in range(10000))
+        finally:
+            compression.WRITE_CHUNKSIZE = chunksize
+        assert read_compressed(fname, "gzip").decode("utf-8") == "".join(str(i) + "\n" for i in range(10000))
+        with pytest.raises(Exception) as ex:
+            CompressedWriter(fname, "rar")
+        assert "Unknown compression codec" in str(ex.value)
@@ -62,3 +62,53 @@ class TestSortedIntvls01:
         assert (5, 9, 3, "int6") in ret7
         assert (8, 10, 5, "int8") in ret7
         assert (8, 9, 9, "int7") in ret7
+
+
+class TestArrayIntvls01:
+    def test_arrayintvls01(self):
+        from gatenlp.impl import ArrayIntvls
+
+        self.check_against_sortedintvls(ArrayIntvls)
+
+    def test_treeintvls01(self):
+        from gatenlp.impl import TreeIntvls
+
+        self.check_against_sortedintvls(TreeIntvls)
+
+    @staticmethod
+    def check_against_sortedintvls(intvls_class):
+        import random
+
+        rnd = random.Random(1)
+        intvls = []
+        for annid in range(300):
+            start = rnd.randint(0, 100)
+            intvls.append((start, start + rnd.randint(0, 15), annid))
+        si1 = SortedIntvls()
+        si1.update(intvls)
+        ai1 = intvls_class()
+        ai1.update(intvls[:150])
+        for intvl in intvls[150:]:
+            ai1.add(*intvl)
+        assert len(ai1) == len(si1)
+        assert ai1.min_start() == si1.min_start()
+        assert ai1.max_end() == si1.max_end()
+        assert sorted(ai1.firsts()) == sorted(si1.firsts())
+        assert sorted(ai1.lasts()) == sorted(si1.lasts())
+        for start in range(0, 110, 3):
+            for end in [start, start + 1, start + 7]:
+                for meth in ["within", "covering", "overlapping", "at"]:
+                    ret1 = sorted(getattr(si1, meth)(start, end))
+                    ret2 = sorted(getattr(ai1, meth)(start, end))
+                    assert ret1 == ret2, f"{meth}({start},{end})"
+            for meth in ["starting_at", "ending_at", "starting_from", "starting_before",
+                         "ending_to", "ending_after"]:
+                assert sorted(getattr(si1, meth)(start)) == sorted(getattr(ai1, meth)(start))
+        # the order by start offset and annotation id is the same
+        assert list(ai1.irange()) == [(s, e, i) for s, e, i in si1.irange()]
+        for intvl in intvls[:100]:
+            si1.remove(*intvl)
+            ai1.remove(*intvl)
+        ai1.discard(0, 0, 12345)
+        assert list(ai1.irange()) == [(s, e, i) for s, e, i in si1.irange()]
+        assert sorted(ai1.ending_to(50)) == sorted(si1.ending_to(50))
@@ -29,6 +29,11 @@ class TestSpacy01:
         tokens = anns.with_type("Token")
         assert len(tokens) == 14
 
+        # batch processing adds the annotations to the right documents
+        annspacy = AnnSpacy(pipeline=nlp, batch_size=2)
+        docs = annspacy.process_batch([Document(txt), Document("Hello."), Document(txt)])
+        assert [len(doc.annset().with_type("Token")) for doc in docs] == [14, 2, 14]
+
 
 if __name__ == "__main__":
     tests = TestSpacy01()